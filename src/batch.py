@@ -0,0 +1,260 @@
+"""
+Runs VolumeExecutor backtests over a matrix of coins, time windows and parameter sets.
+
+Run from src:
+    python batch.py --coins XRPUSDT ETHUSDT --start 2025-01-01 --end 2025-07-01 [--params params.json] [--results batch_results.jsonl]
+
+Runs over the same coin and window form one shard, so each shard reads its trades once, through the shared on-disk
+TradeCache, and evaluates all of its parameter sets with VolumeSweep. Shards are spread over a process pool and every
+run's result is appended to a JSON lines file as its shard finishes. Runs already in the file are skipped, so an
+interrupted batch continues where it stopped, and shards that fail are retried.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from typing import Optional
+from database import TradeCache
+from source.backtest import Backtest
+from strategy.config.volume_params import VolumeParams
+from strategy.volume_sweep import VolumeSweep
+
+INITIAL_CAPITAL = 10000
+RESULTS_PATH = 'batch_results.jsonl'
+RETRIES = 2  # Extra attempts for a failed shard
+
+@dataclass(frozen=True)
+class Run:
+    """
+    One backtest of the batch matrix.
+    """
+
+    coin: str
+    start: datetime
+    end: datetime
+    params: VolumeParams = field(default_factory=VolumeParams)
+    trade_type: str = 'spot'
+
+    @property
+    def run_id(self) -> str:
+        """
+        Returns:
+            run_id (str): Key of the run in the results file, stable across processes and restarts.
+        """
+        key = json.dumps([self.coin, self.trade_type, self.start.isoformat(), self.end.isoformat(), asdict(self.params)], sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+def monthly_matrix(coins: list[str], start: datetime, end: datetime, params: list[VolumeParams], months: int = 1, trade_type: str = 'spot') -> list[Run]:
+    """
+    Parameters:
+        coins (list[str]): Coin pairs to test.
+
+        start (datetime): Start (inc.) of the first window.
+
+        end (datetime): End (excl.) of the last window.
+
+        params (list[VolumeParams]): Parameter sets to test in every window.
+
+        months (int): Length of each window, and the step between windows, in months.
+
+        trade_type (str): Trade type of every run.
+
+    Returns:
+        runs (list[Run]): Every (coin, window, params) combination.
+    """
+    runs = []
+    for coin in coins:
+        window = start
+        while window + relativedelta(months=months) <= end:
+            runs += [Run(coin, window, window + relativedelta(months=months), p, trade_type) for p in params]
+            window += relativedelta(months=months)
+    return runs
+
+# --- Workers --- #
+
+# Cache every run in a worker process reads trades through
+_cache: Optional[TradeCache] = None
+
+def _init_worker(cache_root: str):
+    global _cache
+    _cache = TradeCache(cache_root)
+
+def _run_shard(runs: list[Run], bars: bool) -> tuple[list[dict], int]:
+    """
+    Evaluates runs that share a coin and window over one read of their trades.
+
+    Returns:
+        results (tuple[list[dict], int]): One result row per run, and the number of trades each run replayed.
+    """
+    first = runs[0]
+    backtest = Backtest(first.coin, first.start, first.end, INITIAL_CAPITAL, columnar=True, trade_type=first.trade_type, cache=_cache, bars=bars)
+    trades = backtest.trades()
+
+    started = time.perf_counter()
+    metrics = VolumeSweep(trades, INITIAL_CAPITAL).run([run.params for run in runs])
+    elapsed = (time.perf_counter() - started) / len(runs)
+
+    results = []
+    for run, row in zip(runs, metrics.to_dict('records')):
+        results.append({
+            'run_id': run.run_id,
+            'coin': run.coin,
+            'trade_type': run.trade_type,
+            'start': run.start.isoformat(),
+            'end': run.end.isoformat(),
+            'params': asdict(run.params),
+            'final_balance': row['final_balance'],
+            'return_pct': row['return_pct'],
+            'max_drawdown': row['max_drawdown'],
+            'trades': row['trades'],
+            'replayed_trades': len(trades),
+            'seconds': elapsed
+        })
+    return results, len(trades)
+
+# --- Batch --- #
+
+def completed_runs(results_path: str) -> set[str]:
+    """
+    Returns:
+        run_ids (set[str]): IDs of the runs already in the results file. A partly written last line is ignored.
+    """
+    if not os.path.exists(results_path):
+        return set()
+    run_ids = set()
+    with open(results_path) as f:
+        for line in f:
+            try:
+                run_ids.add(json.loads(line)['run_id'])
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return run_ids
+
+def run_batch(
+    runs: list[Run],
+    results_path: str = RESULTS_PATH,
+    workers: Optional[int] = None,
+    retries: int = RETRIES,
+    bars: bool = False,
+    cache_root: Optional[str] = None
+) -> list[Run]:
+    """
+    Runs every run not in the results file yet, appending each result to the file as its shard finishes.
+
+    A shard that raises is resubmitted up to retries more times. If a worker process dies, the pool is replaced and
+    the shards that were in flight are rerun one at a time, so only a shard that kills its worker uses up attempts.
+    Runs that still fail are left out of the file, so the next batch retries them.
+
+    Parameters:
+        runs (list[Run]): The batch matrix.
+
+        results_path (str): JSON lines file to append results to.
+
+        workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs.
+
+        retries (int): Extra attempts for a failed shard.
+
+        bars (bool): Replay per-second bars instead of trades (see Backtest).
+
+        cache_root (Optional[str]): Directory of the shared trade cache. Defaults to TradeCache's.
+
+    Returns:
+        failed (list[Run]): Runs that failed on every attempt.
+    """
+    workers = workers or os.cpu_count()
+    done = completed_runs(results_path)
+    shards: dict[tuple, list[Run]] = {}
+    for run in runs:
+        if run.run_id not in done:
+            shards.setdefault((run.coin, run.trade_type, run.start, run.end), []).append(run)
+    if len(done):
+        print(f'Skipping {len(runs) - sum(len(s) for s in shards.values())} runs already in {results_path}.')
+
+    pending = [(shard, 0) for shard in shards.values()]
+    total = sum(len(shard) for shard in shards.values())
+    finished = replayed = 0
+    failed = []
+    started = time.perf_counter()
+
+    isolated = []  # Shards in flight when a pool broke, rerun one per pool so the break is charged to its cause
+    with open(results_path, 'a') as results_file:
+        while pending or isolated:
+            if isolated:
+                submitted, pool_workers = [isolated.pop()], 1
+            else:
+                submitted, pending, pool_workers = pending, [], workers
+            with ProcessPoolExecutor(pool_workers, initializer=_init_worker, initargs=(cache_root or TradeCache().root,)) as pool:
+                in_flight = {pool.submit(_run_shard, shard, bars): (shard, attempt) for shard, attempt in submitted}
+                while in_flight:
+                    finished_futures, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished_futures:
+                        shard, attempt = in_flight.pop(future)
+                        try:
+                            results, trades = future.result()
+                        except BrokenProcessPool:
+                            # Every shard in flight is lost with the pool. Alone, this one broke it and uses an attempt,
+                            # otherwise any of them could have, so each is rerun alone without using one.
+                            if in_flight:
+                                isolated += [(shard, attempt)] + list(in_flight.values())
+                            else:
+                                pending.append((shard, attempt + 1))
+                            in_flight = {}
+                            break
+                        except Exception as e:
+                            print(f'Shard {shard[0].coin} {shard[0].start:%Y-%m-%d} failed (attempt {attempt + 1}): {e!r}')
+                            if attempt < retries:
+                                in_flight[pool.submit(_run_shard, shard, bars)] = (shard, attempt + 1)
+                            else:
+                                failed += shard
+                            continue
+
+                        for result in results:
+                            results_file.write(json.dumps(result) + '\n')
+                        results_file.flush()
+
+                        finished += len(results)
+                        replayed += trades * len(results)
+                        elapsed = time.perf_counter() - started
+                        print(
+                            f'{finished}/{total} runs, {finished / elapsed * 60:,.1f} runs/min, '
+                            f'{replayed / elapsed:,.0f} trades/s'
+                        )
+
+            # Shards whose pool broke too often are given up on
+            failed += [run for shard, attempt in pending if attempt > retries for run in shard]
+            pending = [(shard, attempt) for shard, attempt in pending if attempt <= retries]
+
+    if failed:
+        print(f'{len(failed)} runs failed, rerun the batch to retry them.')
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coins', nargs='+', required=True, help='Coin pairs to test.')
+    parser.add_argument('--start', type=datetime.fromisoformat, required=True, help='Start of the first window.')
+    parser.add_argument('--end', type=datetime.fromisoformat, required=True, help='End of the last window.')
+    parser.add_argument('--months', type=int, default=1, help='Length of each window in months.')
+    parser.add_argument('--trade-type', default='spot', help='Trade type of every run.')
+    parser.add_argument('--params', help='JSON file with a list of VolumeParams fields to test. Defaults to the config values.')
+    parser.add_argument('--results', default=RESULTS_PATH, help='JSON lines file to append results to.')
+    parser.add_argument('--workers', type=int, help='Number of worker processes.')
+    parser.add_argument('--retries', type=int, default=RETRIES, help='Extra attempts for a failed shard.')
+    parser.add_argument('--bars', action='store_true', help='Replay per-second bars instead of trades.')
+    args = parser.parse_args()
+
+    params = [VolumeParams()]
+    if args.params:
+        with open(args.params) as f:
+            params = [VolumeParams(**p) for p in json.load(f)]
+
+    runs = monthly_matrix(args.coins, args.start, args.end, params, args.months, args.trade_type)
+    run_batch(runs, args.results, args.workers, args.retries, args.bars)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Benchmarks the backtest engines and their hot functions on synthetic trades, without a database.
+
+Run from src:
+    python benchmark.py [--trades N] [--engines rows batch vectorized sweep] [--profile] [--tracemalloc]
+                        [--save-baseline baseline.json] [--baseline baseline.json --tolerance 0.1]
+
+Each engine runs in a fresh process, so its peak RSS is its own. Throughput is the best of --repeat runs in trades/s
+(replayed trades per parameter set for the sweep). The executor engines are measured as configured by default and again
+with the Backtest latency hooks on (the +latency rows), whose stage summary is printed with them. The synthetic volume
+comes in bursts, so that the parameters trade regularly and the order path is timed too, and too few orders fail the run.
+With --baseline the run fails when an engine or micro benchmark is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import replace
+from datetime import datetime
+from multiprocessing import get_context
+import numpy as np
+from database import TradeArrays
+from source.backtest import Backtest
+from source.latency import LATENCY
+from strategy.config.volume_params import VolumeParams
+from strategy.utils.deque_avg_var import DequeAvgVar
+from strategy.utils.rolling_rsi import RollingRSI
+from strategy.volume_executor import VolumeExecutor
+from strategy.volume_sweep import VolumeSweep
+
+ENGINES = ('rows', 'batch', 'vectorized', 'sweep')
+START = datetime(2025, 1, 1)
+INITIAL_CAPITAL = 10000
+SWEEP_SETS = 32  # Parameter sets per sweep run
+MIN_ORDER_RATE = 1 / 5000  # Orders per replayed trade below which the order path is not really benchmarked
+
+# Volume bursts: a minute starts a burst on one side with BURST_START probability, a burst goes on for another
+# minute with BURST_STAY probability, and trades on the burst's side are BURST_BOOST times larger
+BURST_NS = 60 * 1_000_000_000
+BURST_START = 0.03
+BURST_STAY = 0.8
+BURST_BOOST = 4.0
+MICRO_OPS = 200000  # Calls per micro benchmark
+TOP_FUNCTIONS = 25  # Lines of cProfile and tracemalloc output
+
+# Short buffers, so that about two hours of synthetic trades fill them, and thresholds the volume bursts cross about once per 1000 trades
+PARAMS = VolumeParams(threshold=1, threshold_s=1, z_score_max=5, flush=10, short_buf=600, long_buf=6000, threshold_rsi_b=60, threshold_rsi_s=40)
+
+def synthetic_trades(trades: int, seed: int = 0, mean_gap_ms: float = 200) -> TradeArrays:
+    """
+    Parameters:
+        trades (int): Number of trades.
+
+        seed (int): Random seed.
+
+        mean_gap_ms (float): Mean time between trades in milliseconds.
+
+    Returns:
+        trades (TradeArrays): A random walk of prices with exponential gaps and sizes, and buy or sell volume bursts, from START.
+    """
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(mean_gap_ms * 1_000_000, trades).astype(np.int64) // 1000 * 1000
+    time_ns = TradeArrays.to_ns(START) + np.cumsum(gaps)
+    side = rng.random(trades) < 0.5
+
+    # Burst of each minute: 1 on the buy side, -1 on the sell side, 0 for none
+    minute = (time_ns - time_ns[0]) // BURST_NS
+    minutes = int(minute[-1]) + 1
+    starts, stays, buys = rng.random(minutes), rng.random(minutes), rng.random(minutes) < 0.5
+    burst = np.zeros(minutes, dtype=np.int8)
+    for i in range(1, minutes):
+        if burst[i - 1] != 0 and stays[i] < BURST_STAY:
+            burst[i] = burst[i - 1]
+        elif starts[i] < BURST_START:
+            burst[i] = 1 if buys[i] else -1
+    boosted = burst[minute] == np.where(side, 1, -1)
+
+    return TradeArrays(
+        np.round(2 * np.exp(np.cumsum(rng.normal(0, 1e-4, trades))), 4),
+        np.round(rng.exponential(100, trades) * np.where(boosted, BURST_BOOST, 1), 2),
+        side,
+        time_ns,
+        np.arange(trades, dtype=np.int64)
+    )
+
+# --- Engines --- #
+
+def _executor_run(trades: TradeArrays, columnar: bool, vectorized: bool, latency: bool) -> tuple[int, int]:
+    end = TradeArrays.to_datetime(int(trades.time_ns[-1]) + 1000)  # datetime holds whole microseconds
+    backtest = Backtest('SYNTH', START, end, INITIAL_CAPITAL, columnar=columnar, trades=trades, latency=latency)
+    executor = VolumeExecutor(backtest, INITIAL_CAPITAL, graph=False, vectorized=vectorized, params=PARAMS)
+    executor.start()
+    return len(trades), executor.get_trade_count()
+
+def _sweep_run(trades: TradeArrays) -> tuple[int, int]:
+    params = [replace(PARAMS, threshold=t, threshold_s=s) for t in np.linspace(0.5, 2, SWEEP_SETS // 4) for s in (0.5, 1, 1.5, 2)]
+    results = VolumeSweep(trades, INITIAL_CAPITAL).run(params)
+    return len(trades) * len(params), int(results['trades'].sum())
+
+def run_engine(engine: str, trades: TradeArrays, latency: bool = False) -> tuple[int, int]:
+    """
+    Parameters:
+        engine (str): One of ENGINES.
+
+        trades (TradeArrays): Trades to replay.
+
+        latency (bool): Turn the Backtest latency hooks on. The sweep has none.
+
+    Returns:
+        replayed (int): Number of trades replayed, counted once per parameter set.
+
+        orders (int): Number of orders sent, over every parameter set.
+    """
+    if engine == 'rows':
+        return _executor_run(trades, False, False, latency)
+    if engine == 'batch':
+        return _executor_run(trades, True, False, latency)
+    if engine == 'vectorized':
+        return _executor_run(trades, True, True, latency)
+    if engine == 'sweep':
+        return _sweep_run(trades)
+    raise ValueError(f'Unknown engine {engine}')
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _benchmark_engine(engine: str, trades: int, seed: int, repeat: int, profile: bool, trace: bool, latency: bool = False) -> dict:
+    """
+    Runs one engine in the current (fresh) process and measures it.
+    """
+    data = synthetic_trades(trades, seed)
+    result = {'engine': engine, 'rss_before_mb': _peak_rss_mb()}
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        best = float('inf')
+        for _ in range(repeat):
+            LATENCY.reset()
+            started = time.perf_counter()
+            replayed, orders = run_engine(engine, data, latency)
+            best = min(best, time.perf_counter() - started)
+        result['trades_per_s'] = replayed / best
+        result['seconds'] = best
+        result['orders'] = orders
+        result['peak_rss_mb'] = _peak_rss_mb()
+
+    if orders < replayed * MIN_ORDER_RATE:
+        raise ValueError(f'{engine} sent {orders} orders over {replayed} trades, too few to benchmark the order path, use more trades')
+    if latency:
+        text = io.StringIO()
+        LATENCY.dump(text)
+        result['latency'] = text.getvalue()
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(run_engine, engine, data, latency)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+            result['profile'] = text.getvalue()
+
+        if trace:
+            tracemalloc.start()
+            run_engine(engine, data, latency)
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TOP_FUNCTIONS]
+            tracemalloc.stop()
+            result['traced_peak_mb'] = peak / 2 ** 20
+            result['tracemalloc'] = '\n'.join(str(stat) for stat in top)
+
+    return result
+
+# --- Micro Benchmarks --- #
+
+def micro_benchmarks(seed: int = 0) -> dict[str, float]:
+    """
+    Returns:
+        ops (dict[str, float]): Calls per second of the per-trade and per-flush primitives.
+    """
+    rng = np.random.default_rng(seed)
+    values = (rng.exponential(1000, MICRO_OPS)).tolist()
+    prices = (2 * np.exp(np.cumsum(rng.normal(0, 1e-4, MICRO_OPS)))).tolist()
+    ops = {}
+
+    for name, window in (('DequeAvgVar.append', PARAMS.long_len), ('DequeAvgVar.append+variance', PARAMS.long_len)):
+        buffer = DequeAvgVar(maxlen=window)
+        started = time.perf_counter()
+        if name.endswith('variance'):
+            for value in values:
+                buffer.append(value)
+                buffer.variance()
+        else:
+            for value in values:
+                buffer.append(value)
+        ops[name] = MICRO_OPS / (time.perf_counter() - started)
+
+    rsi = RollingRSI()
+    started = time.perf_counter()
+    for price in prices:
+        rsi.append(price)
+        rsi.value()
+    ops['RollingRSI.append+value'] = MICRO_OPS / (time.perf_counter() - started)
+    return ops
+
+# --- Baselines --- #
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Parameters:
+        results (dict): Results of this run, as saved by --save-baseline.
+
+        baseline (dict): Results of an earlier run.
+
+        tolerance (float): Allowed relative drop in throughput.
+
+    Returns:
+        regressions (list[str]): One line per engine or micro benchmark slower than the baseline by more than tolerance.
+    """
+    regressions = []
+    for section in ('engines', 'micro'):
+        for name, value in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                continue
+            ratio = value / before
+            print(f'{name}: {ratio:.2f}x baseline')
+            if ratio < 1 - tolerance:
+                regressions.append(f'{name}: {value:,.0f}/s against {before:,.0f}/s ({ratio - 1:+.0%})')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trades', type=int, default=1000000, help='Number of synthetic trades.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the trades.')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES), help='Engines to run.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per engine, the fastest counts.')
+    parser.add_argument('--profile', action='store_true', help='Print the functions with the most time under cProfile.')
+    parser.add_argument('--tracemalloc', action='store_true', help='Print the lines allocating the most memory.')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare the results with this JSON file and fail on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative throughput drop against the baseline.')
+    args = parser.parse_args()
+
+    results = {'trades': args.trades, 'seed': args.seed, 'engines': {}, 'micro': {}}
+    runs = [(engine, latency) for engine in args.engines for latency in ((False,) if engine == 'sweep' else (False, True))]
+    for engine, latency in runs:
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(_benchmark_engine, engine, args.trades, args.seed, args.repeat, args.profile, args.tracemalloc, latency).result()
+
+        name = engine + '+latency' if latency else engine
+        results['engines'][name] = result['trades_per_s']
+        print(
+            f'{name:>18}: {result['trades_per_s']:>14,.0f} trades/s, {result['seconds']:.2f}s, {result['orders']} orders, '
+            f'peak RSS {result['peak_rss_mb']:,.0f} MB ({result['peak_rss_mb'] - result['rss_before_mb']:+,.0f} MB over the trades)'
+        )
+        if 'latency' in result:
+            print(result['latency'])
+        if 'profile' in result:
+            print(result['profile'])
+        if 'tracemalloc' in result:
+            print(f'Traced peak {result['traced_peak_mb']:,.1f} MB, allocations still held after the run:')
+            print(result['tracemalloc'] + '\n')
+
+    results['micro'] = micro_benchmarks(args.seed)
+    for name, ops in results['micro'].items():
+        print(f'{name:>30}: {ops:>12,.0f} calls/s')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('trades') != args.trades:
+            print(f'Warning: the baseline used {baseline.get('trades')} trades')
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('Regressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
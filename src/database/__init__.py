@@ -1,4 +1,8 @@
 from .database_sync import DatabaseSync, CONNECTION_STR
 from .csv_download import CSVDownload
+from .trade_arrays import TradeArrays
+from .trade_bars import BarArrays
+from .trade_cache import TradeCache
+from .trade_reader import TradeReader, BinaryCopyTradeReader
 
-__all__ = ['DatabaseSync', 'CSVDownload', 'CONNECTION_STR']
\ No newline at end of file
+__all__ = ['DatabaseSync', 'CSVDownload', 'CONNECTION_STR', 'TradeArrays', 'BarArrays', 'TradeCache', 'TradeReader', 'BinaryCopyTradeReader']
\ No newline at end of file
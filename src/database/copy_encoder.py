@@ -0,0 +1,119 @@
+import numpy as np
+
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00'
+COPY_TRAILER = b'\xff\xff'
+PG_EPOCH_US = 946684800 * 1000000  # 2000-01-01, the zero of Postgres timestamps
+
+# NUMERIC values are sent as 7 base 10000 digits, the first of them worth 10000^4, with 8 decimal places
+NUMERIC_DIGITS = 7
+NUMERIC_WEIGHT = 4
+NUMERIC_SCALE = 8
+NUMERIC_BYTES = 8 + 2 * NUMERIC_DIGITS
+# Values are scaled to int64 before they are split into digits, so they must stay below about 9.22e10
+NUMERIC_MAX = np.iinfo(np.int64).max // 10 ** NUMERIC_SCALE
+
+def trade_row_dtype(trade_type_len: int) -> np.dtype:
+    """
+    Binary COPY layout of one (trade_id, coin_id, trade_time, price, quantity, side, trade_type) row of the trades table.
+
+    Parameters:
+        trade_type_len (int): Length of the trade type label, which is sent as text.
+
+    Returns:
+        dtype (np.dtype): Big-endian structured dtype of one row.
+    """
+    return np.dtype([
+        ('fields', '>i2'),
+        ('trade_id_len', '>i4'), ('trade_id', '>i8'),
+        ('coin_id_len', '>i4'), ('coin_id', '>i4'),
+        ('time_len', '>i4'), ('time_us', '>i8'),
+        ('price_len', '>i4'), ('price', '>i2', 4 + NUMERIC_DIGITS),
+        ('quantity_len', '>i4'), ('quantity', '>i2', 4 + NUMERIC_DIGITS),
+        ('side_len', '>i4'), ('side', '?'),
+        ('trade_type_len', '>i4'), ('trade_type', f'S{trade_type_len}')
+    ])
+
+def encode_trades(
+    trade_id: np.ndarray,
+    coin_id: int,
+    time_us: np.ndarray,
+    price: np.ndarray,
+    quantity: np.ndarray,
+    side: np.ndarray,
+    trade_type: str
+) -> bytes:
+    """
+    Encodes a chunk of trades as a complete binary COPY stream for
+    COPY trades (trade_id, coin_id, trade_time, price, quantity, side, trade_type) FROM STDIN (FORMAT BINARY).
+
+    Parameters:
+        trade_id (np.ndarray): Exchange trade IDs.
+
+        coin_id (int): coin_id of every trade.
+
+        time_us (np.ndarray): Trade times as integer microseconds since the Unix epoch.
+
+        price (np.ndarray): Trade prices, rounded to 8 decimal places, within numeric_fits().
+
+        quantity (np.ndarray): Trade sizes, rounded to 8 decimal places, within numeric_fits().
+
+        side (np.ndarray): True for buyer-initiated trades.
+
+        trade_type (str): Trade type of every trade.
+
+    Returns:
+        data (bytes): Header, rows and trailer.
+    """
+    label = trade_type.encode()
+    rows = np.empty(len(trade_id), dtype=trade_row_dtype(len(label)))
+
+    rows['fields'] = 7
+    rows['trade_id_len'] = 8
+    rows['trade_id'] = trade_id
+    rows['coin_id_len'] = 4
+    rows['coin_id'] = coin_id
+    rows['time_len'] = 8
+    rows['time_us'] = np.asarray(time_us, dtype=np.int64) - PG_EPOCH_US
+    rows['price_len'] = NUMERIC_BYTES
+    rows['price'] = encode_numeric(price)
+    rows['quantity_len'] = NUMERIC_BYTES
+    rows['quantity'] = encode_numeric(quantity)
+    rows['side_len'] = 1
+    rows['side'] = side
+    rows['trade_type_len'] = len(label)
+    rows['trade_type'] = label
+
+    return COPY_HEADER + rows.tobytes() + COPY_TRAILER
+
+def numeric_fits(values: np.ndarray) -> bool:
+    """
+    Returns:
+        fits (bool): Whether every value is a number from 0 to below NUMERIC_MAX, which encode_numeric can encode.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return bool(np.all((values >= 0) & (values < NUMERIC_MAX)))
+
+def encode_numeric(values: np.ndarray) -> np.ndarray:
+    """
+    Encodes non-negative values as fixed width binary NUMERIC fields.
+    Raises ValueError for values outside of numeric_fits(), which would overflow instead.
+
+    Parameters:
+        values (np.ndarray): Values from 0 to below NUMERIC_MAX (about 9.22e10), rounded to 8 decimal places.
+
+    Returns:
+        fields (np.ndarray): (ndigits, weight, sign, dscale, digits...) of each value, one row per value.
+    """
+    if not numeric_fits(values):
+        raise ValueError(f'NUMERIC values must be from 0 to below {NUMERIC_MAX}')
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * 10 ** NUMERIC_SCALE).astype(np.int64)
+    fields = np.empty((len(scaled), 4 + NUMERIC_DIGITS), dtype=np.int16)
+    fields[:, 0] = NUMERIC_DIGITS
+    fields[:, 1] = NUMERIC_WEIGHT
+    fields[:, 2] = 0  # Positive
+    fields[:, 3] = NUMERIC_SCALE
+
+    # The scaled value's base 10000 digits, most significant first
+    for i in range(NUMERIC_DIGITS - 1, -1, -1):
+        scaled, fields[:, 4 + i] = np.divmod(scaled, 10000)
+    return fields
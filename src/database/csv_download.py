@@ -2,13 +2,11 @@ import datetime
 from datetime import timedelta, datetime
 import requests
 import os
-from dotenv import load_dotenv
 import zipfile
 import hashlib
 import pandas as pd
-import psycopg2
-from psycopg2.extensions import cursor
-from psycopg2.extras import execute_values
+from psycopg import Cursor
+from .database_sync import DatabaseSync
 
 
 class CSVDownload:
@@ -95,32 +93,30 @@ class CSVDownload:
         Syncs all data files currently in the historical_data directory to the database.
         Deletes all .csv files after excecution.
         """
-        load_dotenv()
-        conn = psycopg2.connect(
-            dbname=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            host=os.getenv('DB_HOST'),
-            port=os.getenv('DB_PORT')
-        )
-        cur = conn.cursor()
-
         histdata = 'historical_data\\spot'
-        for coin_pair in os.listdir(histdata):
-            if coin_pair != 'totals':
+        coin_pairs = [coin_pair for coin_pair in os.listdir(histdata) if coin_pair != 'totals']
+
+        # Resolve the coin_ids first, get_coin_id may need a pooled connection of its own
+        for coin_pair in coin_pairs:
+            DatabaseSync.get_coin_id(coin_pair)
+
+        conn = DatabaseSync._get_connection()
+        cur = conn.cursor()
+        try:
+            for coin_pair in coin_pairs:
                 coinpath = os.path.join(histdata, coin_pair)
                 for filename in os.listdir(coinpath):
                     filepath = os.path.join(coinpath, filename)
                     CSVDownload.sync_csv_to_db(coin_pair, 'spot', filepath, cur)
                     conn.commit()
                     os.remove(filepath)
-
-        cur.close()
-        conn.close()
+        finally:
+            cur.close()
+            DatabaseSync._release_connection(conn)
 
     @staticmethod
-    def sync_csv_to_db(coin_pair: str, type: str, filepath: str, cur: cursor):
-        coin_id = CSVDownload._get_coin_id(coin_pair)
+    def sync_csv_to_db(coin_pair: str, type: str, filepath: str, cur: Cursor):
+        coin_id = DatabaseSync.get_coin_id(coin_pair)
 
         df = pd.read_csv(filepath, header=None)
         df.columns = ['trade_id', 'price', 'quantity', 'quoteqty', 'timestamp', 'is_buyer_maker', 'best_match']
@@ -133,8 +129,8 @@ class CSVDownload:
         insert_query = """
         INSERT INTO trades (
             trade_id, coin_id, trade_time, price, quantity, side, best_match, trade_type
-        ) VALUES %s
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (trade_id) DO NOTHING;
         """
 
-        execute_values(cur, insert_query, rows)
\ No newline at end of file
+        cur.executemany(insert_query, rows)
\ No newline at end of file
@@ -1,15 +1,22 @@
 import os
 import io
 import zipfile
-from psycopg import AsyncConnection, Connection, connect
-from psycopg_pool import AsyncConnectionPool
+from psycopg import AsyncConnection, AsyncCursor, Connection, sql
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 import pandas as pd
-from typing import List, Optional, Tuple
+import numpy as np
+from typing import IO, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import asyncio
 import aiohttp
+import threading
+import tempfile
+import hashlib
 from dotenv import load_dotenv
+from .trade_arrays import TradeArrays
+from .trade_bars import BarArrays
+from .copy_encoder import encode_trades, numeric_fits
 
 load_dotenv()
 CONNECTION_STR = f"""
@@ -19,9 +26,24 @@ CONNECTION_STR = f"""
     host={os.getenv('DB_HOST')}
     port={os.getenv('DB_PORT')}
 """
-asyncio.set_event_loop_policy(
-    asyncio.WindowsSelectorEventLoopPolicy()
-)
+BINANCE_DATA_URL = os.getenv('BINANCE_DATA_URL', 'https://data.binance.vision/data')
+DOWNLOAD_CONCURRENCY = 8  # Archives downloading at once
+SYNC_POOL_SIZE = 4  # Synchronous connections, enough for a trade reader's prefetch thread next to the caller's own queries
+PARSE_WORKERS = 2
+COPY_WORKERS = 4
+DOWNLOAD_BLOCK = 1024 * 1024  # bytes
+# No limit on a whole download, monthly archives can take longer than aiohttp's default 5 minutes, only on each read
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+COPY_BLOCK = 1024 * 1024  # bytes
+INGEST_MODES = ('stream', 'csv', 'binary')
+PARSE_CHUNK = 50000  # rows
+STAGING_COLUMNS = ('trade_id', 'price', 'quantity', 'quote_qty', 'trade_epoch', 'is_buyer_maker', 'is_best_match')
+
+# psycopg's async connections need a selector event loop on Windows
+if os.name == 'nt':
+    asyncio.set_event_loop_policy(
+        asyncio.WindowsSelectorEventLoopPolicy()
+    )
 
 class DatabaseSync:
     """
@@ -33,6 +55,23 @@ class DatabaseSync:
 
     pool = AsyncConnectionPool(CONNECTION_STR, open=False)
 
+    # --- Sync Connection Pool --- #
+
+    # Shared by every synchronous caller in the process: DatabaseSync, CSVDownload and the Backtest trade readers
+    sync_pool = ConnectionPool(CONNECTION_STR, min_size=1, max_size=SYNC_POOL_SIZE, open=False)
+    _sync_pool_lock = threading.Lock()
+
+    # --- Coin ID Cache --- #
+
+    _coin_ids: dict[str, int] = {}
+    _coin_ids_loaded = False
+    _coin_ids_lock = threading.Lock()
+
+    # --- Partition Cache --- #
+
+    # (coin_id, trade_type, month) of the leaf partitions of trades known to exist
+    _partitions: set[tuple[int, str, str]] = set()
+
     # --- Database AsyncConnection Utils --- #
 
     @staticmethod
@@ -60,31 +99,36 @@ class DatabaseSync:
     @staticmethod
     def _get_connection() -> Connection:
         """
-        Gets a regular connection to the database, not from a pool.
+        Gets a synchronous connection from the shared pool, opening the pool on first use.
 
         Returns:
             conn (Connection): A synchronous connection to the database.
         """
-        return connect(CONNECTION_STR)
+        if DatabaseSync.sync_pool.closed:
+            with DatabaseSync._sync_pool_lock:
+                if DatabaseSync.sync_pool.closed:
+                    DatabaseSync.sync_pool.open()
+        return DatabaseSync.sync_pool.getconn()
     
     @staticmethod
     def _release_connection(conn: Connection):
         """
-        Closes the given connection.
+        Returns the given connection to the shared pool. Any open transaction is rolled back.
 
         Parameters:
-            conn (Connection): Database connection to close.
+            conn (Connection): Database connection to return to the pool.
         """
-        conn.close()
+        DatabaseSync.sync_pool.putconn(conn)
 
     # --- Existing Coins Utils --- #
 
     @staticmethod
     def get_coin_id(coin_pair: str) -> int:
         """        
-        Gets the coin_id for the given coin pairing from the database.
+        Gets the coin_id for the given coin pairing.
 
-        Inserts the coin pairing if it is not already in the database and creates a coin_id.
+        IDs are cached for the whole process. The first call loads every existing coin pairing with one query,
+        and a coin pairing not in the database yet is inserted to create its coin_id.
 
         Parameters:
             coin_pair (str): Coin pair to return the ID for.
@@ -92,23 +136,56 @@ class DatabaseSync:
         Returns:
             coin_id (int): ID of the given coin in the database.
         """
+        if (coin_id := DatabaseSync._coin_ids.get(coin_pair)) is not None:
+            return coin_id
+
+        with DatabaseSync._coin_ids_lock:
+            if not DatabaseSync._coin_ids_loaded:
+                DatabaseSync._load_coin_ids()
+            if coin_pair not in DatabaseSync._coin_ids:
+                DatabaseSync._insert_coin_pair(coin_pair)
+        return DatabaseSync._coin_ids[coin_pair]
+
+    @staticmethod
+    def _load_coin_ids():
+        """
+        Fills the coin_id cache with every coin pairing in the database.
+        """
         conn = DatabaseSync._get_connection()
-        with conn.cursor() as cur:
-            cur.execute('SELECT coin_id FROM coin_pair WHERE symbol = %s;', (coin_pair,))
-            result = cur.fetchone()
-            if result:
-                ret = result[0]
-            else:
-                cur.execute('INSERT INTO coin_pair(symbol) VALUES (%s) RETURNING coin_id', (coin_pair,))
-                ret = cur.fetchone()[0]
-        conn.commit()
-        DatabaseSync._release_connection(conn)
-        return ret
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT symbol, coin_id FROM coin_pair;')
+                DatabaseSync._coin_ids.update(cur.fetchall())
+            conn.commit()
+            DatabaseSync._coin_ids_loaded = True
+        finally:
+            DatabaseSync._release_connection(conn)
+
+    @staticmethod
+    def _insert_coin_pair(coin_pair: str):
+        """
+        Adds a coin pairing to the database and the coin_id cache.
+
+        Parameters:
+            coin_pair (str): Coin pair to add.
+        """
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT coin_id FROM coin_pair WHERE symbol = %s;', (coin_pair,))
+                result = cur.fetchone()
+                if not result:
+                    cur.execute('INSERT INTO coin_pair(symbol) VALUES (%s) RETURNING coin_id', (coin_pair,))
+                    result = cur.fetchone()
+            conn.commit()
+            DatabaseSync._coin_ids[coin_pair] = result[0]
+        finally:
+            DatabaseSync._release_connection(conn)
     
     @staticmethod
     def _get_existing_pairings() -> list[tuple[str, str]]:
         """
-        Gets all the existing (coin_pair, trade_type) tuples in the database.
+        Gets all the existing (coin_pair, trade_type) tuples in the database, from the ingest manifest.
 
         Returns:
             existing_pairings (list[tuple[str, str]]): A list of (coin_pair, trade_type) tuples already in the database.
@@ -116,27 +193,479 @@ class DatabaseSync:
         conn = DatabaseSync._get_connection()
         with conn.cursor() as cur:
             query = """
-                SELECT DISTINCT cp.symbol, t.trade_type
+                SELECT DISTINCT cp.symbol, m.trade_type::text
                 FROM coin_pair cp
-                JOIN trades t ON cp.coin_id = t.coin_id;
+                JOIN ingest_manifest m ON cp.coin_id = m.coin_id;
             """
             cur.execute(query)
             pairings = cur.fetchall()
         conn.commit()
         DatabaseSync._release_connection(conn)
         return pairings
+
+    # --- Ingest Manifest Utils --- #
+
+    @staticmethod
+    def _create_schema():
+        """
+        Creates the tables the project uses if they do not exist yet, as in utils/setup.sql.
+
+        trades is partitioned by coin_id, then trade_type, then month of trade_time. Partitions are created as they
+        are needed by _create_partitions. The ingest manifest has one row per loaded Binance archive,
+        so completed archives can be skipped without scanning trades. trade_bars holds per-second aggregates of trades.
+        """
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.relkind
+                    FROM pg_class c
+                    WHERE c.oid = to_regclass('trades');
+                """)
+                kind = cur.fetchone()
+                if kind and kind[0] != 'p':
+                    raise RuntimeError('trades is not partitioned, recreate it with utils/setup.sql or migrate its rows first')
+
+                cur.execute("""
+                    DO $$ BEGIN
+                        CREATE TYPE TRADETYPE AS ENUM ('spot', 'futures', 'options');
+                    EXCEPTION WHEN duplicate_object THEN NULL;
+                    END $$;
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS coin_pair (
+                        coin_id SERIAL PRIMARY KEY,
+                        symbol TEXT UNIQUE NOT NULL
+                    );
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS trades (
+                        trade_id BIGINT NOT NULL,
+                        coin_id INTEGER NOT NULL,
+                        trade_time TIMESTAMP NOT NULL,
+                        price NUMERIC NOT NULL,
+                        quantity NUMERIC NOT NULL,
+                        side BOOLEAN NOT NULL,
+                        trade_type TRADETYPE NOT NULL,
+                        PRIMARY KEY (trade_id, coin_id, trade_type, trade_time),
+                        CONSTRAINT coin_fk FOREIGN KEY (coin_id) REFERENCES coin_pair(coin_id)
+                    ) PARTITION BY LIST (coin_id);
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS ingest_manifest (
+                        coin_id INTEGER NOT NULL REFERENCES coin_pair(coin_id),
+                        trade_type TRADETYPE NOT NULL,
+                        period TEXT NOT NULL,
+                        row_count BIGINT,
+                        checksum TEXT,
+                        status TEXT NOT NULL CHECK (status IN ('loading', 'complete')),
+                        updated_at TIMESTAMP NOT NULL DEFAULT now(),
+                        PRIMARY KEY (coin_id, trade_type, period)
+                    );
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS trade_bars (
+                        coin_id INTEGER NOT NULL REFERENCES coin_pair(coin_id),
+                        trade_type TRADETYPE NOT NULL,
+                        bar_time TIMESTAMP NOT NULL,
+                        last_time TIMESTAMP NOT NULL,
+                        trade_count INTEGER NOT NULL,
+                        open DOUBLE PRECISION NOT NULL,
+                        high DOUBLE PRECISION NOT NULL,
+                        low DOUBLE PRECISION NOT NULL,
+                        close DOUBLE PRECISION NOT NULL,
+                        volume DOUBLE PRECISION NOT NULL,
+                        buy_usd DOUBLE PRECISION NOT NULL,
+                        sell_usd DOUBLE PRECISION NOT NULL,
+                        last_buy DOUBLE PRECISION,
+                        last_sell DOUBLE PRECISION,
+                        last_trade_id BIGINT NOT NULL,
+                        PRIMARY KEY (coin_id, trade_type, bar_time)
+                    );
+                """)
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+
+    @staticmethod
+    def _completed_archives() -> set[tuple[str, str, str]]:
+        """
+        Returns:
+            completed (set[tuple[str, str, str]]): (coin_pair, trade_type, period) of every archive fully loaded into trades.
+        """
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT cp.symbol, m.trade_type::text, m.period
+                    FROM ingest_manifest m
+                    JOIN coin_pair cp ON cp.coin_id = m.coin_id
+                    WHERE m.status = 'complete';
+                """)
+                completed = set(cur.fetchall())
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+        return completed
+
+    @staticmethod
+    async def _mark_archive(cur: AsyncCursor, coin_id: int, trade_type: str, period: str, status: str, row_count: Optional[int] = None, checksum: Optional[str] = None):
+        """
+        Records the status of an archive in the ingest manifest, as part of the cursor's transaction.
+
+        Parameters:
+            cur (AsyncCursor): Cursor of the transaction loading the archive.
+
+            coin_id (int): coin_id of the archive.
+
+            trade_type (str): Trade type of the archive.
+
+            period (str): Day (YYYY-MM-DD) or month (YYYY-MM) of the archive.
+
+            status (str): 'loading' or 'complete'.
+
+            row_count (Optional[int]): Number of trades in the archive.
+
+            checksum (Optional[str]): SHA-256 of the archive.
+        """
+        await cur.execute("""
+            INSERT INTO ingest_manifest (coin_id, trade_type, period, row_count, checksum, status, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, now())
+            ON CONFLICT (coin_id, trade_type, period) DO UPDATE
+            SET row_count = EXCLUDED.row_count,
+                checksum = EXCLUDED.checksum,
+                status = EXCLUDED.status,
+                updated_at = EXCLUDED.updated_at;
+        """, (coin_id, trade_type, period, row_count, checksum, status))
+
+    @staticmethod
+    def _staging_table(coin_id: int, trade_type: str, period: str) -> sql.Identifier:
+        """
+        Returns:
+            staging (sql.Identifier): Name of the staging table an archive is copied into before merging.
+        """
+        return sql.Identifier(f"staging_{coin_id}_{trade_type}_{period.replace('-', '_')}")
+
+    @staticmethod
+    async def _create_staging(staging: sql.Identifier, coin_id: int, trade_type: str, period: str):
+        """
+        Creates an empty unlogged staging table for an archive, replacing any left by an earlier failed run,
+        and marks the archive as loading.
+
+        Parameters:
+            staging (sql.Identifier): Name of the staging table.
+
+            coin_id (int): coin_id of the archive.
+
+            trade_type (str): Trade type of the archive.
+
+            period (str): Day or month of the archive.
+        """
+        conn = await DatabaseSync._get_async_connection()
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(sql.SQL('DROP TABLE IF EXISTS {};').format(staging))
+                await cur.execute(sql.SQL('CREATE UNLOGGED TABLE {} (LIKE trades);').format(staging))
+                await DatabaseSync._mark_archive(cur, coin_id, trade_type, period, 'loading')
+            await conn.commit()
+        finally:
+            await DatabaseSync._release_async_connection(conn)
+
+    @staticmethod
+    async def _merge_staging(staging: sql.Identifier, coin_id: int, trade_type: str, period: str, checksum: str):
+        """
+        Moves an archive's staged trades into trades, skipping trades already there, aggregates its period into trade_bars
+        and marks the archive as complete. All happen in one transaction, so an archive is either fully loaded and recorded or not at all.
+
+        Parameters:
+            staging (sql.Identifier): Name of the staging table.
+
+            coin_id (int): coin_id of the archive.
+
+            trade_type (str): Trade type of the archive.
+
+            period (str): Day or month of the archive.
+
+            checksum (str): SHA-256 of the archive.
+        """
+        conn = await DatabaseSync._get_async_connection()
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(sql.SQL('SELECT count(*) FROM {};').format(staging))
+                row_count = (await cur.fetchone())[0]
+                await cur.execute(sql.SQL("""
+                    INSERT INTO trades (trade_id, coin_id, trade_time, price, quantity, side, trade_type)
+                    SELECT trade_id, coin_id, trade_time, price, quantity, side, trade_type
+                    FROM {}
+                    ON CONFLICT DO NOTHING;
+                """).format(staging))
+                await cur.execute(*DatabaseSync._bars_query(coin_id, trade_type, *DatabaseSync._period_range(period)))
+                await DatabaseSync._mark_archive(cur, coin_id, trade_type, period, 'complete', row_count, checksum)
+                await cur.execute(sql.SQL('DROP TABLE {};').format(staging))
+            await conn.commit()
+        finally:
+            await DatabaseSync._release_async_connection(conn)
     
+    # --- Aggregate Bar Utils --- #
+
+    @staticmethod
+    def _period_range(period: str) -> tuple[datetime, datetime]:
+        """
+        Parameters:
+            period (str): Day (YYYY-MM-DD) or month (YYYY-MM) of an archive.
+
+        Returns:
+            time_range (tuple[datetime, datetime]): Start (inc.) and end (excl.) of the period.
+        """
+        if len(period) == 7:
+            start = datetime.strptime(period, '%Y-%m')
+            return start, start + relativedelta(months=1)
+        start = datetime.strptime(period, '%Y-%m-%d')
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def _bars_query(coin_id: int, trade_type: str, start: datetime, end: datetime) -> tuple[str, tuple]:
+        """
+        Builds the statement that aggregates trades into trade_bars over a time range, replacing the bars already there.
+        The range should cover whole seconds, as archive periods do.
+
+        Parameters:
+            coin_id (int): coin_id of the trades.
+
+            trade_type (str): Trade type of the trades.
+
+            start (datetime): Time (inc.) to aggregate from.
+
+            end (datetime): Time (excl.) to aggregate until.
+
+        Returns:
+            query (tuple[str, tuple]): Statement and parameters for cursor.execute().
+        """
+        return """
+            INSERT INTO trade_bars (
+                coin_id, trade_type, bar_time, last_time, trade_count, open, high, low, close,
+                volume, buy_usd, sell_usd, last_buy, last_sell, last_trade_id
+            )
+            SELECT coin_id, trade_type, date_trunc('second', trade_time), max(trade_time), count(*),
+                   (array_agg(price ORDER BY trade_time, trade_id))[1], max(price), min(price),
+                   (array_agg(price ORDER BY trade_time DESC, trade_id DESC))[1],
+                   sum(quantity),
+                   coalesce(sum(price * quantity) FILTER (WHERE side), 0),
+                   coalesce(sum(price * quantity) FILTER (WHERE NOT side), 0),
+                   (array_agg(price ORDER BY trade_time DESC, trade_id DESC) FILTER (WHERE side))[1],
+                   (array_agg(price ORDER BY trade_time DESC, trade_id DESC) FILTER (WHERE NOT side))[1],
+                   (array_agg(trade_id ORDER BY trade_time DESC, trade_id DESC))[1]
+            FROM trades
+            WHERE coin_id = %s
+            AND trade_type = %s
+            AND trade_time >= %s
+            AND trade_time < %s
+            GROUP BY coin_id, trade_type, date_trunc('second', trade_time)
+            ON CONFLICT (coin_id, trade_type, bar_time) DO UPDATE
+            SET last_time = EXCLUDED.last_time,
+                trade_count = EXCLUDED.trade_count,
+                open = EXCLUDED.open,
+                high = EXCLUDED.high,
+                low = EXCLUDED.low,
+                close = EXCLUDED.close,
+                volume = EXCLUDED.volume,
+                buy_usd = EXCLUDED.buy_usd,
+                sell_usd = EXCLUDED.sell_usd,
+                last_buy = EXCLUDED.last_buy,
+                last_sell = EXCLUDED.last_sell,
+                last_trade_id = EXCLUDED.last_trade_id;
+        """, (coin_id, trade_type, start, end)
+
+    @staticmethod
+    def build_bars(coin_pair: str, trade_type: str, start: datetime, end: datetime):
+        """
+        Aggregates trades already in the database into trade_bars, one day per transaction.
+        Downloads keep trade_bars up to date themselves, this backfills data loaded before trade_bars existed.
+
+        Parameters:
+            coin_pair (str): Coin pair to aggregate.
+
+            trade_type (str): Trade type to aggregate.
+
+            start (datetime): Day (inc.) to aggregate from.
+
+            end (datetime): Day (excl.) to aggregate until.
+        """
+        DatabaseSync._create_schema()
+        coin_id = DatabaseSync.get_coin_id(coin_pair)
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                while day < end:
+                    cur.execute(*DatabaseSync._bars_query(coin_id, trade_type, day, min(day + timedelta(days=1), end)))
+                    conn.commit()
+                    print(f'Aggregated {coin_pair} on {day:%Y-%m-%d}.')
+                    day += timedelta(days=1)
+        finally:
+            DatabaseSync._release_connection(conn)
+
+    @staticmethod
+    def read_bars(coin_pair: str, trade_type: str, start: datetime, end: datetime) -> BarArrays:
+        """
+        Parameters:
+            coin_pair (str): Coin pair to read bars for.
+
+            trade_type (str): Trade type to read bars for.
+
+            start (datetime): Time (inc.) of the first bar.
+
+            end (datetime): Time (excl.) to stop reading at.
+
+        Returns:
+            bars (BarArrays): Per-second bars ordered by time.
+        """
+        coin_id = DatabaseSync.get_coin_id(coin_pair)
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT (EXTRACT(EPOCH FROM bar_time) * 1000000)::int8 * 1000,
+                           (EXTRACT(EPOCH FROM last_time) * 1000000)::int8 * 1000,
+                           trade_count, open, high, low, close, volume, buy_usd, sell_usd,
+                           last_buy, last_sell, last_trade_id
+                    FROM trade_bars
+                    WHERE coin_id = %s
+                    AND trade_type = %s
+                    AND bar_time >= %s
+                    AND bar_time < %s
+                    ORDER BY bar_time;
+                    """, (coin_id, trade_type, start, end)
+                )
+                bars = BarArrays.from_rows(cur.fetchall())
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+        return bars
+
+    # --- Trade Read Utils --- #
+
+    @staticmethod
+    def read_trade_columns(conn: Connection, coin_pair: str, trade_type: str, after: tuple[datetime, int], end: datetime, limit: int) -> TradeArrays:
+        """
+        Reads the next page of trades for a coin pairing as columns, with prices cast to float8 and times to epoch nanoseconds.
+
+        Parameters:
+            conn (Connection): Connection to read with.
+
+            coin_pair (str): Coin pair to read trades for.
+
+            trade_type (str): Trade type to read trades for.
+
+            after (tuple[datetime, int]): (trade_time, trade_id) of the last trade already read (excl.).
+
+            end (datetime): Time (excl.) to stop reading at.
+
+            limit (int): Maximum number of trades to read.
+
+        Returns:
+            trades (TradeArrays): Trades ordered by (trade_time, trade_id).
+        """
+        coin_id = DatabaseSync.get_coin_id(coin_pair)
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT price::float8, quantity::float8, side,
+                       (EXTRACT(EPOCH FROM trade_time) * 1000000)::int8 * 1000, trade_id
+                FROM trades
+                WHERE coin_id = %s
+                AND (trade_time, trade_id) > (%s, %s)
+                AND trade_time >= %s  -- Redundant, but Postgres only prunes partitions on plain comparisons
+                AND trade_time < %s
+                AND trade_type = %s
+                ORDER BY trade_time, trade_id
+                LIMIT %s;
+                """, (coin_id, after[0], after[1], after[0], end, trade_type, limit)
+            )
+            return TradeArrays.from_rows(cur.fetchall())
+
     # --- Mass Insert Utils --- #
 
     @staticmethod
-    def _drop_index():
+    def _partition(coin_id: int, trade_type: str, month: Optional[str] = None) -> str:
+        """
+        Parameters:
+            coin_id (int): coin_id of the partition.
+
+            trade_type (str): Trade type of the partition.
+
+            month (Optional[str]): Month (YYYY-MM) of a leaf partition, or 'default' for the leaf catching any other times.
+            Leave out for the (coin_id, trade_type) partition.
+
+        Returns:
+            partition (str): Name of the partition of trades. Its range index is named with an _index suffix.
+        """
+        name = f'trades_{coin_id}_{trade_type}'
+        return name if month is None else f"{name}_{month.replace('-', '_')}"
+
+    @staticmethod
+    def _leaf_partitions(archives: list[tuple[str, str, str, str]]) -> set[tuple[int, str, str]]:
         """
-        Removes the index from the database for quicker inserts.
+        Parameters:
+            archives (list[tuple[str, str, str, str]]): (url, coin_pair, trade_type, period) of Binance archives.
+
+        Returns:
+            leaves (set[tuple[int, str, str]]): (coin_id, trade_type, month) of every leaf partition the archives load into.
+        """
+        return {(DatabaseSync.get_coin_id(coin_pair), trade_type, period[:7]) for _, coin_pair, trade_type, period in archives}
+
+    @staticmethod
+    def _create_partitions(leaves: set[tuple[int, str, str]]):
+        """
+        Creates any missing partitions of trades down to the given monthly leaves, each with its own range index.
+
+        Parameters:
+            leaves (set[tuple[int, str, str]]): (coin_id, trade_type, month) of the leaf partitions.
+        """
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                for coin_id, trade_type, month in sorted(leaves - DatabaseSync._partitions):
+                    coin_partition = sql.Identifier(f'trades_{coin_id}')
+                    type_partition = sql.Identifier(DatabaseSync._partition(coin_id, trade_type))
+                    start = datetime.strptime(month, '%Y-%m')
+
+                    cur.execute(sql.SQL("""
+                        CREATE TABLE IF NOT EXISTS {} PARTITION OF trades
+                        FOR VALUES IN ({}) PARTITION BY LIST (trade_type);
+                    """).format(coin_partition, sql.Literal(coin_id)))
+                    cur.execute(sql.SQL("""
+                        CREATE TABLE IF NOT EXISTS {} PARTITION OF {}
+                        FOR VALUES IN ({}) PARTITION BY RANGE (trade_time);
+                    """).format(type_partition, coin_partition, sql.Literal(trade_type)))
+                    for partition, bounds in (
+                        (DatabaseSync._partition(coin_id, trade_type, 'default'), sql.SQL('DEFAULT')),
+                        (DatabaseSync._partition(coin_id, trade_type, month), sql.SQL('FOR VALUES FROM ({}) TO ({})').format(
+                            sql.Literal(start), sql.Literal(start + relativedelta(months=1))
+                        ))
+                    ):
+                        cur.execute(sql.SQL('CREATE TABLE IF NOT EXISTS {} PARTITION OF {} {};').format(sql.Identifier(partition), type_partition, bounds))
+                        cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {} ON {} (trade_time, trade_id);').format(
+                            sql.Identifier(f'{partition}_index'), sql.Identifier(partition)
+                        ))
+                    conn.commit()
+                    DatabaseSync._partitions.add((coin_id, trade_type, month))
+        finally:
+            DatabaseSync._release_connection(conn)
+
+    @staticmethod
+    def _drop_index(leaves: set[tuple[int, str, str]]):
+        """
+        Removes the range index from the given leaf partitions for quicker inserts. Other partitions keep theirs.
+
+        Parameters:
+            leaves (set[tuple[int, str, str]]): (coin_id, trade_type, month) of the leaf partitions.
         """
         conn = DatabaseSync._get_connection()
         cur = conn.cursor()
         try:
-            cur.execute('DROP INDEX IF EXISTS trades_index;')
+            for leaf in sorted(leaves):
+                index = f'{DatabaseSync._partition(*leaf)}_index'
+                cur.execute(sql.SQL('DROP INDEX IF EXISTS {};').format(sql.Identifier(index)))
             conn.commit()
         except Exception as e:
             print(f'Error dropping index: {e}')
@@ -145,14 +674,21 @@ class DatabaseSync:
             DatabaseSync._release_connection(conn)
 
     @staticmethod
-    def _recreate_index():
+    def _recreate_index(leaves: set[tuple[int, str, str]]):
         """
-        Reinstates the index after inserting data.
+        Reinstates the range index on the given leaf partitions after inserting data.
+
+        Parameters:
+            leaves (set[tuple[int, str, str]]): (coin_id, trade_type, month) of the leaf partitions.
         """
         conn = DatabaseSync._get_connection()
         cur = conn.cursor()
         try:
-            cur.execute('CREATE INDEX trades_index ON trades (coin_id, trade_type, trade_time);')
+            for leaf in sorted(leaves):
+                partition = DatabaseSync._partition(*leaf)
+                cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {} ON {} (trade_time, trade_id);').format(
+                    sql.Identifier(f'{partition}_index'), sql.Identifier(partition)
+                ))
             conn.commit()
         except Exception as e:
             print(f'Error recreating index: {e}')
@@ -160,6 +696,23 @@ class DatabaseSync:
             cur.close()
             DatabaseSync._release_connection(conn)
 
+    @staticmethod
+    def _analyze(leaves: set[tuple[int, str, str]]):
+        """
+        Refreshes planner statistics of the given leaf partitions only.
+
+        Parameters:
+            leaves (set[tuple[int, str, str]]): (coin_id, trade_type, month) of the leaf partitions.
+        """
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                for leaf in sorted(leaves):
+                    cur.execute(sql.SQL('ANALYZE {};').format(sql.Identifier(DatabaseSync._partition(*leaf))))
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+
     @staticmethod
     def _drop_fk():
         """
@@ -196,89 +749,93 @@ class DatabaseSync:
     # --- Database Insert Implementation --- #
 
     @staticmethod
-    async def _bulk_insert(rows: list[tuple[int, int, datetime, float, float, bool, bool, str]]):
+    async def _bulk_insert(rows: list[tuple[int, int, datetime, float, float, bool, bool, str]], table: sql.Identifier = sql.Identifier('trades')) -> bool:
         """
         Inserts all the provided rows into the database.
 
-        This method uses COPY, so does not check for primary key constraints. Must ensure no duplicate inserts before use.
+        This method uses COPY, so does not check for primary key constraints. Must ensure no duplicate inserts before use,
+        or insert into a staging table and merge it with _merge_staging.
 
         Parameters:
             rows (list[tuple[int, int, datetime, float, float, bool, bool, str]]): List of rows to insert to the trades table.
+
+            table (sql.Identifier): Table to insert into, trades or a staging table with the same columns.
+
+        Returns:
+            inserted (bool): Whether the rows were inserted.
         """
         try:
             conn = await DatabaseSync._get_async_connection()
             async with conn.cursor() as cur:
-                copy_query = """
-                    COPY trades (trade_id, coin_id, trade_time, price, quantity, side, trade_type)
+                copy_query = sql.SQL("""
+                    COPY {} (trade_id, coin_id, trade_time, price, quantity, side, trade_type)
                     FROM STDIN WITH CSV;
-                """
+                """).format(table)
                 async with cur.copy(copy_query) as copy:
-                    with io.StringIO() as buffer:
-                        for row in rows:
-                            buffer.write(','.join(map(str, row)) + '\n')
-                        buffer.seek(0)
+                    with io.StringIO(DatabaseSync._encode_csv(rows)) as buffer:
                         while data := buffer.read(8192):
                             await copy.write(data)
             await conn.commit()
+            return True
         except Exception as e:
             print(f"Error in bulk_insert: {e}")
+            return False
         finally:
             await DatabaseSync._release_async_connection(conn)
 
     @staticmethod
-    async def _download_and_process(url: str):
+    def _encode_csv(rows: list[tuple[int, int, datetime, float, float, bool, bool, str]]) -> str:
         """
-        Download data from the given url and copy it to the database concurrently in chunks.
-
         Parameters:
-            url (str): The url to download a zipfile containing trade data from.
+            rows (list[tuple[int, int, datetime, float, float, bool, bool, str]]): List of rows to insert to the trades table.
+
+        Returns:
+            csv (str): The rows as CSV for COPY.
         """
-        trade_type = url.split('/')[4]
-        coin_pair = url.split('/')[-1].split('-')[0]
-        date_str = '-'.join(url.split('/')[-1].split('-')[2:])[:-4]
-        coin_id = DatabaseSync.get_coin_id(coin_pair)
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    print(f"Failed to download {url}")
-                    return
+        return ''.join(','.join(map(str, row)) + '\n' for row in rows)
 
-                print(f'Downloading {url}')
-                downloaded_data = io.BytesIO(await response.read())
-                print(f'Finished downloading {url}')
-                downloaded_data.seek(0)
+    @staticmethod
+    async def _bulk_insert_binary(data: bytes, table: sql.Identifier = sql.Identifier('trades')) -> bool:
+        """
+        Inserts a chunk of trades encoded by encode_trades into the database, COPY_BLOCK bytes per write.
 
-                with zipfile.ZipFile(downloaded_data) as z:
-                    file_name = z.namelist()[0]
+        Like _bulk_insert, this does not check for primary key constraints.
 
-                    with z.open(file_name) as csv_file:
-                        cols = ['trade_id', 'price', 'quantity', 'quoteqty', 'timestamp', 'is_buyer_maker']
-                        chunk_iterator = pd.read_csv(csv_file, header=None, chunksize=50000, usecols=range(6), names=cols, skiprows=1)
-                        tasks = []
-                        count = 0
-                        for chunk_df in chunk_iterator:
-                            chunk_df['trade_time'] = pd.to_datetime(chunk_df['timestamp'], unit=('us' if trade_type == 'spot' else 'ms'))
-                            chunk_df['side'] = ~chunk_df['is_buyer_maker']
+        Parameters:
+            data (bytes): Binary COPY stream of trades rows.
 
-                            rows = chunk_df[['trade_id', 'trade_time', 'price', 'quantity', 'side']].values.tolist()
-                            rows = [(r[0], coin_id, r[1], r[2], r[3], r[4], trade_type) for r in rows]
+            table (sql.Identifier): Table to insert into, trades or a staging table with the same columns.
 
-                            tasks.append(asyncio.create_task(DatabaseSync._bulk_insert(rows)))
-                            count += 1
+        Returns:
+            inserted (bool): Whether the rows were inserted.
+        """
+        try:
+            conn = await DatabaseSync._get_async_connection()
+            async with conn.cursor() as cur:
+                copy_query = sql.SQL("""
+                    COPY {} (trade_id, coin_id, trade_time, price, quantity, side, trade_type)
+                    FROM STDIN (FORMAT BINARY);
+                """).format(table)
+                async with cur.copy(copy_query) as copy:
+                    view = memoryview(data)
+                    for i in range(0, len(view), COPY_BLOCK):
+                        await copy.write(view[i:i + COPY_BLOCK])
+            await conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error in bulk_insert_binary: {e}")
+            return False
+        finally:
+            await DatabaseSync._release_async_connection(conn)
 
-                            if count == 16:
-                                await asyncio.gather(*tasks)
-                                print(f'16 chunks of {coin_pair} inserted on {date_str}.')
-                                count = 0
-                                tasks = []
+    # --- Download Pipeline --- #
 
-                        await asyncio.gather(*tasks)
-                        print(f'Finished inserting {coin_pair} on {date_str}.')
     @staticmethod
-    async def _download_binance_to_db(coin_pairs: list[tuple[str, str]], start: datetime, end: datetime):
+    def _archive_urls(coin_pairs: list[tuple[str, str]], start: datetime, end: datetime, base_url: str) -> list[tuple[str, str, str, str]]:
         """
-        Loops all dates between start (inc.) and end (excl.) and downloads the data to the database.
+        Lists the Binance archives covering all dates between start (inc.) and end (excl.).
+
+        Monthly archives are used for whole months, daily archives for the days before the first and after the last whole month.
 
         Parameters:
             coin_pairs (list[tuple[str, str]]): List of (coin_pair, trade_type) tuples to download.
@@ -286,38 +843,419 @@ class DatabaseSync:
             start (datetime): Date (inc.) to start download from.
 
             end (datetime): Date (excl.) to end download from.
+
+            base_url (str): Root of the Binance data archive.
+
+        Returns:
+            archives (list[tuple[str, str, str, str]]): (url, coin_pair, trade_type, period) of every archive.
         """
-        for pairing in coin_pairs:
-            coin_pair, trade_type = pairing
+        archives = []
+        for coin_pair, trade_type in coin_pairs:
+            market = 'futures/um' if trade_type == 'futures' else trade_type
+            daily = f'{base_url}/{market}/daily/trades/{coin_pair}/{coin_pair}-trades-'
+            monthly = f'{base_url}/{market}/monthly/trades/{coin_pair}/{coin_pair}-trades-'
             curr = start
 
-            if trade_type == 'futures':
-                trade_type = 'futures/um'
-
             if curr.day != 1:
                 stop = (start + relativedelta(months=1)).replace(day=1)
                 while curr < stop and curr < end:
-                    url = f'https://data.binance.vision/data/{trade_type}/daily/trades/{coin_pair}/{coin_pair}-trades-{curr:%Y-%m-%d}.zip'
-                    await DatabaseSync._download_and_process(url)
+                    archives.append((f'{daily}{curr:%Y-%m-%d}.zip', coin_pair, trade_type, f'{curr:%Y-%m-%d}'))
                     curr += timedelta(days=1)
 
             stop = end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             while curr < stop:
-                url = f'https://data.binance.vision/data/{trade_type}/monthly/trades/{coin_pair}/{coin_pair}-trades-{curr:%Y-%m}.zip'
-                await DatabaseSync._download_and_process(url)
+                archives.append((f'{monthly}{curr:%Y-%m}.zip', coin_pair, trade_type, f'{curr:%Y-%m}'))
                 curr += relativedelta(months=1)
 
             while curr < end:
-                url = f'https://data.binance.vision/data/{trade_type}/daily/trades/{coin_pair}/{coin_pair}-trades-{curr:%Y-%m-%d}.zip'
-                await DatabaseSync._download_and_process(url)
+                archives.append((f'{daily}{curr:%Y-%m-%d}.zip', coin_pair, trade_type, f'{curr:%Y-%m-%d}'))
                 curr += timedelta(days=1)
+        return archives
+
+    @staticmethod
+    async def _download_binance_to_db(
+        coin_pairs: list[tuple[str, str]],
+        start: datetime,
+        end: datetime,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        base_url: str = BINANCE_DATA_URL,
+        ingest_mode: str = 'stream',
+        drop_index: bool = False
+    ):
+        """
+        Downloads every archive between start (inc.) and end (excl.) to the database through a pipeline of stages.
+
+        Up to concurrency archives download at once over one keep-alive session, each spooled to a temporary file.
+        In 'stream' mode, COPY_WORKERS then copy the archives' CSV bytes straight into the database as they are decompressed.
+        In 'csv' and 'binary' mode, PARSE_WORKERS turn the archives into chunks of CSV rows or binary COPY data first,
+        and COPY_WORKERS copy the chunks.
+        The stages are joined by bounded queues, so a slow stage holds back the ones before it.
+
+        Each archive is staged and merged into trades in one transaction that also marks it complete in the ingest manifest,
+        so archives already complete are skipped and a restarted download picks up where it stopped.
+
+        The monthly partitions of trades the archives load into are created first. Only those partitions have their
+        index dropped and rebuilt, and only they are analyzed afterwards.
+
+        Parameters:
+            coin_pairs (list[tuple[str, str]]): List of (coin_pair, trade_type) tuples to download.
+
+            start (datetime): Date (inc.) to start download from.
+
+            end (datetime): Date (excl.) to end download from.
+
+            concurrency (int): Maximum number of archives downloading at once.
+
+            base_url (str): Root of the Binance data archive, for example a local stand-in serving fixture zips.
+
+            ingest_mode (str): How archives reach the database, one of INGEST_MODES.
+
+            drop_index (bool): Whether to drop the index of the partitions being loaded during the download.
+        """
+        if ingest_mode not in INGEST_MODES:
+            raise ValueError(f'Unknown ingest mode: {ingest_mode}')
+
+        completed = DatabaseSync._completed_archives()
+        archives = DatabaseSync._archive_urls(coin_pairs, start, end, base_url)
+        pending = asyncio.Queue()
+        for archive in archives:
+            if archive[1:] not in completed:
+                pending.put_nowait(archive)
+        if pending.qsize() < len(archives):
+            print(f'Skipping {len(archives) - pending.qsize()} archives already loaded.')
+
+        leaves = DatabaseSync._leaf_partitions([a for a in archives if a[1:] not in completed])
+        DatabaseSync._create_partitions(leaves)
+        if drop_index:
+            DatabaseSync._drop_index(leaves)
+            print('Removed index')
+        downloaded = asyncio.Queue(maxsize=concurrency)
+        parsed = asyncio.Queue(maxsize=COPY_WORKERS * 2)
+
+        tasks = []
+        try:
+            connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+            async with aiohttp.ClientSession(connector=connector, timeout=DOWNLOAD_TIMEOUT) as session:
+                downloaders = [asyncio.create_task(DatabaseSync._download_worker(session, pending, downloaded)) for _ in range(concurrency)]
+                if ingest_mode == 'stream':
+                    stages = [[asyncio.create_task(DatabaseSync._stream_worker(downloaded)) for _ in range(COPY_WORKERS)]]
+                else:
+                    binary = ingest_mode == 'binary'
+                    stages = [
+                        [asyncio.create_task(DatabaseSync._parse_worker(downloaded, parsed, binary)) for _ in range(PARSE_WORKERS)],
+                        [asyncio.create_task(DatabaseSync._copy_worker(parsed)) for _ in range(COPY_WORKERS)]
+                    ]
+                tasks = downloaders + [task for workers in stages for task in workers]
+
+                await asyncio.gather(*downloaders)
+                for queue, workers in zip((downloaded, parsed), stages):
+                    for _ in workers:
+                        await queue.put(None)
+                    await asyncio.gather(*workers)
+        finally:
+            # A failed stage leaves the others waiting on their queues, and spooled archives nobody will read
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            while not downloaded.empty():
+                if (item := downloaded.get_nowait()) is not None:
+                    os.remove(item[1])
+
+            if drop_index:
+                DatabaseSync._recreate_index(leaves)
+                print('Recreated index.')
+        DatabaseSync._analyze(leaves)
+
+    @staticmethod
+    async def _download_worker(session: aiohttp.ClientSession, pending: asyncio.Queue, downloaded: asyncio.Queue):
+        """
+        Downloads archives to temporary files until none are pending. Waits while the next stage is behind.
+
+        Parameters:
+            session (aiohttp.ClientSession): Shared session to download with.
+
+            pending (asyncio.Queue): (url, coin_pair, trade_type, period) of the archives left to download.
+
+            downloaded (asyncio.Queue): Queue to put (archive, zip path, checksum) on. Whoever takes a path deletes the file.
+        """
+        while not pending.empty():
+            archive = pending.get_nowait()
+            try:
+                spooled = await DatabaseSync._spool(session, archive[0])
+            except Exception as e:
+                # Any failure of one archive only skips it, it is loaded again next time
+                print(f'Failed to download {archive[0]}: {e!r}')
+                continue
+            if spooled is not None:
+                await downloaded.put((archive, *spooled))
+
+    @staticmethod
+    async def _spool(session: aiohttp.ClientSession, url: str) -> Optional[tuple[str, str]]:
+        """
+        Downloads a file to a temporary file in blocks of DOWNLOAD_BLOCK bytes.
+
+        Parameters:
+            session (aiohttp.ClientSession): Session to download with.
+
+            url (str): The url to download.
+
+        Returns:
+            spooled (Optional[tuple[str, str]]): Path of the temporary file and SHA-256 of its contents, or None if the download failed.
+        """
+        sha256 = hashlib.sha256()
+        spooled = None
+        spool = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+        try:
+            with spool:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        print(f"Failed to download {url}")
+                    else:
+                        print(f'Downloading {url}')
+                        async for block in response.content.iter_chunked(DOWNLOAD_BLOCK):
+                            spool.write(block)
+                            sha256.update(block)
+                        print(f'Finished downloading {url}')
+                        spooled = spool.name, sha256.hexdigest()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f'Failed to download {url}: {e!r}')
+        finally:
+            # Only remove the file once it is closed, Windows cannot remove open files
+            if spooled is None:
+                os.remove(spool.name)
+        return spooled
+
+    @staticmethod
+    async def _parse_worker(downloaded: asyncio.Queue, parsed: asyncio.Queue, binary: bool):
+        """
+        Reads downloaded archives in chunks of rows off the event loop, until it gets None. Waits while the copiers are behind.
+
+        Parameters:
+            downloaded (asyncio.Queue): Queue to get (archive, zip path, checksum) from.
+
+            parsed (asyncio.Queue): Queue to put (staging table, chunk, future) on, with chunks as lists of rows or binary COPY data.
+            The future is set to whether the chunk was copied.
+
+            binary (bool): Whether to encode the chunks for binary COPY.
+        """
+        while (item := await downloaded.get()) is not None:
+            (url, coin_pair, trade_type, period), path, checksum = item
+            coin_id = DatabaseSync.get_coin_id(coin_pair)
+            staging = DatabaseSync._staging_table(coin_id, trade_type, period)
+            try:
+                await DatabaseSync._create_staging(staging, coin_id, trade_type, period)
+                copies = []
+                with zipfile.ZipFile(path) as z:
+                    with z.open(z.namelist()[0]) as csv_file:
+                        chunk_iterator = DatabaseSync._csv_chunks(csv_file)
+                        next_chunk = DatabaseSync._next_chunk
+                        while (chunk := await asyncio.to_thread(next_chunk, chunk_iterator, coin_id, trade_type, binary)) is not None:
+                            copies.append(asyncio.get_running_loop().create_future())
+                            await parsed.put((staging, chunk, copies[-1]))
+                print(f'Finished reading {coin_pair} on {period}.')
+
+                if not all(await asyncio.gather(*copies)):
+                    print(f'Failed to insert {url}, it will be loaded again next time.')
+                    continue
+                await DatabaseSync._merge_staging(staging, coin_id, trade_type, period, checksum)
+            except Exception as e:
+                print(f'Failed to insert {url}: {e}')
+                continue
+            finally:
+                os.remove(path)
+            print(f'Finished inserting {coin_pair} on {period}.')
+
+    @staticmethod
+    async def _copy_worker(parsed: asyncio.Queue):
+        """
+        Copies chunks into their staging tables until it gets None.
+
+        Parameters:
+            parsed (asyncio.Queue): Queue to get (staging table, chunk, future) from.
+        """
+        while (item := await parsed.get()) is not None:
+            staging, chunk, copied = item
+            if isinstance(chunk, bytes):
+                copied.set_result(await DatabaseSync._bulk_insert_binary(chunk, staging))
+            else:
+                copied.set_result(await DatabaseSync._bulk_insert(chunk, staging))
+
+    @staticmethod
+    def _has_header(first_line: bytes) -> bool:
+        """
+        Returns:
+            header (bool): Whether the first line of an archive's CSV is a header. Most Binance archives have none,
+            and their first line is a trade.
+        """
+        return first_line[:1].isalpha()
+
+    @staticmethod
+    def _csv_chunks(csv_file: IO[bytes]) -> Iterator[pd.DataFrame]:
+        """
+        Reads an archive's CSV in chunks of PARSE_CHUNK trades, skipping its first line only if it is a header.
+
+        Parameters:
+            csv_file (IO[bytes]): Seekable CSV file at its start.
+
+        Returns:
+            chunks (Iterator[pd.DataFrame]): trade_id, price, quantity, quoteqty, timestamp and is_buyer_maker of the trades.
+        """
+        skip = 1 if DatabaseSync._has_header(csv_file.readline()) else 0
+        csv_file.seek(0)
+        cols = ['trade_id', 'price', 'quantity', 'quoteqty', 'timestamp', 'is_buyer_maker']
+        return pd.read_csv(csv_file, header=None, chunksize=PARSE_CHUNK, usecols=range(6), names=cols, skiprows=skip)
+
+    @staticmethod
+    def _next_chunk(chunk_iterator, coin_id: int, trade_type: str, binary: bool):
+        """
+        Reads the next chunk of an archive and converts it for COPY.
+
+        Parameters:
+            chunk_iterator (TextFileReader): Chunked reader over the archive's CSV.
+
+            coin_id (int): coin_id of the archive.
+
+            trade_type (str): Trade type of the archive.
+
+            binary (bool): Whether to encode the chunk for binary COPY instead of building rows. Chunks with prices or quantities
+            too large for the binary encoding are built as rows anyway.
+
+        Returns:
+            chunk (Optional[list | bytes]): Rows for _bulk_insert, binary COPY data for _bulk_insert_binary, or None after the last chunk.
+        """
+        chunk_df = next(chunk_iterator, None)
+        if chunk_df is None:
+            return None
+
+        # Binance moved spot timestamps from milliseconds to microseconds in 2025
+        timestamp = chunk_df['timestamp'].to_numpy(dtype=np.int64)
+        to_us = 1 if timestamp[:1].max(initial=0) > 10 ** 15 else 1000
+        side = ~chunk_df['is_buyer_maker'].to_numpy(dtype=np.bool_)
+
+        price = chunk_df['price'].to_numpy()
+        quantity = chunk_df['quantity'].to_numpy()
+        if binary and numeric_fits(price) and numeric_fits(quantity):
+            return encode_trades(
+                chunk_df['trade_id'].to_numpy(),
+                coin_id,
+                timestamp * to_us,
+                price,
+                quantity,
+                side,
+                trade_type
+            )
+
+        chunk_df['trade_time'] = pd.to_datetime(timestamp * to_us, unit='us')
+        chunk_df['side'] = side
+        rows = chunk_df[['trade_id', 'trade_time', 'price', 'quantity', 'side']].values.tolist()
+        return [(r[0], coin_id, r[1], r[2], r[3], r[4], trade_type) for r in rows]
 
     @staticmethod
-    async def _async_calls(coin_pairs: list[tuple[str, str]], start: datetime, end: datetime, drop_index: bool):
+    async def _stream_worker(downloaded: asyncio.Queue):
+        """
+        Streams downloaded archives into the database until it gets None.
+
+        Parameters:
+            downloaded (asyncio.Queue): Queue to get (archive, zip path, checksum) from.
+        """
+        while (item := await downloaded.get()) is not None:
+            (url, coin_pair, trade_type, period), path, checksum = item
+            try:
+                await DatabaseSync._stream_archive(path, coin_pair, trade_type, period, checksum)
+            except Exception as e:
+                print(f'Failed to insert {url}: {e}')
+                continue
+            finally:
+                os.remove(path)
+            print(f'Finished inserting {coin_pair} on {period}.')
+
+    @staticmethod
+    async def _stream_archive(path: str, coin_pair: str, trade_type: str, period: str, checksum: str):
+        """
+        Copies the CSV in a Binance archive into the database without parsing it in Python.
+
+        The CSV is decompressed COPY_BLOCK bytes at a time and copied as is into a temporary staging table,
+        then merged into trades with one INSERT ... SELECT that converts the timestamps and sides and skips trades already there.
+        The archive's period is aggregated into trade_bars and the archive is marked complete in the ingest manifest in the same transaction.
+        Memory use is bounded by the block size, not the archive size.
+
+        Parameters:
+            path (str): Path of the downloaded zip archive.
+
+            coin_pair (str): Coin pair of the archive.
+
+            trade_type (str): Trade type of the archive.
+
+            period (str): Day (YYYY-MM-DD) or month (YYYY-MM) of the archive.
+
+            checksum (str): SHA-256 of the archive.
+        """
+        coin_id = DatabaseSync.get_coin_id(coin_pair)
+        conn = await DatabaseSync._get_async_connection()
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS trades_staging (
+                        trade_id BIGINT,
+                        price NUMERIC,
+                        quantity NUMERIC,
+                        quote_qty NUMERIC,
+                        trade_epoch BIGINT,
+                        is_buyer_maker BOOLEAN,
+                        is_best_match BOOLEAN
+                    ) ON COMMIT DELETE ROWS;
+                """)
+
+                with zipfile.ZipFile(path) as z:
+                    with z.open(z.namelist()[0]) as csv_file:
+                        first = csv_file.readline()
+                        if DatabaseSync._has_header(first):
+                            first = csv_file.readline()
+                        if not first.strip():
+                            await DatabaseSync._mark_archive(cur, coin_id, trade_type, period, 'complete', 0, checksum)
+                            await conn.commit()
+                            return
+
+                        fields = first.split(b',')
+                        # Binance moved spot timestamps from milliseconds to microseconds in 2025
+                        time_unit = '1 microsecond' if int(fields[4]) > 10 ** 15 else '1 millisecond'
+                        columns = ', '.join(STAGING_COLUMNS[:len(fields)])
+
+                        async with cur.copy(f'COPY trades_staging ({columns}) FROM STDIN WITH CSV;') as copy:
+                            await copy.write(first)
+                            while block := await asyncio.to_thread(csv_file.read, COPY_BLOCK):
+                                await copy.write(block)
+
+                await cur.execute("""
+                    INSERT INTO trades (trade_id, coin_id, trade_time, price, quantity, side, trade_type)
+                    SELECT trade_id, %s, TIMESTAMP 'epoch' + trade_epoch * %s::INTERVAL,
+                           price, quantity, NOT is_buyer_maker, %s
+                    FROM trades_staging
+                    ON CONFLICT DO NOTHING;
+                """, (coin_id, time_unit, trade_type))
+                await cur.execute(*DatabaseSync._bars_query(coin_id, trade_type, *DatabaseSync._period_range(period)))
+                await cur.execute('SELECT count(*) FROM trades_staging;')
+                row_count = (await cur.fetchone())[0]
+                await DatabaseSync._mark_archive(cur, coin_id, trade_type, period, 'complete', row_count, checksum)
+            await conn.commit()
+        finally:
+            await DatabaseSync._release_async_connection(conn)
+
+    @staticmethod
+    async def _async_calls(
+        coin_pairs: list[tuple[str, str]],
+        start: datetime,
+        end: datetime,
+        drop_index: bool,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        base_url: str = BINANCE_DATA_URL,
+        ingest_mode: str = 'stream'
+    ):
         """
         Makes all async function calls sequentially.
         
-        Preps database for download before downloading anything by removing index/FK if specified.
+        Creates the schema if needed before downloading anything. The download removes the index of the partitions
+        it loads if specified.
 
         FK dropping not currently implemented.
 
@@ -329,31 +1267,34 @@ class DatabaseSync:
             end (datetime): Date (excl.) to end download from.
 
             drop_index (bool): Whether index should be dropped before download.
+
+            concurrency (int): Maximum number of archives downloading at once.
+
+            base_url (str): Root of the Binance data archive.
+
+            ingest_mode (str): How archives reach the database, one of INGEST_MODES.
         """
         start = start.replace(hour=0, minute=0, second=0, microsecond=0)
         end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+        DatabaseSync._create_schema()
         if coin_pairs == None:
             coin_pairs = DatabaseSync._get_existing_pairings()
-        if drop_index:
-            DatabaseSync._drop_index()
-            print('Removed index')
 
         await DatabaseSync.pool.open()
-        await DatabaseSync._download_binance_to_db(coin_pairs, start, end)
+        await DatabaseSync._download_binance_to_db(coin_pairs, start, end, concurrency, base_url, ingest_mode, drop_index)
         await DatabaseSync.pool.close()
 
         print('Successfully inserted all data.')
 
-        if drop_index:
-            DatabaseSync._recreate_index()
-            print('Recreated index.')
-
     @staticmethod
     def start_binance_download(
         coin_pairs: Optional[List[Tuple[str, str]]] = None,
         start: datetime = datetime.now() - timedelta(days=1),
         end: datetime = datetime.now(),
-        drop_index: bool = False        
+        drop_index: bool = False,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        base_url: str = BINANCE_DATA_URL,
+        ingest_mode: str = 'stream'
     ):
         """
         Starts concurrent download of Binance data to Postgres DB.
@@ -365,9 +1306,16 @@ class DatabaseSync:
 
             end (datetime): Date (excl.) to end download from. Defaults to today.
 
-            drop_index (bool): Whether index should be dropped before download. Defaults to not dropping index.
+            drop_index (bool): Whether the index of the partitions being loaded should be dropped during download. Defaults to not dropping index.
+
+            concurrency (int): Maximum number of archives downloading at once. Defaults to DOWNLOAD_CONCURRENCY.
+
+            base_url (str): Root of the Binance data archive. Defaults to the BINANCE_DATA_URL environment variable or data.binance.vision.
+
+            ingest_mode (str): 'stream' to copy the archives' CSV bytes straight into the database, 'csv' to parse them into rows first,
+            or 'binary' to parse them into binary COPY data first. Defaults to streaming.
         """
-        asyncio.run(DatabaseSync._async_calls(coin_pairs, start, end, drop_index))
+        asyncio.run(DatabaseSync._async_calls(coin_pairs, start, end, drop_index, concurrency, base_url, ingest_mode))
 
 if __name__ == '__main__':
     download_list = [
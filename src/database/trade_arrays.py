@@ -0,0 +1,208 @@
+import os
+import numpy as np
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+COLUMNS = ('price', 'quantity', 'side', 'time_ns', 'trade_id')
+
+class TradeArrays:
+    """
+    Columnar view of a trade stream, ordered by (trade_time, trade_id).
+
+    Every column is a contiguous NumPy array of the same length, so slicing returns views instead of copies.
+    """
+
+    __slots__ = ('price', 'quantity', 'side', 'time_ns', 'trade_id', 'offset')
+
+    def __init__(self, price, quantity, side, time_ns, trade_id, offset: int = 0):
+        """
+        Parameters:
+            price (ArrayLike): Trade prices.
+
+            quantity (ArrayLike): Trade sizes in the base asset.
+
+            side (ArrayLike): True for buyer-initiated trades, False for seller-initiated trades.
+
+            time_ns (ArrayLike): Trade times as integer nanoseconds since the Unix epoch.
+
+            trade_id (ArrayLike): Exchange trade IDs.
+
+            offset (int): Index of the first trade in the stream this view was sliced from.
+        """
+        self.price = np.ascontiguousarray(price, dtype=np.float64)
+        self.quantity = np.ascontiguousarray(quantity, dtype=np.float64)
+        self.side = np.ascontiguousarray(side, dtype=np.bool_)
+        self.time_ns = np.ascontiguousarray(time_ns, dtype=np.int64)
+        self.trade_id = np.ascontiguousarray(trade_id, dtype=np.int64)
+        self.offset = offset
+
+    # --- Constructors --- #
+
+    @staticmethod
+    def empty() -> 'TradeArrays':
+        """
+        Returns:
+            trades (TradeArrays): A stream with no trades.
+        """
+        return TradeArrays([], [], [], [], [])
+
+    @staticmethod
+    def from_rows(rows: list[tuple[float, float, bool, int, int]]) -> 'TradeArrays':
+        """
+        Builds the columns from (price, quantity, side, time_ns, trade_id) rows.
+
+        Parameters:
+            rows (list[tuple[float, float, bool, int, int]]): Rows as returned by the database.
+
+        Returns:
+            trades (TradeArrays): The rows as columns.
+        """
+        if not rows:
+            return TradeArrays.empty()
+        price, quantity, side, time_ns, trade_id = zip(*rows)
+        return TradeArrays(price, quantity, side, time_ns, trade_id)
+
+    @staticmethod
+    def concat(parts: list['TradeArrays']) -> 'TradeArrays':
+        """
+        Joins consecutive pieces of one stream into a single contiguous stream.
+
+        Parameters:
+            parts (list[TradeArrays]): Pieces in stream order.
+
+        Returns:
+            trades (TradeArrays): All pieces in one set of arrays.
+        """
+        if not parts:
+            return TradeArrays.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return TradeArrays(
+            np.concatenate([p.price for p in parts]),
+            np.concatenate([p.quantity for p in parts]),
+            np.concatenate([p.side for p in parts]),
+            np.concatenate([p.time_ns for p in parts]),
+            np.concatenate([p.trade_id for p in parts])
+        )
+
+    # --- Views --- #
+
+    def __len__(self):
+        return len(self.price)
+
+    def slice(self, start: int, stop: int) -> 'TradeArrays':
+        """
+        Parameters:
+            start (int): First index (inc.) of the view.
+
+            stop (int): Last index (excl.) of the view.
+
+        Returns:
+            trades (TradeArrays): A zero-copy view of the given range.
+        """
+        return TradeArrays(
+            self.price[start:stop],
+            self.quantity[start:stop],
+            self.side[start:stop],
+            self.time_ns[start:stop],
+            self.trade_id[start:stop],
+            self.offset + start
+        )
+
+    def between(self, start: datetime, end: datetime) -> 'TradeArrays':
+        """
+        Parameters:
+            start (datetime): Time (inc.) of the first trade in the view.
+
+            end (datetime): Time (excl.) to end the view at.
+
+        Returns:
+            trades (TradeArrays): A zero-copy view of the trades in the given time range.
+        """
+        lo, hi = np.searchsorted(self.time_ns, [TradeArrays.to_ns(start), TradeArrays.to_ns(end)], side='left')
+        return self.slice(int(lo), int(hi))
+
+    # --- Storage --- #
+
+    def save(self, path: str):
+        """
+        Writes each column to its own .npy file in the given directory.
+
+        Parameters:
+            path (str): Directory to write the columns to.
+        """
+        os.makedirs(path, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(path, f'{column}.npy'), getattr(self, column))
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'TradeArrays':
+        """
+        Reads columns written by save().
+
+        Parameters:
+            path (str): Directory the columns were saved to.
+
+            mmap (bool): Whether to memory-map the files read-only instead of reading them into memory.
+
+        Returns:
+            trades (TradeArrays): The saved trades.
+        """
+        mode = 'r' if mmap else None
+        return TradeArrays(*(np.load(os.path.join(path, f'{column}.npy'), mmap_mode=mode) for column in COLUMNS))
+
+    # --- Derived Columns --- #
+
+    def usd(self) -> np.ndarray:
+        """
+        Returns:
+            usd (np.ndarray): USD notional of each trade.
+        """
+        return self.price * self.quantity
+
+    def last_prices(self, last_buy: float = np.nan, last_sell: float = np.nan) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Forward fills the latest buy and sell price seen at each trade (NaN until a side has traded).
+
+        Parameters:
+            last_buy (float): Latest buy price before the first trade of this stream.
+
+            last_sell (float): Latest sell price before the first trade of this stream.
+
+        Returns:
+            last_prices (tuple[np.ndarray, np.ndarray]): Latest buy prices and latest sell prices.
+        """
+        return (
+            TradeArrays._forward_fill(self.price, self.side, last_buy),
+            TradeArrays._forward_fill(self.price, ~self.side, last_sell)
+        )
+
+    @staticmethod
+    def _forward_fill(price: np.ndarray, mask: np.ndarray, initial: float) -> np.ndarray:
+        index = np.where(mask, np.arange(len(price)), -1)
+        np.maximum.accumulate(index, out=index)
+        filled = price[index]
+        filled[index < 0] = initial
+        return filled
+
+    @staticmethod
+    def to_datetime(time_ns: int) -> datetime:
+        """
+        Parameters:
+            time_ns (int): Nanoseconds since the Unix epoch.
+
+        Returns:
+            time (datetime): The same instant as a naive UTC datetime, matching the trade_time column.
+        """
+        return EPOCH + timedelta(microseconds=int(time_ns) // 1000)
+
+    @staticmethod
+    def to_ns(time: datetime) -> int:
+        """
+        Parameters:
+            time (datetime): Naive UTC datetime.
+
+        Returns:
+            time_ns (int): Nanoseconds since the Unix epoch.
+        """
+        return ((time - EPOCH) // timedelta(microseconds=1)) * 1000
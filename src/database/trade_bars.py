@@ -0,0 +1,177 @@
+import os
+import numpy as np
+from datetime import datetime
+from .trade_arrays import TradeArrays
+
+BAR_NS = 1_000_000_000  # Bars are one second long
+BAR_COLUMNS = (
+    'time_ns', 'last_time_ns', 'trade_count', 'open', 'high', 'low', 'close',
+    'volume', 'buy_usd', 'sell_usd', 'last_buy', 'last_sell', 'last_trade_id'
+)
+BAR_DTYPES = (
+    np.int64, np.int64, np.int64, np.float64, np.float64, np.float64, np.float64,
+    np.float64, np.float64, np.float64, np.float64, np.float64, np.int64
+)
+
+class BarArrays:
+    """
+    Columnar per-interval aggregates of a trade stream, one row per interval that had trades, ordered by time.
+
+    Each bar holds what coarse strategies read from the trades: OHLC, base volume, buy and sell USD volume,
+    the last buy and sell price (NaN if that side did not trade) and the trade count.
+    """
+
+    __slots__ = BAR_COLUMNS
+
+    def __init__(self, *columns):
+        """
+        Parameters:
+            columns (ArrayLike): One array per name in BAR_COLUMNS, in that order. time_ns is the start of each bar,
+            last_time_ns and last_trade_id belong to its last trade.
+        """
+        for name, dtype, column in zip(BAR_COLUMNS, BAR_DTYPES, columns, strict=True):
+            setattr(self, name, np.ascontiguousarray(column, dtype=dtype))
+
+    # --- Constructors --- #
+
+    @staticmethod
+    def empty() -> 'BarArrays':
+        return BarArrays(*([] for _ in BAR_COLUMNS))
+
+    @staticmethod
+    def from_rows(rows: list[tuple]) -> 'BarArrays':
+        """
+        Parameters:
+            rows (list[tuple]): Rows of the trade_bars columns in BAR_COLUMNS order, with NULL prices as None.
+
+        Returns:
+            bars (BarArrays): The rows as columns.
+        """
+        if not rows:
+            return BarArrays.empty()
+        columns = [np.array(c, dtype=np.float64 if dtype == np.float64 else None) for c, dtype in zip(zip(*rows), BAR_DTYPES)]
+        return BarArrays(*columns)
+
+    @staticmethod
+    def from_trades(trades: TradeArrays, bar_ns: int = BAR_NS) -> 'BarArrays':
+        """
+        Aggregates trades into bars aligned to the epoch, the same way DatabaseSync fills trade_bars.
+
+        Parameters:
+            trades (TradeArrays): Trades in stream order.
+
+            bar_ns (int): Length of a bar in nanoseconds.
+
+        Returns:
+            bars (BarArrays): One bar per interval with trades.
+        """
+        if len(trades) == 0:
+            return BarArrays.empty()
+
+        bar = trades.time_ns // bar_ns
+        starts = np.flatnonzero(np.diff(bar, prepend=bar[0] - 1))
+        lasts = np.append(starts[1:], len(trades)) - 1
+
+        usd = trades.usd()
+        last_buys, last_sells = trades.last_prices()
+        buys = np.add.reduceat(trades.side.astype(np.int64), starts)
+        counts = lasts - starts + 1
+        return BarArrays(
+            bar[starts] * bar_ns,
+            trades.time_ns[lasts],
+            counts,
+            trades.price[starts],
+            np.maximum.reduceat(trades.price, starts),
+            np.minimum.reduceat(trades.price, starts),
+            trades.price[lasts],
+            np.add.reduceat(trades.quantity, starts),
+            np.add.reduceat(np.where(trades.side, usd, 0.0), starts),
+            np.add.reduceat(np.where(trades.side, 0.0, usd), starts),
+            np.where(buys > 0, last_buys[lasts], np.nan),
+            np.where(buys < counts, last_sells[lasts], np.nan),
+            trades.trade_id[lasts]
+        )
+
+    @staticmethod
+    def concat(parts: list['BarArrays']) -> 'BarArrays':
+        """
+        Parameters:
+            parts (list[BarArrays]): Consecutive pieces in time order.
+
+        Returns:
+            bars (BarArrays): All pieces in one set of arrays.
+        """
+        if not parts:
+            return BarArrays.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return BarArrays(*(np.concatenate([getattr(p, name) for p in parts]) for name in BAR_COLUMNS))
+
+    # --- Views --- #
+
+    def __len__(self):
+        return len(self.time_ns)
+
+    def between(self, start: datetime, end: datetime) -> 'BarArrays':
+        """
+        Returns:
+            bars (BarArrays): A zero-copy view of the bars starting in the given time range.
+        """
+        lo, hi = np.searchsorted(self.time_ns, [TradeArrays.to_ns(start), TradeArrays.to_ns(end)], side='left')
+        return BarArrays(*(getattr(self, name)[lo:hi] for name in BAR_COLUMNS))
+
+    # --- Storage --- #
+
+    def save(self, path: str):
+        """
+        Writes each column to its own .npy file in the given directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        for column in BAR_COLUMNS:
+            np.save(os.path.join(path, f'{column}.npy'), getattr(self, column))
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'BarArrays':
+        """
+        Reads columns written by save(), memory-mapped read-only unless mmap is False.
+        """
+        mode = 'r' if mmap else None
+        return BarArrays(*(np.load(os.path.join(path, f'{column}.npy'), mmap_mode=mode) for column in BAR_COLUMNS))
+
+    # --- Derived Columns --- #
+
+    def vwap(self) -> np.ndarray:
+        """
+        Returns:
+            vwap (np.ndarray): Volume weighted average price of each bar.
+        """
+        return (self.buy_usd + self.sell_usd) / self.volume
+
+    def to_trades(self) -> TradeArrays:
+        """
+        Collapses each bar into at most one buy and one sell at the time of its last trade, for replaying bars
+        through code written for trades.
+
+        The buy trades at the bar's last buy price for the bar's buy USD volume, the sell likewise, and the side that
+        traded last comes second. USD volumes, last buy and sell prices and flush timing therefore match the full stream
+        at bar resolution, while base quantities are only implied by the USD volumes.
+
+        Returns:
+            trades (TradeArrays): Up to two trades per bar, ordered by time.
+        """
+        # Row 0 trades first and row 1 second, with the side of the bar's last trade second
+        buy_last = self.close == self.last_buy
+        side = np.stack((~buy_last, buy_last))
+        price = np.where(side, self.last_buy, self.last_sell)
+        usd = np.where(side, self.buy_usd, self.sell_usd)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            quantity = usd / price
+
+        keep = ((usd > 0) & ~np.isnan(price)).T.ravel()
+        return TradeArrays(
+            price.T.ravel()[keep],
+            quantity.T.ravel()[keep],
+            side.T.ravel()[keep],
+            np.repeat(self.last_time_ns, 2)[keep],
+            np.repeat(self.last_trade_id, 2)[keep]
+        )
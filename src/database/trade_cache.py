@@ -0,0 +1,252 @@
+import os
+import io
+import shutil
+import zipfile
+import requests
+import numpy as np
+import pandas as pd
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from .trade_arrays import TradeArrays
+from .trade_bars import BarArrays
+from .database_sync import DatabaseSync
+from .trade_reader import BinaryCopyTradeReader
+
+load_dotenv()
+CACHE_DIR = os.getenv('TRADE_CACHE_DIR', 'trade_cache')
+
+class TradeCache:
+    """
+    Local on-disk cache of trades in front of Postgres.
+
+    Each (coin_pair, trade_type, day) is stored as one .npy file per column and memory-mapped read-only when loaded,
+    so repeated backtests over the same days never query the database.
+    Missing days are filled from Postgres, or straight from the Binance daily archives.
+    Per-second bars of each day are cached the same way, next to the trades.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, fill_from: str = 'db'):
+        """
+        Parameters:
+            root (str): Directory to keep the cache in. Defaults to the TRADE_CACHE_DIR environment variable or ./trade_cache.
+
+            fill_from (str): Where to fill missing days from, 'db' or 'binance'. Defaults to the database.
+        """
+        if fill_from not in ('db', 'binance'):
+            raise ValueError(f'Unknown cache fill source: {fill_from}')
+        self.root = root
+        self.fill_from = fill_from
+
+    # --- Cache Lookup --- #
+
+    def load(self, coin_pair: str, trade_type: str, start: datetime, end: datetime) -> TradeArrays:
+        """
+        Gets all trades between start (inc.) and end (excl.), filling any missing days first.
+
+        A range within a single day is a zero-copy view of the memory-mapped files, longer ranges are joined into one set of arrays.
+
+        Parameters:
+            coin_pair (str): Coin pair to load.
+
+            trade_type (str): Trade type to load.
+
+            start (datetime): Time (inc.) to load trades from.
+
+            end (datetime): Time (excl.) to load trades until.
+
+        Returns:
+            trades (TradeArrays): Trades ordered by (trade_time, trade_id).
+        """
+        parts = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            trades = self.get_day(coin_pair, trade_type, day)
+            if trades is None:
+                trades = self.fill_day(coin_pair, trade_type, day)
+            parts.append(trades.between(max(start, day), min(end, day + timedelta(days=1))))
+            day += timedelta(days=1)
+        return TradeArrays.concat([p for p in parts if len(p)])
+
+    def get_day(self, coin_pair: str, trade_type: str, day: datetime) -> Optional[TradeArrays]:
+        """
+        Parameters:
+            coin_pair (str): Coin pair to look up.
+
+            trade_type (str): Trade type to look up.
+
+            day (datetime): Day to look up.
+
+        Returns:
+            trades (Optional[TradeArrays]): Memory-mapped trades of the day, or None if the day is not cached.
+        """
+        path = self._day_path(coin_pair, trade_type, day)
+        if not os.path.isdir(path):
+            return None
+        return TradeArrays.load(path)
+
+    def put_day(self, coin_pair: str, trade_type: str, day: datetime, trades: TradeArrays):
+        """
+        Stores the trades of one day. Written to a temporary directory first so readers never see a partial day.
+
+        Parameters:
+            coin_pair (str): Coin pair of the trades.
+
+            trade_type (str): Trade type of the trades.
+
+            day (datetime): Day the trades belong to.
+
+            trades (TradeArrays): All trades of the day.
+        """
+        TradeCache._put(self._day_path(coin_pair, trade_type, day), trades)
+
+    @staticmethod
+    def _put(path: str, arrays: TradeArrays | BarArrays):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        arrays.save(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process cached the same day first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def evict(self, coin_pair: str, trade_type: str, day: datetime):
+        """
+        Removes a cached day and its bars, for example after its data was reloaded into the database.
+
+        Parameters:
+            coin_pair (str): Coin pair to evict.
+
+            trade_type (str): Trade type to evict.
+
+            day (datetime): Day to evict.
+        """
+        shutil.rmtree(self._day_path(coin_pair, trade_type, day), ignore_errors=True)
+        shutil.rmtree(self._bars_path(coin_pair, trade_type, day), ignore_errors=True)
+
+    def _day_path(self, coin_pair: str, trade_type: str, day: datetime) -> str:
+        return os.path.join(self.root, trade_type, coin_pair, f'{day:%Y-%m-%d}')
+
+    def _bars_path(self, coin_pair: str, trade_type: str, day: datetime) -> str:
+        return os.path.join(self.root, 'bars', trade_type, coin_pair, f'{day:%Y-%m-%d}')
+
+    # --- Bars --- #
+
+    def load_bars(self, coin_pair: str, trade_type: str, start: datetime, end: datetime) -> BarArrays:
+        """
+        Gets the per-second bars between start (inc.) and end (excl.), filling any missing days first.
+
+        Parameters:
+            coin_pair (str): Coin pair to load.
+
+            trade_type (str): Trade type to load.
+
+            start (datetime): Time (inc.) to load bars from.
+
+            end (datetime): Time (excl.) to load bars until.
+
+        Returns:
+            bars (BarArrays): Bars ordered by time.
+        """
+        parts = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            path = self._bars_path(coin_pair, trade_type, day)
+            bars = BarArrays.load(path) if os.path.isdir(path) else self.fill_bars_day(coin_pair, trade_type, day)
+            parts.append(bars.between(max(start, day), min(end, day + timedelta(days=1))))
+            day += timedelta(days=1)
+        return BarArrays.concat([p for p in parts if len(p)])
+
+    def fill_bars_day(self, coin_pair: str, trade_type: str, day: datetime) -> BarArrays:
+        """
+        Gets the bars of a missing day and caches them, under the same rules as fill_day.
+
+        When filling from the database the bars are read from trade_bars. Otherwise, or if trade_bars has nothing
+        for the day, they are aggregated from the day's trades.
+
+        Parameters:
+            coin_pair (str): Coin pair to fill.
+
+            trade_type (str): Trade type to fill.
+
+            day (datetime): Day to fill.
+
+        Returns:
+            bars (BarArrays): All bars of the day.
+        """
+        bars = BarArrays.empty()
+        if self.fill_from == 'db':
+            bars = DatabaseSync.read_bars(coin_pair, trade_type, day, day + timedelta(days=1))
+        if len(bars) == 0:
+            trades = self.get_day(coin_pair, trade_type, day)
+            if trades is None:
+                trades = self.fill_day(coin_pair, trade_type, day)
+            bars = BarArrays.from_trades(trades)
+
+        if len(bars) and day + timedelta(days=1) <= datetime.now(timezone.utc).replace(tzinfo=None):
+            path = self._bars_path(coin_pair, trade_type, day)
+            TradeCache._put(path, bars)
+            return BarArrays.load(path)
+        return bars
+
+    # --- Cache Fill --- #
+
+    def fill_day(self, coin_pair: str, trade_type: str, day: datetime) -> TradeArrays:
+        """
+        Reads a missing day from the fill source and caches it.
+
+        Days that are not over yet or have no trades are returned without being cached, so they are read again next time.
+
+        Parameters:
+            coin_pair (str): Coin pair to fill.
+
+            trade_type (str): Trade type to fill.
+
+            day (datetime): Day to fill.
+
+        Returns:
+            trades (TradeArrays): All trades of the day.
+        """
+        if self.fill_from == 'binance':
+            trades = TradeCache._read_binance_day(coin_pair, trade_type, day)
+        else:
+            trades = TradeCache._read_db_day(coin_pair, trade_type, day)
+
+        if len(trades) and day + timedelta(days=1) <= datetime.now(timezone.utc).replace(tzinfo=None):
+            self.put_day(coin_pair, trade_type, day, trades)
+            return self.get_day(coin_pair, trade_type, day)
+        return trades
+
+    @staticmethod
+    def _read_db_day(coin_pair: str, trade_type: str, day: datetime) -> TradeArrays:
+        return TradeArrays.concat(list(BinaryCopyTradeReader(coin_pair, trade_type, day, day + timedelta(days=1))))
+
+    @staticmethod
+    def _read_binance_day(coin_pair: str, trade_type: str, day: datetime) -> TradeArrays:
+        market = 'futures/um' if trade_type == 'futures' else trade_type
+        url = f'https://data.binance.vision/data/{market}/daily/trades/{coin_pair}/{coin_pair}-trades-{day:%Y-%m-%d}.zip'
+        response = requests.get(url)
+        if response.status_code != 200:
+            print(f'Failed to download {url}')
+            return TradeArrays.empty()
+
+        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+            file_name = z.namelist()[0]
+            with z.open(file_name) as csv_file:
+                has_header = not csv_file.readline()[:1].isdigit()
+            with z.open(file_name) as csv_file:
+                cols = ['trade_id', 'price', 'quantity', 'quoteqty', 'timestamp', 'is_buyer_maker']
+                df = pd.read_csv(csv_file, header=None, usecols=range(6), names=cols, skiprows=int(has_header))
+
+        # Binance moved spot timestamps from milliseconds to microseconds in 2025
+        timestamp = df['timestamp'].to_numpy(dtype=np.int64)
+        time_ns = timestamp * (1000 if timestamp[:1].max(initial=0) > 10 ** 15 else 1000000)
+        trades = TradeArrays(
+            df['price'].to_numpy(),
+            df['quantity'].to_numpy(),
+            ~df['is_buyer_maker'].to_numpy(dtype=np.bool_),
+            time_ns,
+            df['trade_id'].to_numpy()
+        )
+        order = np.lexsort((trades.trade_id, trades.time_ns))
+        return TradeArrays(trades.price[order], trades.quantity[order], trades.side[order], trades.time_ns[order], trades.trade_id[order])
@@ -0,0 +1,200 @@
+import threading
+import queue
+import numpy as np
+from typing import Iterator
+from datetime import datetime
+from .database_sync import DatabaseSync
+from .trade_arrays import TradeArrays
+
+MEMORY_LIMIT = 512 * 1024 * 1024  # bytes
+ROW_BYTES = 256  # Peak bytes per row while a fetched chunk is turned into arrays
+PREFETCH = 1  # Chunks fetched ahead of the one being handled
+
+# Binary COPY layout of one (price::float8, quantity::float8, side, trade_time, trade_id::int8) row
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_ROW = np.dtype([
+    ('fields', '>i2'),
+    ('price_len', '>i4'), ('price', '>f8'),
+    ('quantity_len', '>i4'), ('quantity', '>f8'),
+    ('side_len', '>i4'), ('side', '?'),
+    ('time_len', '>i4'), ('time_us', '>i8'),
+    ('trade_id_len', '>i4'), ('trade_id', '>i8')
+])
+PG_EPOCH_NS = 946684800 * 1000000000  # 2000-01-01, the zero of Postgres timestamps
+
+class TradeReader:
+    """
+    Streams trades for a coin pairing from Postgres in bounded chunks, through a named server-side cursor.
+
+    Each chunk is decoded straight into TradeArrays. A background thread fetches the next chunk while the caller
+    handles the current one, and at most PREFETCH chunks wait in between, so memory stays under the given ceiling.
+    """
+
+    row_bytes = ROW_BYTES
+
+    def __init__(
+        self,
+        coin_pair: str,
+        trade_type: str,
+        start: datetime,
+        end: datetime,
+        after_id: int = -1,
+        memory_limit: int = MEMORY_LIMIT
+    ):
+        """
+        Parameters:
+            coin_pair (str): Coin pair to read trades for.
+
+            trade_type (str): Trade type to read trades for.
+
+            start (datetime): Time to read trades from, together with after_id.
+
+            end (datetime): Time (excl.) to stop reading at.
+
+            after_id (int): Trade ID of the last trade already read at start (excl.). Defaults to reading every trade at start.
+
+            memory_limit (int): Rough ceiling in bytes on the chunks held at once, fetching, waiting and being handled.
+        """
+        self.coin_pair = coin_pair
+        self.trade_type = trade_type
+        self.start = start
+        self.end = end
+        self.after_id = after_id
+        self.chunk_size = max(memory_limit // (self.row_bytes * (PREFETCH + 2)), 1)
+
+    def __iter__(self) -> Iterator[TradeArrays]:
+        """
+        Returns:
+            chunks (Iterator[TradeArrays]): Consecutive chunks of the stream, ordered by (trade_time, trade_id).
+        """
+        chunks = queue.Queue(maxsize=PREFETCH)
+        stop = threading.Event()
+        fetcher = threading.Thread(target=self._fetch, args=(chunks, stop), daemon=True)
+        fetcher.start()
+
+        try:
+            while (chunk := chunks.get()) is not None:
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        finally:
+            # Unblocks the fetcher if the caller stops early
+            stop.set()
+            while fetcher.is_alive():
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    fetcher.join(0.1)
+
+    def _fetch(self, chunks: queue.Queue, stop: threading.Event):
+        try:
+            for chunk in self._read_chunks():
+                if stop.is_set():
+                    return
+                chunks.put(chunk)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    def _read_chunks(self) -> Iterator[TradeArrays]:
+        coin_id = DatabaseSync.get_coin_id(self.coin_pair)
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor(name='trade_reader') as cur:
+                cur.itersize = self.chunk_size
+                cur.execute("""
+                    SELECT price::float8, quantity::float8, side,
+                           (EXTRACT(EPOCH FROM trade_time) * 1000000)::int8 * 1000, trade_id
+                    FROM trades
+                    WHERE coin_id = %s
+                    AND (trade_time, trade_id) > (%s, %s)
+                    AND trade_time >= %s  -- Redundant, but Postgres only prunes partitions on plain comparisons
+                    AND trade_time < %s
+                    AND trade_type = %s
+                    ORDER BY trade_time, trade_id;
+                    """, (coin_id, self.start, self.after_id, self.start, self.end, self.trade_type)
+                )
+                while rows := cur.fetchmany(self.chunk_size):
+                    yield TradeArrays.from_rows(rows)
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+
+class BinaryCopyTradeReader(TradeReader):
+    """
+    TradeReader that reads through COPY ... TO STDOUT (FORMAT BINARY) instead of a cursor.
+
+    Every row of the query has the same fixed width, so the stream is parsed with a single structured
+    NumPy dtype per chunk instead of adapting each value to a Python object.
+    """
+
+    row_bytes = 2 * COPY_ROW.itemsize + 33  # Raw buffer, parsed rows and the arrays
+
+    def _read_chunks(self) -> Iterator[TradeArrays]:
+        coin_id = DatabaseSync.get_coin_id(self.coin_pair)
+        conn = DatabaseSync._get_connection()
+        try:
+            with conn.cursor() as cur:
+                with cur.copy("""
+                    COPY (
+                        SELECT price::float8, quantity::float8, side, trade_time, trade_id::int8
+                        FROM trades
+                        WHERE coin_id = %s
+                        AND (trade_time, trade_id) > (%s, %s)
+                        AND trade_time >= %s  -- Redundant, but Postgres only prunes partitions on plain comparisons
+                        AND trade_time < %s
+                        AND trade_type = %s
+                        ORDER BY trade_time, trade_id
+                    ) TO STDOUT (FORMAT BINARY);
+                    """, (coin_id, self.start, self.after_id, self.start, self.end, self.trade_type)
+                ) as copy:
+                    yield from BinaryCopyTradeReader.parse(copy, self.chunk_size)
+            conn.commit()
+        finally:
+            DatabaseSync._release_connection(conn)
+
+    @staticmethod
+    def parse(blocks: Iterator[bytes], chunk_size: int) -> Iterator[TradeArrays]:
+        """
+        Parses a binary COPY stream of trade rows into chunks.
+
+        Parameters:
+            blocks (Iterator[bytes]): The COPY output, split anywhere.
+
+            chunk_size (int): Number of rows per chunk, except the last.
+
+        Returns:
+            chunks (Iterator[TradeArrays]): The rows in stream order.
+        """
+        buffer = bytearray()
+        header = True
+        for block in blocks:
+            buffer += block
+            if header:
+                if len(buffer) < 19:
+                    continue
+                if buffer[:11] != COPY_SIGNATURE:
+                    raise ValueError('Not a binary COPY stream')
+                del buffer[:19 + int.from_bytes(buffer[15:19], 'big')]
+                header = False
+            if len(buffer) >= chunk_size * COPY_ROW.itemsize:
+                rows = len(buffer) // COPY_ROW.itemsize
+                yield BinaryCopyTradeReader._to_arrays(buffer, rows)
+                del buffer[:rows * COPY_ROW.itemsize]
+
+        if len(buffer) > 2:
+            yield BinaryCopyTradeReader._to_arrays(buffer, len(buffer) // COPY_ROW.itemsize)
+        # What remains is the two byte trailer
+
+    @staticmethod
+    def _to_arrays(buffer: bytearray, rows: int) -> TradeArrays:
+        parsed = np.frombuffer(buffer, dtype=COPY_ROW, count=rows)
+        if (parsed['fields'] != 5).any() or (parsed['side_len'] != 1).any():
+            raise ValueError('Unexpected row layout or NULL value in COPY stream')
+        return TradeArrays(
+            parsed['price'],
+            parsed['quantity'],
+            parsed['side'].copy(),  # The only column not converted, and a view when rows is 1
+            parsed['time_us'].astype(np.int64) * 1000 + PG_EPOCH_NS,
+            parsed['trade_id']
+        )
@@ -0,0 +1,78 @@
+"""
+Compares rows/sec of the CSV and binary COPY paths of DatabaseSync on synthetic trades.
+
+Run from src:
+    python -m database.utils.copy_benchmark [--rows N] [--db]
+
+Without --db only the encoding is timed. With --db each chunk is also copied into a temporary copy of
+the trades table, which is rolled back afterwards.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from database import DatabaseSync
+from database.database_sync import PARSE_CHUNK
+
+def synthetic_chunk(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Parameters:
+        rows (int): Number of trades.
+
+        seed (int): Random seed.
+
+    Returns:
+        chunk_df (pd.DataFrame): Trades in the layout of a Binance trades CSV.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'trade_id': np.arange(rows, dtype=np.int64),
+        'price': np.round(2 + rng.random(rows), 4),
+        'quantity': np.round(rng.exponential(100, rows), 1),
+        'quoteqty': np.zeros(rows),
+        'timestamp': 1735689600000000 + np.cumsum(rng.integers(0, 5000, rows)),
+        'is_buyer_maker': rng.random(rows) < 0.5
+    })
+
+def encode(chunk_df: pd.DataFrame, binary: bool):
+    return DatabaseSync._next_chunk(iter([chunk_df.copy()]), 1, 'spot', binary)
+
+def copy_to_db(chunks: list, binary: bool):
+    conn = DatabaseSync._get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute('CREATE TEMP TABLE copy_benchmark (LIKE trades);')
+            copy_query = f"COPY copy_benchmark (trade_id, coin_id, trade_time, price, quantity, side, trade_type) FROM STDIN {'(FORMAT BINARY)' if binary else 'WITH CSV'};"
+            for chunk in chunks:
+                with cur.copy(copy_query) as copy:
+                    copy.write(chunk)
+        conn.rollback()
+    finally:
+        DatabaseSync._release_connection(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of synthetic trades.')
+    parser.add_argument('--db', action='store_true', help='Also time COPY into the database.')
+    args = parser.parse_args()
+
+    chunk_dfs = [synthetic_chunk(len(r), i) for i, r in enumerate(np.array_split(np.arange(args.rows), max(args.rows // PARSE_CHUNK, 1)))]
+    for binary in (False, True):
+        start = time.perf_counter()
+        chunks = [encode(chunk_df, binary) for chunk_df in chunk_dfs]
+        if not binary:
+            # The CSV path also formats each row when it is copied
+            chunks = [DatabaseSync._encode_csv(chunk) for chunk in chunks]
+        encoded = time.perf_counter()
+        if args.db:
+            copy_to_db(chunks, binary)
+        copied = time.perf_counter()
+
+        name = 'binary' if binary else 'csv'
+        print(f'{name:>6}: encode {args.rows / (encoded - start):,.0f} rows/s', end='')
+        if args.db:
+            print(f', encode + copy {args.rows / (copied - start):,.0f} rows/s', end='')
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+DROP TABLE IF EXISTS trade_bars;
+DROP TABLE IF EXISTS ingest_manifest;
 DROP TABLE IF EXISTS trades;
 DROP TABLE IF EXISTS coin_pair;
 DROP TYPE IF EXISTS TRADETYPE;
@@ -9,16 +11,47 @@ CREATE TABLE coin_pair (
     symbol TEXT UNIQUE NOT NULL
 );
 
+-- Partitioned by coin_id, then trade_type, then month of trade_time.
+-- DatabaseSync creates the partitions as archives are loaded, each monthly leaf with its own (trade_time, trade_id) index.
 CREATE TABLE trades (
-    trade_id BIGINT,
+    trade_id BIGINT NOT NULL,
     coin_id INTEGER NOT NULL,
     trade_time TIMESTAMP NOT NULL,
     price NUMERIC NOT NULL,
     quantity NUMERIC NOT NULL,
     side BOOLEAN NOT NULL,
     trade_type TRADETYPE NOT NULL,
-    PRIMARY KEY (trade_id, coin_id),
+    PRIMARY KEY (trade_id, coin_id, trade_type, trade_time),
     CONSTRAINT coin_fk FOREIGN KEY (coin_id) REFERENCES coin_pair(coin_id)
+) PARTITION BY LIST (coin_id);
+
+CREATE TABLE ingest_manifest (
+    coin_id INTEGER NOT NULL REFERENCES coin_pair(coin_id),
+    trade_type TRADETYPE NOT NULL,
+    period TEXT NOT NULL,
+    row_count BIGINT,
+    checksum TEXT,
+    status TEXT NOT NULL CHECK (status IN ('loading', 'complete')),
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (coin_id, trade_type, period)
 );
 
-CREATE INDEX trades_index ON trades (coin_id, trade_type, trade_time, trade_id);
\ No newline at end of file
+-- Per-second aggregates of trades, maintained by DatabaseSync as archives are loaded
+CREATE TABLE trade_bars (
+    coin_id INTEGER NOT NULL REFERENCES coin_pair(coin_id),
+    trade_type TRADETYPE NOT NULL,
+    bar_time TIMESTAMP NOT NULL,
+    last_time TIMESTAMP NOT NULL,
+    trade_count INTEGER NOT NULL,
+    open DOUBLE PRECISION NOT NULL,
+    high DOUBLE PRECISION NOT NULL,
+    low DOUBLE PRECISION NOT NULL,
+    close DOUBLE PRECISION NOT NULL,
+    volume DOUBLE PRECISION NOT NULL,
+    buy_usd DOUBLE PRECISION NOT NULL,
+    sell_usd DOUBLE PRECISION NOT NULL,
+    last_buy DOUBLE PRECISION,
+    last_sell DOUBLE PRECISION,
+    last_trade_id BIGINT NOT NULL,
+    PRIMARY KEY (coin_id, trade_type, bar_time)
+);
\ No newline at end of file
@@ -1,12 +1,13 @@
 import source
+from database import TradeCache
 from strategy.volume_executor import VolumeExecutor
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
 if __name__ == '__main__':
-    src = source.Backtest('XRPUSDT', datetime(2025, 1, 1), datetime(2025, 2, 1), 1000)
-    ex = VolumeExecutor(src, 1000)
+    src = source.Backtest('XRPUSDT', datetime(2025, 1, 1), datetime(2025, 2, 1), 1000, columnar=True, cache=TradeCache())
+    ex = VolumeExecutor(src, 1000, vectorized=True)
     try:
         ex.start()
     finally:
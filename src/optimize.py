@@ -1,75 +1,327 @@
 from bayes_opt import BayesianOptimization
 from strategy.volume_executor import VolumeExecutor
+from strategy.volume_sweep import VolumeSweep
+from strategy.config.volume_params import VolumeParams
 from source.backtest import Backtest
-from datetime import datetime
+from database import TradeArrays, TradeCache
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from itertools import repeat
+from typing import Optional
 import numpy as np
-import strategy.config.volume_config as config
+import argparse
+import tempfile
+import os
 
-def objective_function(threshold, threshold_s, z_score_max, flush_minutes, short_buf_hours, long_buf_days, rsi_buy, rsi_sell):
+COIN = 'XRPUSDT'
+START_DATE = datetime(2025, 1, 1)
+END_DATE = datetime(2025, 2, 1)
+INITIAL_CAPITAL = 10000  # Fixed initial capital
+WALK_FORWARD_END = datetime(2025, 7, 1)  # End of the walk-forward range, which starts at START_DATE
+
+# Define parameter bounds
+PBOUNDS = {
+    'threshold': (0.5, 5.0),      # Z-score threshold for buying
+    'threshold_s': (0.5, 5.0),    # Z-score threshold for selling
+    'z_score_max': (3.0, 15.0),   # Maximum z-score for position sizing
+    'flush_minutes': (1, 15),     # Flush interval in minutes
+    'short_buf_hours': (0.5, 4),  # Short buffer in hours
+    'long_buf_days': (1, 10),     # Long buffer in days
+    'rsi_buy': (50, 80),          # RSI threshold for buying
+    'rsi_sell': (20, 50)          # RSI threshold for selling
+}
+
+def to_params(threshold, threshold_s, z_score_max, flush_minutes, short_buf_hours, long_buf_days, rsi_buy, rsi_sell) -> VolumeParams:
     # Convert parameters to appropriate units
-    flush = int(flush_minutes * 60)  # Convert to seconds
-    short_buf = int(short_buf_hours * 3600)  # Convert to seconds
-    long_buf = int(long_buf_days * 86400)  # Convert to seconds
-    
-    # Update config parameters
-    config.THRESHOLD = threshold
-    config.THRESHOLD_S = threshold_s
-    config.Z_SCORE_MAX = z_score_max
-    config.FLUSH = flush
-    config.SHORT_BUF = short_buf
-    config.LONG_BUF = long_buf
-    config.THRESHOLD_RSI_B = rsi_buy
-    config.THRESHOLD_RSI_S = rsi_sell
-    
-    # Create backtest instance
-    start_date = datetime(2025, 1, 1)
-    end_date = datetime(2025, 2, 1)
-    initial_capital = 10000  # Fixed initial capital
-    backtest = Backtest("XRPUSDT", start_date, end_date, initial_capital)
-    
+    return VolumeParams(
+        threshold=threshold,
+        threshold_s=threshold_s,
+        z_score_max=z_score_max,
+        flush=int(flush_minutes * 60),  # Convert to seconds
+        short_buf=int(short_buf_hours * 3600),  # Convert to seconds
+        long_buf=int(long_buf_days * 86400),  # Convert to seconds
+        threshold_rsi_b=rsi_buy,
+        threshold_rsi_s=rsi_sell
+    )
+
+def evaluate(params: VolumeParams, trades: Optional[TradeArrays] = None):
+    # Create backtest instance, over the given trades if any
+    backtest = Backtest(COIN, START_DATE, END_DATE, INITIAL_CAPITAL, columnar=True, cache=TradeCache(), trades=trades)
+
     # Create and run strategy
-    executor = VolumeExecutor(backtest, initial_capital)
+    executor = VolumeExecutor(backtest, INITIAL_CAPITAL, graph=False, vectorized=True, params=params)
     executor.start()
-    
+
     # Calculate performance metrics
     final_balance = backtest.current_total_usd()
     max_drawdown = executor.calculate_max_drawdown()
-    
+
     # Calculate return percentage
-    return_pct = (final_balance - initial_capital) / initial_capital
-    
+    return_pct = (final_balance - INITIAL_CAPITAL) / INITIAL_CAPITAL
+
+    return objective(return_pct, max_drawdown)
+
+def objective(return_pct: float, max_drawdown: float) -> float:
     # Objective: balance between return and drawdown
     # Higher return and lower drawdown = better
-    objective = return_pct * (1 - max_drawdown)
-    
-    return objective
+    return return_pct * (1 - max_drawdown)
+
+def objective_function(threshold, threshold_s, z_score_max, flush_minutes, short_buf_hours, long_buf_days, rsi_buy, rsi_sell):
+    params = to_params(threshold, threshold_s, z_score_max, flush_minutes, short_buf_hours, long_buf_days, rsi_buy, rsi_sell)
+    return evaluate(params)
 
 def optimize_parameters():
-    # Define parameter bounds
-    pbounds = {
-        'threshold': (0.5, 5.0),      # Z-score threshold for buying
-        'threshold_s': (0.5, 5.0),    # Z-score threshold for selling
-        'z_score_max': (3.0, 15.0),   # Maximum z-score for position sizing
-        'flush_minutes': (1, 15),     # Flush interval in minutes
-        'short_buf_hours': (0.5, 4),  # Short buffer in hours
-        'long_buf_days': (1, 10),     # Long buffer in days
-        'rsi_buy': (50, 80),          # RSI threshold for buying
-        'rsi_sell': (20, 50)          # RSI threshold for selling
-    }
-    
     # Initialize optimizer
     optimizer = BayesianOptimization(
         f=objective_function,
-        pbounds=pbounds,
+        pbounds=PBOUNDS,
         random_state=1
     )
-    
+
     # Run optimization
     optimizer.maximize(
         init_points=5,    # Number of initial random points
         n_iter=20         # Number of optimization iterations
     )
-    
+
+    _print_best(optimizer)
+
+# --- Parallel Optimization --- #
+
+# Trades shared read-only by every evaluation in a worker process
+_shared_trades: Optional[TradeArrays] = None
+
+def _init_worker(path: str):
+    global _shared_trades
+    _shared_trades = TradeArrays.load(path)
+
+def _evaluate_shared(point: dict) -> float:
+    return evaluate(to_params(**point), _shared_trades)
+
+def _random_batch(rng: np.random.RandomState, size: int) -> list[dict]:
+    return [{key: rng.uniform(low, high) for key, (low, high) in PBOUNDS.items()} for _ in range(size)]
+
+def _suggest_batch(optimizer: BayesianOptimization, rng: np.random.RandomState, size: int) -> list[dict]:
+    """
+    Suggests several points to evaluate at once using the constant liar strategy.
+
+    Each suggestion is registered on a scratch optimizer with the worst target seen so far,
+    so that the next suggestion moves away from it instead of repeating it.
+    Before any target is known there is nothing to fit, and the points are random.
+    """
+    if size == 0:
+        return []
+    if not optimizer.res:
+        return _random_batch(rng, size)
+
+    scratch = BayesianOptimization(f=None, pbounds=PBOUNDS, random_state=rng, verbose=0, allow_duplicate_points=True)
+    for res in optimizer.res:
+        scratch.register(res['params'], res['target'])
+    liar = min(res['target'] for res in optimizer.res)
+
+    batch = []
+    for _ in range(size):
+        point = scratch.suggest()
+        scratch.register(point, liar)
+        batch.append(point)
+    return batch
+
+def optimize_parameters_parallel(workers: Optional[int] = None, init_points: int = 5, n_iter: int = 20):
+    """
+    Runs the Bayesian optimization with one batch of suggestions per round, evaluated across a process pool.
+
+    The trades are loaded once and saved to a temporary directory that every worker memory-maps read-only,
+    and each evaluation gets its own VolumeParams instead of changing the config module.
+
+    Parameters:
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+
+        init_points (int): Number of initial random points.
+
+        n_iter (int): Number of optimization iterations.
+    """
+    workers = workers or os.cpu_count()
+    init_points = max(init_points, 1)
+
+    trades = TradeCache().load(COIN, 'spot', START_DATE, END_DATE)
+    optimizer = BayesianOptimization(f=None, pbounds=PBOUNDS, random_state=1, allow_duplicate_points=True)
+    rng = np.random.RandomState(1)
+
+    with tempfile.TemporaryDirectory() as shared_dir:
+        trades.save(shared_dir)
+        del trades
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shared_dir,)) as pool:
+            remaining = init_points + n_iter
+            while remaining > 0:
+                size = min(workers, remaining)
+                batch = _random_batch(rng, min(size, max(init_points - len(optimizer.res), 0)))
+                batch += _suggest_batch(optimizer, rng, size - len(batch))
+
+                for point, target in zip(batch, pool.map(_evaluate_shared, batch)):
+                    optimizer.register(point, target)
+                remaining -= size
+
+    _print_best(optimizer)
+
+# --- Walk-Forward Optimization --- #
+
+# Trades before the first fold, so that the longest long buffer in PBOUNDS is full when it starts
+WARMUP = timedelta(days=PBOUNDS['long_buf_days'][1])
+
+@dataclass(frozen=True)
+class Fold:
+    """
+    Parameters are fitted on [train_start, train_end) and tested on [train_end, test_end).
+    """
+
+    train_start: datetime
+    train_end: datetime
+    test_end: datetime
+
+def walk_forward_folds(start: datetime, end: datetime, train_months: int = 3, test_months: int = 1) -> list[Fold]:
+    """
+    Parameters:
+        start (datetime): Start of the first training window.
+
+        end (datetime): End (excl.) of the last test window.
+
+        train_months (int): Length of each training window in months.
+
+        test_months (int): Length of each test window in months, and the step between folds.
+
+    Returns:
+        folds (list[Fold]): Folds whose test windows follow each other from start + train_months to end.
+    """
+    folds = []
+    train_start = start
+    while (test_end := train_start + relativedelta(months=train_months + test_months)) <= end:
+        folds.append(Fold(train_start, train_start + relativedelta(months=train_months), test_end))
+        train_start += relativedelta(months=test_months)
+    return folds
+
+# Sweep over the whole walk-forward range, shared by every evaluation in a worker process
+_shared_sweep: Optional[VolumeSweep] = None
+
+def _init_sweep_worker(path: str):
+    global _shared_sweep
+    _shared_sweep = VolumeSweep.load(path, INITIAL_CAPITAL)
+
+def _evaluate_windows(point: dict, windows: list[tuple[datetime, datetime]]) -> list[dict]:
+    """
+    Evaluates one point on several windows of the shared sweep.
+
+    The flush buckets and rolling statistics of the point are computed once over the whole range and sliced for each window,
+    so every window starts with warm buffers. They are dropped afterwards, as the next point rarely shares its flush interval.
+    """
+    params = [to_params(**point)]
+    rows = [_shared_sweep.run(params, start, end).iloc[0].to_dict() for start, end in windows]
+    _shared_sweep.clear()
+    return rows
+
+def optimize_walk_forward(
+    start: datetime = START_DATE,
+    end: datetime = WALK_FORWARD_END,
+    train_months: int = 3,
+    test_months: int = 1,
+    workers: Optional[int] = None,
+    init_points: int = 5,
+    n_iter: int = 20
+) -> list[dict]:
+    """
+    Runs a Bayesian search on the training window of each walk-forward fold and tests its best parameters on the fold's test window.
+
+    The searches of all folds advance together. Each round every fold suggests points, and each point is evaluated on every
+    fold's training window in one pass over the trades, so the flush buckets it needs are computed once for all folds and
+    every fold's search learns from every point. The trades are loaded once, from WARMUP before the first fold, and memory-mapped
+    by every worker, so no fold replays its buffer warm-up.
+
+    Parameters:
+        start (datetime): Start of the first training window.
+
+        end (datetime): End (excl.) of the last test window.
+
+        train_months (int): Length of each training window in months.
+
+        test_months (int): Length of each test window in months, and the step between folds.
+
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+
+        init_points (int): Number of initial random points suggested by each fold.
+
+        n_iter (int): Number of optimization iterations of each fold.
+
+    Returns:
+        results (list[dict]): Per fold, its windows, best parameters, training objective and test metrics.
+    """
+    folds = walk_forward_folds(start, end, train_months, test_months)
+    if not folds:
+        raise ValueError('The range is shorter than one training and one test window')
+
+    workers = workers or os.cpu_count()
+    init_points = max(init_points, 1)
+    per_fold = max(workers // len(folds), 1)
+
+    trades = TradeCache().load(COIN, 'spot', start - WARMUP, folds[-1].test_end)
+    optimizers = [BayesianOptimization(f=None, pbounds=PBOUNDS, random_state=1, allow_duplicate_points=True) for _ in folds]
+    rng = np.random.RandomState(1)
+    train_windows = [(fold.train_start, fold.train_end) for fold in folds]
+
+    with tempfile.TemporaryDirectory() as shared_dir:
+        # The derived columns are saved too, so the workers map them instead of each computing a private copy
+        VolumeSweep(trades, INITIAL_CAPITAL).save(shared_dir)
+        del trades
+
+        with ProcessPoolExecutor(workers, initializer=_init_sweep_worker, initargs=(shared_dir,)) as pool:
+            suggested = 0
+            while suggested < init_points + n_iter:
+                size = min(per_fold, init_points + n_iter - suggested)
+                # The first round is all random, there are no targets to fit yet however large per_fold is
+                random_size = size if suggested == 0 else min(size, max(init_points - suggested, 0))
+                batch = []
+                for optimizer in optimizers:
+                    random = _random_batch(rng, random_size)
+                    batch += random + _suggest_batch(optimizer, rng, size - len(random))
+
+                for point, rows in zip(batch, pool.map(_evaluate_windows, batch, repeat(train_windows))):
+                    for optimizer, row in zip(optimizers, rows):
+                        optimizer.register(point, objective(row['return_pct'], row['max_drawdown']))
+                suggested += size
+
+            best = [optimizer.max['params'] for optimizer in optimizers]
+            tests = pool.map(_evaluate_windows, best, [[(fold.train_end, fold.test_end)] for fold in folds])
+
+    results = []
+    for fold, optimizer, (test,) in zip(folds, optimizers, tests):
+        results.append({
+            'train_start': fold.train_start,
+            'train_end': fold.train_end,
+            'test_end': fold.test_end,
+            'params': optimizer.max['params'],
+            'train_objective': optimizer.max['target'],
+            'test_objective': objective(test['return_pct'], test['max_drawdown']),
+            'test_return_pct': test['return_pct'],
+            'test_max_drawdown': test['max_drawdown']
+        })
+
+    _print_walk_forward(results)
+    return results
+
+def _print_walk_forward(results: list[dict]):
+    print("\nWalk-forward results:")
+    compounded = 1.0
+    for r in results:
+        compounded *= 1 + r['test_return_pct']
+        print(
+            f"test {r['train_end']:%Y-%m-%d} to {r['test_end']:%Y-%m-%d}: train objective {r['train_objective']:.4f}, "
+            f"test objective {r['test_objective']:.4f}, test return {r['test_return_pct']:.2%}, "
+            f"test drawdown {r['test_max_drawdown']:.2%}"
+        )
+    print(f"\nOut-of-sample return: {compounded - 1:.2%}")
+
+def _print_best(optimizer: BayesianOptimization):
     # Print best parameters
     print("\nBest parameters found:")
     for param, value in optimizer.max['params'].items():
@@ -77,4 +329,16 @@ def optimize_parameters():
     print(f"\nBest objective value: {optimizer.max['target']}")
 
 if __name__ == "__main__":
-    optimize_parameters()
+    parser = argparse.ArgumentParser(description='Bayesian optimization of the VolumeExecutor parameters.')
+    parser.add_argument('--walk-forward', action='store_true', help='Fit and test on rolling folds instead of one window.')
+    parser.add_argument('--start', type=datetime.fromisoformat, default=START_DATE, help='Start of the first training window.')
+    parser.add_argument('--end', type=datetime.fromisoformat, default=WALK_FORWARD_END, help='End of the last test window.')
+    parser.add_argument('--train-months', type=int, default=3, help='Length of each training window in months.')
+    parser.add_argument('--test-months', type=int, default=1, help='Length of each test window in months.')
+    parser.add_argument('--workers', type=int, help='Number of worker processes.')
+    args = parser.parse_args()
+
+    if args.walk_forward:
+        optimize_walk_forward(args.start, args.end, args.train_months, args.test_months, args.workers)
+    else:
+        optimize_parameters_parallel(args.workers)
@@ -1,5 +1,8 @@
 from .source import Source
-from .backtest import Backtest
+from .fill_model import Fill, FillModel
+from .scheduler import Event, Scheduler
+from .backtest import Backtest, BacktestAccount
 from .hl import Hyperliquid
+from .hl_async import AsyncHyperliquid, OrderAck
 
-__all__ = ['Source', 'Backtest', 'Hyperliquid']
+__all__ = ['Source', 'Fill', 'FillModel', 'Event', 'Scheduler', 'Backtest', 'BacktestAccount', 'Hyperliquid', 'AsyncHyperliquid', 'OrderAck']
@@ -1,19 +1,43 @@
 from source import Source
-from database import DatabaseSync as db
-from database import CONNECTION_STR
+from source.fill_model import Fill, FillModel
+from source.scheduler import Event, Scheduler
+from source.latency import LATENCY
+from database import TradeArrays, BarArrays, TradeCache, BinaryCopyTradeReader, DatabaseSync
+from database.trade_reader import MEMORY_LIMIT
 import statistics
-import psycopg
-from psycopg.connection import Connection
 from datetime import datetime
+from typing import Iterable, Optional
+import numpy as np
 
-READ_SIZE = 10000000
+BATCH_SIZE = 100000
 
 class Backtest(Source):
-    def __init__(self, coin: str, start: datetime, end: datetime, withdrawable: float):
+    def __init__(
+        self,
+        coin: str,
+        start: datetime,
+        end: datetime,
+        withdrawable: float,
+        columnar: bool = False,
+        trade_type: str = 'spot',
+        cache: Optional[TradeCache] = None,
+        trades: Optional[TradeArrays] = None,
+        memory_limit: int = MEMORY_LIMIT,
+        bars: bool = False,
+        fill_model: Optional[FillModel] = None,
+        latency: bool = False
+    ):
+        if fill_model is not None and not (columnar or bars):
+            raise ValueError('A fill model needs a columnar Backtest')
+
         self.coin = coin
+        self.trade_type = trade_type
+        self.start = start
         self.end = end
         self._time = start
+        self._time_ns: int = None
         self._last_id = -1
+        self.memory_limit = memory_limit
 
         self._market_price = None
         self._last_sell = None
@@ -32,35 +56,74 @@ class Backtest(Source):
             'withdrawable': withdrawable
         }
 
+        # Columnar replay state, which bar replay also uses
+        self.bars = bars
+        self.columnar = columnar or bars
+        self.cache = cache
+        self._preloaded = trades
+        self._batch_handlers = []
+        self._trades: TradeArrays = None
+        self._last_buys: np.ndarray = None
+        self._last_sells: np.ndarray = None
+        self._mids: np.ndarray = None
+        self._index = -1
+
+        # Timers and pending fills, fired as the replay reaches the first trade after them
+        self.scheduler = Scheduler()
+        self._accounts: list['BacktestAccount'] = []
+        self._unsettled: list[Event] = []
+        self._pending_usd = 0.0  # Proceeds of sells that are not settled yet
+
+        # Orders fill at the last price of their side unless a fill model is given
+        self.fill_model = fill_model
+
+        # Time handlers into LATENCY, off by default so that optimization and batch runs do not pay for it
+        self.latency = latency
+
     def stream_trades(self):
-        with psycopg.Connection.connect(CONNECTION_STR) as conn:
-            while rows := self._get_rows(conn):
-                for row in rows:
-                    price, quantity, side, trade_time, trade_id = row
-                    self._time = trade_time
-                    self._last_id = trade_id
-
-                    if side:
-                        self._last_buy = price
-                    else:
-                        self._last_sell = price
-
-                    if self._last_buy and self._last_sell:
-                        self._market_price = statistics.mean([self._last_buy, self._last_sell])
-
-                    trades = {
-                        'data': [
-                            {
-                                'time': trade_time.timestamp() * 1000,
-                                'px': price,
-                                'side': 'B' if side else 'A',
-                                'sz': quantity
-                            }
-                        ]
-                    }
+        if self.columnar:
+            self._replay_columns()
+            return
+
+        latency = self.latency
+        for chunk in self._reader():
+            rows = zip(chunk.price.tolist(), chunk.quantity.tolist(), chunk.side.tolist(), chunk.time_ns.tolist(), chunk.trade_id.tolist())
+            for price, quantity, side, time_ns, trade_id in rows:
+                trade_time = TradeArrays.to_datetime(time_ns)
+                self._time = trade_time
+                self._time_ns = time_ns
+                self._last_id = trade_id
+
+                if side:
+                    self._last_buy = price
+                else:
+                    self._last_sell = price
+
+                if self._last_buy and self._last_sell:
+                    self._market_price = statistics.mean([self._last_buy, self._last_sell])
+
+                if latency:
+                    LATENCY.receive()
+                self.scheduler.run_until(time_ns)
 
-                    for handler in self._trade_handlers:
-                        handler(trades)
+                trades = {
+                    'data': [
+                        {
+                            'time': trade_time.timestamp() * 1000,
+                            'px': price,
+                            'side': 'B' if side else 'A',
+                            'sz': quantity
+                        }
+                    ]
+                }
+
+                for handler in self._trade_handlers:
+                    handler(trades)
+                if latency:
+                    LATENCY.finish('handle_trade')
+                    LATENCY.add('trades')
+
+        self._end_replay()
     
     def last_sell_price(self):
         return self._last_sell
@@ -68,38 +131,240 @@ class Backtest(Source):
     def last_buy_price(self):
         return self._last_buy
 
-    def _get_rows(self, conn: Connection) -> list[tuple[float, float, bool, datetime, int]]:
-        with conn.cursor() as cur:
-            coin_id = db.get_coin_id(self.coin)
-            cur.execute("""
-                SELECT price, quantity, side, trade_time, trade_id
-                FROM trades
-                WHERE coin_id = %s
-                AND (trade_time, trade_id) > (%s, %s)
-                AND trade_time < %s
-                AND trade_type = 'spot'
-                ORDER BY trade_time, trade_id
-                LIMIT %s;
-                """, (coin_id, self._time, self._last_id, self.end, READ_SIZE)
-            )
-            return cur.fetchall()
-            
+    def _reader(self) -> Iterable[TradeArrays]:
+        """
+        Returns:
+            reader (Iterable[TradeArrays]): Prefetched chunks of the trades after the current position, within memory_limit,
+            or chunks of the preloaded trades if they were given.
+        """
+        if self._preloaded is not None:
+            trades = self._preloaded.between(self.start, self.end)
+            return (trades.slice(start, start + BATCH_SIZE) for start in range(0, len(trades), BATCH_SIZE))
+        return BinaryCopyTradeReader(self.coin, self.trade_type, self._time, self.end, self._last_id, self.memory_limit)
+
     def add_trade_handler(self, handler):
         self._trade_handlers.append(handler)
 
+    # --- Columnar Replay --- #
+
+    def add_batch_handler(self, handler):
+        """
+        Registers a handler that receives trades as TradeArrays views of up to BATCH_SIZE trades.
+
+        Only used in columnar mode. Batches end before each trade that has scheduled events due before it (see _replay_columns).
+        When a batch handler is called, the source is positioned at the last trade of the batch,
+        and the handler may call seek() to inspect the source at any earlier trade of the batch.
+
+        Parameters:
+            handler (Callable[[TradeArrays], None]): Handler to call with each batch.
+        """
+        self._batch_handlers.append(handler)
+
+    def load_trades(self) -> TradeArrays:
+        """
+        Loads every trade between start and end into contiguous columns.
+        Uses the preloaded trades or the trade cache if either was given.
+
+        In bar mode the per-second bars are loaded instead and replayed as up to one buy and one sell per second
+        (see BarArrays.to_trades), which keeps USD volumes and last prices at one second resolution for a fraction of the I/O.
+
+        Returns:
+            trades (TradeArrays): All trades of the backtest in stream order.
+        """
+        if self.bars:
+            return self.load_bars().to_trades()
+        if self._preloaded is not None:
+            return self._preloaded.between(self.start, self.end)
+        if self.cache is not None:
+            return self.cache.load(self.coin, self.trade_type, self.start, self.end)
+
+        return TradeArrays.concat(list(self._reader()))
+
+    def load_bars(self) -> BarArrays:
+        """
+        Loads the per-second bars between start and end, from the preloaded trades, the trade cache or trade_bars.
+
+        Returns:
+            bars (BarArrays): All bars of the backtest in time order.
+        """
+        if self._preloaded is not None:
+            return BarArrays.from_trades(self._preloaded.between(self.start, self.end))
+        if self.cache is not None:
+            return self.cache.load_bars(self.coin, self.trade_type, self.start, self.end)
+        return DatabaseSync.read_bars(self.coin, self.trade_type, self.start, self.end)
+
+    def trades(self) -> TradeArrays:
+        """
+        Returns every trade of the backtest as columns, loading them and the derived prices on first use.
+
+        Returns:
+            trades (TradeArrays): All trades of the backtest in stream order.
+        """
+        if self._trades is None:
+            self._trades = self.load_trades()
+            self._last_buys, self._last_sells = self._trades.last_prices()
+            self._mids = (self._last_buys + self._last_sells) / 2
+        return self._trades
+
+    def _replay_columns(self):
+        """
+        Replays the trades in batches of array views instead of one dict per trade.
+
+        Scheduled events fire when the replay reaches the first trade after them, with the source positioned at that trade
+        and before its handlers, as in the row replay. The batches are cut at those trades, found with a binary search
+        for the next due time, so events cost nothing per trade. The first trade is delivered on its own, so that handlers
+        can schedule timers relative to it. Events scheduled by trade handlers fire at the next cut.
+
+        Batch handlers get each batch at once. Regular trade handlers are still called once per trade, after the batch handlers.
+        With latency on, each batch, with the events before it, is timed into the handle_batch latency stage.
+        """
+        trades = self.trades()
+        pos = 0
+        while pos < len(trades):
+            self.seek(pos)
+            if self.latency:
+                LATENCY.receive()
+            self.scheduler.run_until(int(trades.time_ns[pos]))
+
+            stop = min(pos + BATCH_SIZE, len(trades)) if pos else 1
+            if (due := self.scheduler.next_time()) is not None:
+                stop = min(stop, int(np.searchsorted(trades.time_ns, due, side='right')))
+            self._deliver(trades.slice(pos, stop))
+            if self.latency:
+                LATENCY.finish('handle_batch')
+                LATENCY.add('trades', stop - pos)
+            pos = stop
+
+        self._end_replay()
+
+    def _deliver(self, batch: TradeArrays):
+        """
+        Calls the batch handlers with a batch, then the trade handlers with each of its trades.
+        """
+        last = batch.offset + len(batch) - 1
+
+        for handler in self._batch_handlers:
+            self.seek(last)
+            handler(batch)
+
+        if self._trade_handlers:
+            for i in range(len(batch)):
+                self.seek(batch.offset + i)
+                message = {
+                    'data': [
+                        {
+                            'time': self._time.timestamp() * 1000,
+                            'px': batch.price[i],
+                            'side': 'B' if batch.side[i] else 'A',
+                            'sz': batch.quantity[i]
+                        }
+                    ]
+                }
+                for handler in self._trade_handlers:
+                    handler(message)
+
+        self.seek(last)
+
+    def seek(self, index: int):
+        """
+        Positions the replay at the given trade, so that time and prices reflect the stream up to and including it.
+
+        Parameters:
+            index (int): Index of the trade in the full stream.
+        """
+        self._index = index
+        self._time_ns = int(self._trades.time_ns[index])
+        self._time = TradeArrays.to_datetime(self._time_ns)
+        self._last_id = int(self._trades.trade_id[index])
+        self._last_buy = Backtest._none_if_nan(self._last_buys[index])
+        self._last_sell = Backtest._none_if_nan(self._last_sells[index])
+        self._market_price = Backtest._none_if_nan(self._mids[index])
+
+    def mid_prices(self) -> np.ndarray:
+        """
+        Returns:
+            mids (np.ndarray): Mid of the latest buy and sell price at every trade of the replay (NaN until both sides traded).
+        """
+        return self._mids
+
+    @staticmethod
+    def _none_if_nan(value: float):
+        return None if np.isnan(value) else float(value)
+
     def time(self):
         return self._time
 
+    def time_ns(self) -> int:
+        """
+        Returns:
+            time_ns (int): Time of the current trade in nanoseconds, without building a datetime.
+        """
+        return self._time_ns
+
     def market_price(self):
         return self._market_price
     
-    def create_buy_order(self, buy_size, allowed_slip):
+    def replay_index(self) -> int:
+        """
+        Returns:
+            index (int): Index of the trade the columnar replay is positioned at.
+        """
+        return self._index
+
+    def create_buy_order(self, buy_size, allowed_slip) -> Optional[Fill]:
+        if self.fill_model is not None:
+            fill = self._fill(buy_size, True, float(self.last_buy_price()), allowed_slip)
+            self._wallet['assetPositions'][0]['position']['szi'] += fill.filled
+            self._wallet['withdrawable'] -= fill.usd + fill.fee
+            return fill
+
         self._wallet['assetPositions'][0]['position']['szi'] += buy_size
-        self._wallet['withdrawable'] -= buy_size * float(self._last_buy)
+        self._wallet['withdrawable'] -= buy_size * float(self.last_buy_price())
     
-    def create_sell_order(self, sell_size, allowed_slip):
+    def create_sell_order(self, sell_size, allowed_slip) -> Optional[Fill]:
+        if self.fill_model is not None:
+            position = self._wallet['assetPositions'][0]['position']
+            fill = self._fill(min(sell_size, self.position_size()), False, float(self.last_sell_price()), allowed_slip)
+            position['szi'] = max(0, position['szi'] - fill.filled)
+            self._settle_at(fill)
+            return fill
+
         self._wallet['assetPositions'][0]['position']['szi'] = max(0, self._wallet['assetPositions'][0]['position']['szi'] - sell_size)
-        self._wallet['withdrawable'] += sell_size * float(self._last_sell)
+        self._wallet['withdrawable'] += sell_size * float(self.last_sell_price())
+
+    def _fill(self, size: float, buy: bool, reference: float, allowed_slip: float) -> Fill:
+        """
+        Simulates a market order sent at the current trade with the fill model.
+        """
+        return self.fill_model.fill(self.trades(), self.replay_index(), size, buy, reference, allowed_slip)
+
+    def _settle_at(self, fill: Fill):
+        """
+        Schedules the credit of a sell fill's proceeds with the trade that completes it, so they are pending until then.
+
+        The position and the cost of buys move when the order is sent, so a position being sold cannot be sold again
+        and pending buys cannot spend the same USD twice. current_total_usd() counts pending proceeds.
+        """
+        if fill.filled <= 0:
+            return
+        self._pending_usd += fill.usd - fill.fee
+        self._unsettled = [event for event in self._unsettled if not event.fired]
+        self._unsettled.append(self.scheduler.schedule(fill.time_ns - 1, self._settle, fill))
+
+    def _settle(self, fill: Fill):
+        self._pending_usd -= fill.usd - fill.fee
+        self._wallet['withdrawable'] += fill.usd - fill.fee
+
+    def _end_replay(self):
+        """
+        Settles the fills of this backtest and its accounts that were still pending when the trades ran out.
+        """
+        for backtest in [self, *self._accounts]:
+            for event in backtest._unsettled:
+                if not (event.fired or event.cancelled):
+                    event.cancel()
+                    event.callback(*event.args)
+            backtest._unsettled = []
     
     def position_size(self):
         all_positions = self._wallet['assetPositions']
@@ -116,4 +381,66 @@ class Backtest(Source):
         return self._wallet['withdrawable']
     
     def current_total_usd(self):
-        return self._wallet['withdrawable'] + float(self.position_size()) * float(self.last_sell_price())
\ No newline at end of file
+        return self._wallet['withdrawable'] + self._pending_usd + float(self.position_size()) * float(self.last_sell_price())
+
+    def account(self, withdrawable: float) -> 'BacktestAccount':
+        """
+        Opens a separate wallet on this backtest's replay.
+
+        Parameters:
+            withdrawable (float): Starting USD balance of the wallet.
+
+        Returns:
+            account (BacktestAccount): Source to give to one strategy.
+        """
+        return BacktestAccount(self, withdrawable)
+
+class BacktestAccount(Backtest):
+    """
+    A wallet of its own that trades on another Backtest's replay.
+
+    Several strategies, for example one VolumeExecutor per VolumeParams, can each get an account and run side by side
+    over a single pass of the trades. Stream the parent backtest once instead of starting each strategy.
+    """
+
+    def __init__(self, backtest: Backtest, withdrawable: float):
+        super().__init__(backtest.coin, backtest.start, backtest.end, withdrawable, backtest.columnar, backtest.trade_type, fill_model=backtest.fill_model)
+        self._backtest = backtest
+        self.scheduler = backtest.scheduler
+        backtest._accounts.append(self)
+
+    def stream_trades(self):
+        self._backtest.stream_trades()
+
+    def add_trade_handler(self, handler):
+        self._backtest.add_trade_handler(handler)
+
+    def add_batch_handler(self, handler):
+        self._backtest.add_batch_handler(handler)
+
+    def trades(self) -> TradeArrays:
+        return self._backtest.trades()
+
+    def seek(self, index: int):
+        self._backtest.seek(index)
+
+    def replay_index(self) -> int:
+        return self._backtest.replay_index()
+
+    def mid_prices(self) -> np.ndarray:
+        return self._backtest.mid_prices()
+
+    def time(self):
+        return self._backtest.time()
+
+    def time_ns(self) -> int:
+        return self._backtest.time_ns()
+
+    def market_price(self):
+        return self._backtest.market_price()
+
+    def last_sell_price(self):
+        return self._backtest.last_sell_price()
+
+    def last_buy_price(self):
+        return self._backtest.last_buy_price()
\ No newline at end of file
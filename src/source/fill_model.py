@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from typing import Optional
+from database import TradeArrays
+import numpy as np
+
+TAKER_FEE = 0.00045  # Hyperliquid base tier taker fee
+DEPTH_TRADES = 1000  # Trades after an order that can fill it
+
+@dataclass(frozen=True, slots=True)
+class Fill:
+    """
+    Result of a simulated market order.
+    """
+
+    size: float  # Requested base quantity
+    filled: float  # Filled base quantity
+    price: float  # Volume weighted fill price, NaN if nothing filled
+    fee: float  # Fee in USD
+    time_ns: int  # Time of the last trade the order filled against, or the arrival time if nothing filled
+
+    @property
+    def usd(self) -> float:
+        """
+        Returns:
+            usd (float): USD value of the filled quantity, before fees.
+        """
+        return self.filled * self.price if self.filled > 0 else 0.0
+
+class FillModel:
+    """
+    Fills Backtest market orders against the trades that follow them in the replay.
+
+    An order arrives latency_ns after the trade it was sent at. From there, each trade with the order's side (buys for a buy
+    order) shows liquidity that was taken at its price, and the order takes participation of its quantity, in time order,
+    until it is filled. Trades priced beyond allowed_slip of the reference price are skipped, like a market order on the exchange
+    with that slippage limit, and whatever is left after depth_trades trades or horizon_ns is not filled.
+
+    The lookahead is one slice of the columns per order, so its cost does not depend on the order size.
+    """
+
+    def __init__(
+        self,
+        latency_ns: int = 0,
+        fee: float = TAKER_FEE,
+        participation: float = 1.0,
+        depth_trades: int = DEPTH_TRADES,
+        horizon_ns: Optional[int] = None
+    ):
+        """
+        Parameters:
+            latency_ns (int): Delay between sending an order and its arrival at the exchange.
+
+            fee (float): Fee rate on the filled USD value.
+
+            participation (float): Share of each later trade's quantity the order can take.
+
+            depth_trades (int): Number of trades after arrival the order can fill against.
+
+            horizon_ns (Optional[int]): Maximum time after arrival the order can fill in, unlimited if None.
+        """
+        if not 0 < participation <= 1:
+            raise ValueError('participation must be in (0, 1]')
+        self.latency_ns = latency_ns
+        self.fee = fee
+        self.participation = participation
+        self.depth_trades = depth_trades
+        self.horizon_ns = horizon_ns
+
+    def fill(self, trades: TradeArrays, index: int, size: float, buy: bool, reference: float, allowed_slip: float) -> Fill:
+        """
+        Parameters:
+            trades (TradeArrays): Trades of the replay.
+
+            index (int): Index of the trade the order is sent at.
+
+            size (float): Base quantity of the order.
+
+            buy (bool): Buy order if True, sell order otherwise.
+
+            reference (float): Price the slippage limit is relative to, usually the last price of the order's side.
+
+            allowed_slip (float): Maximum relative distance of a fill price from the reference.
+
+        Returns:
+            fill (Fill): The simulated fill.
+        """
+        arrival = int(trades.time_ns[index]) + self.latency_ns
+        if size <= 0:
+            return Fill(size, 0.0, np.nan, 0.0, arrival)
+
+        # Trades strictly after the sending trade, from the arrival on
+        lo = max(index + 1, int(np.searchsorted(trades.time_ns, arrival, side='left')))
+        hi = min(lo + self.depth_trades, len(trades))
+        if self.horizon_ns is not None:
+            hi = min(hi, int(np.searchsorted(trades.time_ns, arrival + self.horizon_ns, side='right')))
+
+        price = trades.price[lo:hi]
+        if buy:
+            usable = trades.side[lo:hi] & (price <= reference * (1 + allowed_slip))
+        else:
+            usable = ~trades.side[lo:hi] & (price >= reference * (1 - allowed_slip))
+
+        available = np.where(usable, trades.quantity[lo:hi] * self.participation, 0.0)
+        taken = np.minimum(available, np.maximum(size - (np.cumsum(available) - available), 0.0))
+        filled = float(taken.sum())
+        if filled <= 0:
+            return Fill(size, 0.0, np.nan, 0.0, arrival)
+
+        last = lo + int(np.flatnonzero(taken)[-1])
+        vwap = float(np.dot(taken, price) / filled)
+        return Fill(size, filled, vwap, filled * vwap * self.fee, int(trades.time_ns[last]))
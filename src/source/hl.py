@@ -1,4 +1,5 @@
 from source import Source
+from source.latency import LATENCY
 import os
 from dotenv import load_dotenv
 from hyperliquid.info import Info
@@ -23,14 +24,17 @@ class Hyperliquid(Source):
         self._trade_handlers.append(handler)
 
     def _handle_trade(self, trades):
+        LATENCY.receive()
         for handler in self._trade_handlers:
             handler(trades)
+        LATENCY.finish('handle_trade')
 
     def stream_trades(self):
         self._info.subscribe({'type': 'trades', 'coin': self._coin}, self._handle_trade)
 
     def create_buy_order(self, buy_size, allowed_slip):
         order_result = self._exchange.market_open(self._coin, True, buy_size, None, allowed_slip)
+        LATENCY.since_receive('ack')
         if order_result['status'] == 'ok':
             for status in order_result['response']['data']['statuses']:
                 try:
@@ -41,6 +45,7 @@ class Hyperliquid(Source):
 
     def create_sell_order(self, sell_size, allowed_slip):
         order_result = self._exchange.market_close(self._coin, sell_size, None, allowed_slip)
+        LATENCY.since_receive('ack')
         if order_result['status'] == 'ok':
             for status in order_result['response']['data']['statuses']:
                 try:
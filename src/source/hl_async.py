@@ -0,0 +1,334 @@
+from source import Source
+from source.hl import ADDRESS
+from source.latency import LATENCY
+import asyncio
+import json
+import time
+import aiohttp
+from dataclasses import dataclass, field
+from hyperliquid.exchange import Exchange
+from hyperliquid.utils.constants import MAINNET_API_URL
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+WS_URL = 'ws' + MAINNET_API_URL[len('http'):] + '/ws'
+RECONCILE_S = 30  # Seconds between REST reconciles of the account state
+PING_S = 50  # Seconds between pings, the server drops connections silent for 60
+RECONNECT_S = (1, 30)  # First and longest wait before reconnecting
+
+@dataclass
+class OrderAck:
+    """
+    A market order sent by AsyncHyperliquid and what the exchange answered.
+    """
+
+    buy: bool
+    size: float
+    sent_at: float  # time.monotonic() when the order was sent
+    acked_at: Optional[float] = None  # time.monotonic() when the answer arrived
+    oid: Optional[int] = None
+    filled: float = 0.0
+    avg_price: Optional[float] = None
+    error: Optional[str] = None
+    unsettled: float = 0.0  # Size not seen in userFills yet, held back by position_size() and withdrawable()
+    quote: Optional[float] = None  # Last trade price on the order's side when it was sent
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """
+        Returns:
+            latency (Optional[float]): Seconds from sending to the answer, None while pending.
+        """
+        return None if self.acked_at is None else self.acked_at - self.sent_at
+
+class AsyncHyperliquid(Source):
+    """
+    Live Hyperliquid source that runs on an asyncio event loop and answers every query from a local cache.
+
+    Mids, last trade prices, the position and withdrawable USD are kept up to date from the allMids, trades and userFills
+    websocket subscriptions, so trade handlers never wait on HTTP. The account state is replaced with the clearinghouse
+    state from the REST API at start and every reconcile_s seconds, which corrects anything the fills missed. Fills up to
+    the time of that state are in it already, so only later ones are applied on top.
+
+    Orders are signed and sent by the SDK's Exchange on the default thread pool. create_buy_order() and create_sell_order()
+    return at once, and the answers are recorded on OrderAck objects in orders. The cached position changes when the fills
+    arrive, but until then position_size() and withdrawable() hold back the order's size, so it cannot be sold or spent twice.
+    """
+
+    def __init__(self, coin: str, address: str = ADDRESS, reconcile_s: float = RECONCILE_S):
+        """
+        Parameters:
+            coin (str): Coin to trade.
+
+            address (str): Address of the account.
+
+            reconcile_s (float): Seconds between REST reconciles of the account state.
+        """
+        self._coin = coin
+        self._address = address
+        self.reconcile_s = reconcile_s
+        self._trade_handlers = []
+        self._exchange = Exchange(address, MAINNET_API_URL)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Cached market and account state
+        self._mid: Optional[float] = None
+        self._last_buy: Optional[float] = None
+        self._last_sell: Optional[float] = None
+        self._position = 0.0
+        self._withdrawable = 0.0
+        self._state_ms = 0  # Exchange time in ms of the last clearinghouse state
+        self._fills: list[dict] = []  # Fills applied on top of that state
+        self._early_fills: dict[int, float] = {}  # Size filled per oid of orders not answered yet
+
+        self.orders: list[OrderAck] = []
+        self._unsettled: list[OrderAck] = []  # Orders with unsettled size
+
+    # --- Source --- #
+
+    def time(self):
+        return datetime.now(tz=timezone.utc)
+
+    def add_trade_handler(self, handler):
+        self._trade_handlers.append(handler)
+
+    def stream_trades(self):
+        """
+        Runs the source until it is cancelled. Use run() instead from code that already has an event loop.
+        """
+        asyncio.run(self.run())
+
+    def create_buy_order(self, buy_size, allowed_slip):
+        self._submit(True, buy_size, self._exchange.market_open, self._coin, True, buy_size, None, allowed_slip)
+
+    def create_sell_order(self, sell_size, allowed_slip):
+        self._submit(False, sell_size, self._exchange.market_close, self._coin, sell_size, None, allowed_slip)
+
+    def market_price(self):
+        return self._mid
+
+    def last_buy_price(self):
+        return self._last_buy
+
+    def last_sell_price(self):
+        return self._last_sell
+
+    def position_size(self):
+        return self._position - sum(order.unsettled for order in self._unsettled if not order.buy)
+
+    def withdrawable(self):
+        return self._withdrawable - sum(order.unsettled * (order.quote or 0.0) for order in self._unsettled if order.buy)
+
+    def current_total_usd(self):
+        return self._withdrawable + self._position * (self._last_sell or self._mid or 0.0)
+
+    def pending_orders(self) -> list[OrderAck]:
+        """
+        Returns:
+            orders (list[OrderAck]): Orders the exchange has not answered yet.
+        """
+        return [order for order in self.orders if order.acked_at is None]
+
+    # --- Event Loop --- #
+
+    async def run(self):
+        """
+        Connects, subscribes and keeps the cache up to date until cancelled, reconnecting when the websocket drops.
+        """
+        self._loop = asyncio.get_running_loop()
+        async with aiohttp.ClientSession() as session:
+            self._session = session
+            await self.reconcile()
+            reconciler = asyncio.create_task(self._reconcile_loop())
+            try:
+                wait = RECONNECT_S[0]
+                while True:
+                    try:
+                        await self._listen(session)
+                        wait = RECONNECT_S[0]
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        print(f'Websocket error: {e!r}, reconnecting in {wait}s')
+                    await asyncio.sleep(wait)
+                    wait = min(wait * 2, RECONNECT_S[1])
+                    # Fills may have been missed while disconnected
+                    await self._try_reconcile()
+            finally:
+                reconciler.cancel()
+                self._session = None
+
+    async def _listen(self, session: aiohttp.ClientSession):
+        async with session.ws_connect(WS_URL) as ws:
+            for subscription in (
+                {'type': 'allMids'},
+                {'type': 'trades', 'coin': self._coin},
+                {'type': 'userFills', 'user': self._address}
+            ):
+                await ws.send_json({'method': 'subscribe', 'subscription': subscription})
+
+            pinger = asyncio.create_task(self._ping_loop(ws))
+            try:
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self._on_message(json.loads(message.data))
+                    elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+            finally:
+                pinger.cancel()
+
+    @staticmethod
+    async def _ping_loop(ws: aiohttp.ClientWebSocketResponse):
+        while True:
+            await asyncio.sleep(PING_S)
+            await ws.send_json({'method': 'ping'})
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_s)
+            await self._try_reconcile()
+
+    async def _try_reconcile(self):
+        try:
+            await self.reconcile()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f'Reconcile failed: {e!r}')
+
+    async def reconcile(self):
+        """
+        Replaces the cached position and withdrawable USD with the clearinghouse state from the REST API, and applies the
+        fills that arrived after that state again.
+        """
+        sent_at = time.monotonic()
+        sent_ms = int(time.time() * 1000)
+        async with self._session.post(
+            MAINNET_API_URL + '/info',
+            json={'type': 'clearinghouseState', 'user': self._address},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            response.raise_for_status()
+            state = await response.json()
+
+        state_ms = int(state.get('time', sent_ms))
+        if state_ms < self._state_ms:
+            return  # An overlapping reconcile got a newer state already
+        self._state_ms = state_ms
+        self._withdrawable = float(state['withdrawable'])
+        self._position = sum(
+            float(p['position']['szi']) for p in state['assetPositions'] if p['position']['coin'] == self._coin
+        )
+        self._fills = [fill for fill in self._fills if fill['time'] > state_ms]
+        for fill in self._fills:
+            self._apply_fill(fill)
+
+        # Orders answered before the request went out were filled before the state, even if their fills were missed
+        for order in [order for order in self._unsettled if order.acked_at is not None and order.acked_at <= sent_at]:
+            order.unsettled = 0.0
+            self._unsettled.remove(order)
+        if not self.pending_orders():
+            self._early_fills.clear()
+
+    # --- Messages --- #
+
+    def _on_message(self, message: dict):
+        channel = message.get('channel')
+        if channel == 'trades':
+            LATENCY.receive()
+            self._on_trades(message)
+            LATENCY.finish('handle_trade')
+        elif channel == 'allMids':
+            mid = message['data']['mids'].get(self._coin)
+            if mid is not None:
+                self._mid = float(mid)
+        elif channel == 'userFills':
+            # The first message repeats the latest fills, which the reconcile already counted
+            if not message['data'].get('isSnapshot'):
+                self._on_fills(message['data']['fills'])
+
+    def _on_trades(self, message: dict):
+        for trade in message['data']:
+            if trade['side'] == 'B':
+                self._last_buy = float(trade['px'])
+            else:
+                self._last_sell = float(trade['px'])
+
+        for handler in self._trade_handlers:
+            handler(message)
+
+    def _on_fills(self, fills: list[dict]):
+        for fill in fills:
+            if fill['coin'] != self._coin:
+                continue
+            self._settle(fill['oid'], float(fill['sz']))
+            if fill['time'] > self._state_ms:
+                self._fills.append(fill)
+                self._apply_fill(fill)
+
+    def _apply_fill(self, fill: dict):
+        usd = float(fill['px']) * float(fill['sz'])
+        if fill['side'] == 'B':
+            self._position += float(fill['sz'])
+            self._withdrawable -= usd + float(fill.get('fee', 0))
+        else:
+            self._position -= float(fill['sz'])
+            self._withdrawable += usd - float(fill.get('fee', 0))
+
+    def _settle(self, oid: int, size: float):
+        """
+        Takes a fill off the unsettled size of its order, or keeps it for the order's answer if that has not arrived.
+        """
+        for order in self._unsettled:
+            if order.oid == oid:
+                order.unsettled = max(order.unsettled - size, 0.0)
+                if order.unsettled < 1e-9:
+                    order.unsettled = 0.0
+                    self._unsettled.remove(order)
+                return
+        self._early_fills[oid] = self._early_fills.get(oid, 0.0) + size
+
+    # --- Orders --- #
+
+    def _submit(self, buy: bool, size: float, send: Callable, *args):
+        """
+        Sends an order on the default thread pool and records the answer on a new OrderAck once it arrives.
+        """
+        if self._loop is None:
+            raise RuntimeError('AsyncHyperliquid is not running')
+        quote = (self._last_buy if buy else self._last_sell) or self._mid
+        order = OrderAck(buy, size, time.monotonic(), unsettled=size, quote=quote)
+        received = LATENCY.received_at()
+        order.done = self._loop.run_in_executor(None, send, *args)
+        order.done.add_done_callback(lambda done: self._on_ack(order, done, received))
+        self.orders.append(order)
+        self._unsettled.append(order)
+
+    def _on_ack(self, order: OrderAck, done: asyncio.Future, received: Optional[int]):
+        order.acked_at = time.monotonic()
+        LATENCY.since('ack', received)
+        LATENCY.record('order_rtt', int(order.latency * 1e9))
+        if done.cancelled():
+            order.error = 'cancelled'
+        elif done.exception() is not None:
+            order.error = repr(done.exception())
+        elif done.result()['status'] != 'ok':
+            order.error = str(done.result()['response'])
+        else:
+            for status in done.result()['response']['data']['statuses']:
+                try:
+                    filled = status['filled']
+                    order.oid = filled['oid']
+                    order.filled = float(filled['totalSz'])
+                    order.avg_price = float(filled['avgPx'])
+                    print(f'Order #{filled['oid']} filled {filled['totalSz']} @{filled['avgPx']} in {order.latency * 1000:.0f}ms')
+                except KeyError:
+                    order.error = status.get('error', str(status))
+
+        # The fills may have come in before the answer
+        order.unsettled = max(order.filled - self._early_fills.pop(order.oid, 0.0), 0.0) if order.oid is not None else 0.0
+        if order.unsettled < 1e-9 and order in self._unsettled:
+            order.unsettled = 0.0
+            self._unsettled.remove(order)
+
+        if order.error is not None:
+            print(f'Error: {order.error}')
@@ -0,0 +1,290 @@
+"""
+Hot-path latency histograms for the trade-to-order path.
+
+Sources stamp each trade message when it is received, and the stages after it (handler entry, flush decision,
+order submit, exchange ack) are recorded as nanosecond intervals from that stamp into per-thread log-linear histograms.
+Each thread only writes its own histograms, so recording takes no lock and costs two clock reads and a list increment.
+Readers merge the threads' histograms into a summary, printed periodically with dump_every() or served as JSON
+on localhost with serve(). The shared recorder is LATENCY.
+
+Live sources always stamp their messages. Backtest only does with latency=True, so that optimization, batch and sweep
+runs replay at full speed.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, TextIO
+
+SUB_BITS = 5  # Sub-buckets per power of two are 2 ** (SUB_BITS - 1), about 3% relative error
+MAX_NS = 1 << 40  # About 18 minutes, larger values land in the last bucket
+STATS_PORT = 8787
+PERCENTILES = (50, 90, 99, 99.9)
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of nanosecond values with log-linear buckets: exact below 2 ** SUB_BITS, then
+    2 ** (SUB_BITS - 1) equal buckets per power of two.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (LatencyHistogram.index(MAX_NS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        """
+        Returns:
+            index (int): Bucket of a value.
+        """
+        shift = value.bit_length() - SUB_BITS
+        if shift <= 0:
+            return value
+        return (shift << (SUB_BITS - 1)) + (value >> shift)
+
+    @staticmethod
+    def upper(index: int) -> int:
+        """
+        Returns:
+            value (int): Largest value in a bucket.
+        """
+        if index < 1 << SUB_BITS:
+            return index
+        shift = (index >> (SUB_BITS - 1)) - 1
+        sub = index - (shift << (SUB_BITS - 1))
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value: int):
+        if value > MAX_NS:
+            value = MAX_NS
+        elif value < 0:
+            value = 0
+        # index() inlined, this is the hot path
+        shift = value.bit_length() - SUB_BITS
+        self.counts[value if shift <= 0 else (shift << (SUB_BITS - 1)) + (value >> shift)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> int:
+        """
+        Parameters:
+            q (float): Percentile between 0 and 100.
+
+        Returns:
+            value (int): Upper bound of the bucket holding the percentile, capped at the largest recorded value.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(q / 100 * self.count, 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(LatencyHistogram.upper(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            summary (dict): Count, mean, max and PERCENTILES in microseconds.
+        """
+        summary = {'count': self.count, 'mean_us': self.total / self.count / 1000 if self.count else 0.0, 'max_us': self.max / 1000}
+        for q in PERCENTILES:
+            summary[f'p{q:g}_us'] = self.percentile(q) / 1000
+        return summary
+
+class LatencyRecorder:
+    """
+    Per-thread latency histograms and counters, keyed by stage name.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Parameters:
+            enabled (bool): Record anything at all. Disabled recorders return at the first check.
+        """
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Only taken when a thread records for the first time, and by readers
+        self._threads: list[tuple[dict[str, LatencyHistogram], dict[str, int]]] = []
+        self._since = time.monotonic()
+
+    now = staticmethod(time.perf_counter_ns)
+
+    # --- Recording --- #
+
+    def _tables(self) -> tuple[dict[str, LatencyHistogram], dict[str, int]]:
+        try:
+            return self._local.tables
+        except AttributeError:
+            tables = ({}, {})
+            with self._lock:
+                self._threads.append(tables)
+            self._local.tables = tables
+            return tables
+
+    def receive(self) -> int:
+        """
+        Stamps the arrival of a message on this thread, which later stages are measured from.
+
+        Returns:
+            received (int): The stamp.
+        """
+        self._local.received = received = time.perf_counter_ns()
+        return received
+
+    def received_at(self) -> Optional[int]:
+        """
+        Returns:
+            received (Optional[int]): Stamp of the message being handled on this thread, None outside of one.
+        """
+        return getattr(self._local, 'received', None)
+
+    def record(self, stage: str, ns: int):
+        if not self.enabled:
+            return
+        try:
+            self._local.tables[0][stage].record(ns)
+        except (AttributeError, KeyError):
+            histograms = self._tables()[0]
+            histograms.setdefault(stage, LatencyHistogram()).record(ns)
+
+    def since(self, stage: str, start: Optional[int]):
+        """
+        Records the time from start to now, unless start is None.
+        """
+        if start is not None and self.enabled:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def since_receive(self, stage: str):
+        """
+        Records the time since the message being handled on this thread was received, if there is one.
+        """
+        start = getattr(self._local, 'received', None)
+        if start is not None and self.enabled:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def finish(self, stage: str):
+        """
+        Records the time since the message was received and ends its handling on this thread.
+        """
+        self.since_receive(stage)
+        self._local.received = None
+
+    def add(self, counter: str, n: int = 1):
+        """
+        Adds to a counter, whose rate per second is reported next to the histograms.
+        """
+        if not self.enabled:
+            return
+        counters = self._tables()[1]
+        counters[counter] = counters.get(counter, 0) + n
+
+    # --- Reporting --- #
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            summary (dict): Per stage histogram summaries in microseconds, and per counter totals and rates since the last reset.
+        """
+        merged: dict[str, LatencyHistogram] = {}
+        totals: dict[str, int] = {}
+        with self._lock:
+            threads = list(self._threads)
+        for histograms, counters in threads:
+            for stage, histogram in list(histograms.items()):
+                merged.setdefault(stage, LatencyHistogram()).merge(histogram)
+            for counter, n in list(counters.items()):
+                totals[counter] = totals.get(counter, 0) + n
+
+        elapsed = max(time.monotonic() - self._since, 1e-9)
+        return {
+            'elapsed_s': elapsed,
+            'stages': {stage: histogram.summary() for stage, histogram in sorted(merged.items())},
+            'counters': {counter: {'total': n, 'per_s': n / elapsed} for counter, n in sorted(totals.items())}
+        }
+
+    def reset(self):
+        """
+        Clears every thread's histograms and counters. Threads keep recording into their emptied tables.
+        """
+        with self._lock:
+            for histograms, counters in self._threads:
+                histograms.clear()
+                counters.clear()
+            self._since = time.monotonic()
+
+    def dump(self, file: TextIO = sys.stdout):
+        summary = self.summary()
+        print(f'Latency over {summary['elapsed_s']:.1f}s', file=file)
+        for stage, s in summary['stages'].items():
+            percentiles = ' '.join(f'p{q:g} {s[f'p{q:g}_us']:.1f}' for q in PERCENTILES)
+            print(f'  {stage}: n {s['count']} mean {s['mean_us']:.1f} {percentiles} max {s['max_us']:.1f} us', file=file)
+        for counter, c in summary['counters'].items():
+            print(f'  {counter}: {c['total']} ({c['per_s']:,.0f}/s)', file=file)
+
+    def dump_every(self, interval_s: float, file: TextIO = sys.stdout) -> threading.Event:
+        """
+        Prints the summary every interval_s seconds on a daemon thread.
+
+        Returns:
+            stop (threading.Event): Set it to stop dumping.
+        """
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval_s):
+                self.dump(file)
+
+        threading.Thread(target=loop, name='latency-dump', daemon=True).start()
+        return stop
+
+    def serve(self, port: int = STATS_PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        Serves the summary as JSON on a daemon thread. Any GET returns it, and POST /reset clears it.
+
+        Returns:
+            server (ThreadingHTTPServer): The server, call shutdown() on it to stop.
+        """
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._reply(recorder.summary())
+
+            def do_POST(self):
+                if self.path != '/reset':
+                    self.send_error(404)
+                    return
+                recorder.reset()
+                self._reply({'reset': True})
+
+            def _reply(self, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='latency-stats', daemon=True).start()
+        return server
+
+LATENCY = LatencyRecorder()
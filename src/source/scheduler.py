@@ -0,0 +1,92 @@
+import heapq
+import itertools
+from typing import Callable, Optional
+
+class Event:
+    """
+    A callback scheduled on a Scheduler. Cancelled events stay in the heap and are skipped when they come up.
+    """
+
+    __slots__ = ('time_ns', 'callback', 'args', 'cancelled', 'fired')
+
+    def __init__(self, time_ns: int, callback: Callable, args: tuple):
+        self.time_ns = time_ns
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class Scheduler:
+    """
+    Discrete-event queue on a monotonic integer nanosecond clock.
+
+    Events are kept in a heap ordered by due time, and events due at the same time fire in the order they were scheduled.
+    The owner moves the clock forward with run_until(), which fires every event due before the new time.
+    """
+
+    def __init__(self, now_ns: int = 0):
+        """
+        Parameters:
+            now_ns (int): Starting time of the clock.
+        """
+        self._now_ns = now_ns
+        self._heap: list[tuple[int, int, Event]] = []
+        self._sequence = itertools.count()
+
+    def now_ns(self) -> int:
+        """
+        Returns:
+            now_ns (int): Current time of the clock.
+        """
+        return self._now_ns
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, time_ns: int, callback: Callable, *args) -> Event:
+        """
+        Parameters:
+            time_ns (int): Due time. Times in the past are moved to the current time.
+
+            callback (Callable): Function to call when the event fires.
+
+            args: Arguments for the callback.
+
+        Returns:
+            event (Event): The scheduled event, which can be cancelled.
+        """
+        event = Event(max(int(time_ns), self._now_ns), callback, args)
+        heapq.heappush(self._heap, (event.time_ns, next(self._sequence), event))
+        return event
+
+    def next_time(self) -> Optional[int]:
+        """
+        Returns:
+            time_ns (Optional[int]): Due time of the next event that is not cancelled, or None if there is none.
+        """
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def run_until(self, time_ns: int) -> int:
+        """
+        Moves the clock to time_ns and fires every event due before it, including events scheduled by the ones that fire.
+        Callbacks run with the clock already at time_ns.
+
+        Parameters:
+            time_ns (int): New time of the clock. Earlier times leave the clock where it is.
+
+        Returns:
+            fired (int): Number of events fired.
+        """
+        self._now_ns = max(self._now_ns, int(time_ns))
+        fired = 0
+        while (due := self.next_time()) is not None and due < self._now_ns:
+            _, _, event = heapq.heappop(self._heap)
+            event.fired = True
+            event.callback(*event.args)
+            fired += 1
+        return fired
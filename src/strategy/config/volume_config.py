@@ -9,4 +9,6 @@ SHORT_BUF = int(3.513147081440221 * 60 * 60)  # seconds
 LONG_BUF = int(5.822888637955203 * 24 * 60 * 60)  # seconds
 
 THRESHOLD_RSI_B = 50.00765769963135
-THRESHOLD_RSI_S = 20.841865709384414
\ No newline at end of file
+THRESHOLD_RSI_S = 20.841865709384414
+
+GRAPH_STEP = 60 * 60  # seconds
\ No newline at end of file
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+import strategy.config.volume_config as config
+
+@dataclass(frozen=True, slots=True)
+class VolumeParams:
+    """
+    Immutable parameter set for VolumeExecutor. Defaults come from the volume_config module.
+
+    Durations are in seconds.
+    """
+
+    threshold: float = config.THRESHOLD
+    threshold_s: float = config.THRESHOLD_S
+    z_score_max: float = config.Z_SCORE_MAX
+
+    flush: int = config.FLUSH
+    short_buf: int = config.SHORT_BUF
+    long_buf: int = config.LONG_BUF
+
+    threshold_rsi_b: float = config.THRESHOLD_RSI_B
+    threshold_rsi_s: float = config.THRESHOLD_RSI_S
+
+    graph_step: int = config.GRAPH_STEP
+
+    @property
+    def short_len(self) -> int:
+        """
+        Returns:
+            short_len (int): Number of flushes in the short buffer.
+        """
+        return self.short_buf // self.flush
+
+    @property
+    def long_len(self) -> int:
+        """
+        Returns:
+            long_len (int): Number of flushes in the long buffer.
+        """
+        return self.long_buf // self.flush
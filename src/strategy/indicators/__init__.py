@@ -0,0 +1,10 @@
+from .indicator import Indicator
+from .ema import EMA
+from .zscore import RollingZScore
+from .vwap import VWAP
+from .rsi import RSI
+from .atr import ATR
+from .imbalance import VolumeImbalance
+from .pipeline import Pipeline
+
+__all__ = ['Indicator', 'EMA', 'RollingZScore', 'VWAP', 'RSI', 'ATR', 'VolumeImbalance', 'Pipeline']
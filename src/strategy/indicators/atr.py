@@ -0,0 +1,84 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.smoothing import exp_smooth
+from .indicator import Indicator
+
+class ATR(Indicator):
+    """
+    Average true range of time bars built from trades.
+
+    Trades are grouped into bars of bar_ns, aligned to the epoch, and a bar closes at the first trade of a later bar.
+    Intervals without trades make no bar. The true ranges of the closed bars are averaged with Wilder's smoothing,
+    seeded with the mean of the first window of them.
+    """
+
+    inputs = ('time_ns', 'price')
+
+    def __init__(self, window: int, bar_ns: int):
+        """
+        Parameters:
+            window (int): Number of bars in the average.
+
+            bar_ns (int): Length of a bar in nanoseconds.
+        """
+        super().__init__()
+        self.window = window
+        self.bar_ns = bar_ns
+        self._bar = None
+        self._high = self._low = self._close = None
+        self._prev_close = None
+        self._closed = 0
+        self._atr = 0.0
+
+    def _update(self, time_ns: int, price: float) -> Optional[float]:
+        bar = int(time_ns) // self.bar_ns
+        if bar != self._bar:
+            if self._bar is not None:
+                self._close_bar()
+            self._bar = bar
+            self._high = self._low = price
+        self._high = max(self._high, price)
+        self._low = min(self._low, price)
+        self._close = price
+        return self._atr if self._closed >= self.window else None
+
+    def _close_bar(self):
+        prev_close = self._close if self._prev_close is None else self._prev_close
+        true_range = max(self._high, prev_close) - min(self._low, prev_close)
+        self._prev_close = self._close
+        self._closed += 1
+
+        if self._closed <= self.window:
+            self._atr += true_range
+            if self._closed == self.window:
+                self._atr /= self.window
+        else:
+            self._atr += (true_range - self._atr) / self.window
+
+    def compute(self, time_ns: np.ndarray, price: np.ndarray) -> np.ndarray:
+        price = np.asarray(price, dtype=np.float64)
+        atr = np.full(len(price), np.nan)
+        if len(price) == 0:
+            return atr
+
+        bars = np.asarray(time_ns, dtype=np.int64) // self.bar_ns
+        bar_of = np.concatenate(([0], np.cumsum(bars[1:] != bars[:-1])))
+        starts = np.flatnonzero(np.diff(bar_of, prepend=-1))
+        high = np.maximum.reduceat(price, starts)
+        low = np.minimum.reduceat(price, starts)
+        close = price[np.append(starts[1:], len(price)) - 1]
+
+        # Every bar but the last is closed by the end
+        high, low, close = high[:-1], low[:-1], close[:-1]
+        if len(close) < self.window:
+            return atr
+        prev_close = np.concatenate((close[:1], close[:-1]))
+        true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+        initial = true_range[:self.window].mean()
+        closed_atr = np.concatenate(([initial], exp_smooth(true_range[self.window:], 1 / self.window, initial)))
+
+        # A trade in bar b sees the ATR after bar b - 1 closed
+        ready = bar_of >= self.window
+        atr[ready] = closed_atr[bar_of[ready] - self.window]
+        return atr
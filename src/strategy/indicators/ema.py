@@ -0,0 +1,30 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.smoothing import exp_smooth
+from .indicator import Indicator
+
+class EMA(Indicator):
+    """
+    Exponential moving average, starting at the first value: avg += alpha * (value - avg) with alpha = 2 / (span + 1).
+    """
+
+    def __init__(self, span: float):
+        """
+        Parameters:
+            span (float): Span of the average, at least 1. Alpha is 2 / (span + 1).
+        """
+        super().__init__()
+        if span < 1:
+            raise ValueError('The EMA span must be at least 1')
+        self.alpha = 2 / (span + 1)
+
+    def _update(self, value: float) -> Optional[float]:
+        if self._value is None:
+            return float(value)
+        return self._value + self.alpha * (value - self._value)
+
+    def compute(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return np.empty(0)
+        return exp_smooth(values, self.alpha, values[0])
@@ -0,0 +1,37 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.deque_avg_var import DequeAvgVar
+from .indicator import Indicator, rolling_sums
+
+class VolumeImbalance(Indicator):
+    """
+    (buy - sell) / (buy + sell) of the volumes over the last window updates, from -1 (only selling) to 1 (only buying).
+    """
+
+    inputs = ('buy_usd', 'sell_usd')
+
+    def __init__(self, window: int):
+        """
+        Parameters:
+            window (int): Number of updates, such as flush buckets, in the window.
+        """
+        super().__init__()
+        self.window = window
+        self._buy = DequeAvgVar(maxlen=window)
+        self._sell = DequeAvgVar(maxlen=window)
+
+    def _update(self, buy_usd: float, sell_usd: float) -> Optional[float]:
+        self._buy.append(buy_usd)
+        self._sell.append(sell_usd)
+        buy, sell = self._buy.average(), self._sell.average()
+        if buy + sell <= 0:
+            return None
+        return (buy - sell) / (buy + sell)
+
+    def compute(self, buy_usd: np.ndarray, sell_usd: np.ndarray) -> np.ndarray:
+        buy = rolling_sums(buy_usd, self.window)
+        sell = rolling_sums(sell_usd, self.window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            imbalance = (buy - sell) / (buy + sell)
+        imbalance[buy + sell <= 0] = np.nan
+        return imbalance
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import numpy as np
+
+class Indicator(ABC):
+    """
+    Streaming indicator with an equivalent batch form.
+
+    update() takes the next value of each input and returns the indicator's value, or None while it cannot be computed.
+    compute() takes one array per input and returns what update() would have returned for each row, with NaN for None,
+    so live feeds and historical replays see the same values.
+    """
+
+    inputs: tuple[str, ...] = ('value',)  # Default input names, in update() argument order
+
+    def __init__(self):
+        self._value = None
+
+    def update(self, *values: float) -> Optional[float]:
+        """
+        Parameters:
+            values (float): Next value of each input, in the order of inputs.
+
+        Returns:
+            value (Optional[float]): Value of the indicator, or None while it cannot be computed.
+        """
+        self._value = self._update(*values)
+        return self._value
+
+    def value(self) -> Optional[float]:
+        """
+        Returns:
+            value (Optional[float]): Value returned by the latest update().
+        """
+        return self._value
+
+    @abstractmethod
+    def _update(self, *values: float) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def compute(self, *arrays: np.ndarray) -> np.ndarray:
+        """
+        Parameters:
+            arrays (np.ndarray): Values of each input, one row per update, in the order of inputs.
+
+        Returns:
+            values (np.ndarray): Value after each row as update() would return it, NaN where it returns None.
+        """
+        pass
+
+def rolling_sums(values: np.ndarray, window: Optional[int]) -> np.ndarray:
+    """
+    Parameters:
+        values (np.ndarray): Values in update order.
+
+        window (Optional[int]): Number of values in each sum, or None to sum everything so far.
+
+    Returns:
+        sums (np.ndarray): Sum of the last window values at each row (fewer until the window fills).
+    """
+    sums = np.cumsum(values, dtype=np.float64)
+    if window is not None:
+        sums[window:] -= sums[:-window].copy()
+    return sums
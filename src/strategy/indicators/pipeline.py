@@ -0,0 +1,106 @@
+from typing import Optional
+import numpy as np
+from .indicator import Indicator
+
+class Pipeline:
+    """
+    Graph of indicators fed by named inputs and by each other.
+
+    Nodes are added after the nodes they read from, so the order they were added in is a topological order.
+    An update only runs the nodes downstream of the inputs it was given, and a node that returns None does not update
+    the nodes that read from it. Inputs that did not change keep their latest value.
+    """
+
+    def __init__(self):
+        self._nodes: dict[str, tuple[Indicator, tuple[str, ...]]] = {}
+        self._latest: dict[str, float] = {}
+
+    def add(self, name: str, indicator: Indicator, inputs: Optional[tuple[str, ...]] = None) -> 'Pipeline':
+        """
+        Parameters:
+            name (str): Name of the node, which later nodes can use as an input.
+
+            indicator (Indicator): Indicator of the node.
+
+            inputs (Optional[tuple[str, ...]]): Pipeline inputs or earlier nodes to feed the indicator, in its update() order.
+            Defaults to the indicator's own input names.
+
+        Returns:
+            pipeline (Pipeline): The pipeline, for chaining.
+        """
+        inputs = tuple(inputs or indicator.inputs)
+        if name in self._nodes:
+            raise ValueError(f'Indicator {name} is already in the pipeline')
+        if len(inputs) != len(indicator.inputs):
+            raise ValueError(f'Indicator {name} takes {len(indicator.inputs)} inputs, got {len(inputs)}')
+        self._nodes[name] = (indicator, inputs)
+        return self
+
+    def update(self, **inputs: float) -> dict[str, float]:
+        """
+        Feeds the changed inputs and updates the indicators that depend on them.
+
+        Parameters:
+            inputs (float): New value of each changed input.
+
+        Returns:
+            updated (dict[str, float]): Nodes that produced a value, with that value.
+        """
+        self._latest.update(inputs)
+        changed = set(inputs)
+        updated = {}
+        for name, (indicator, sources) in self._nodes.items():
+            if changed.isdisjoint(sources) or any(source not in self._latest for source in sources):
+                continue
+            value = indicator.update(*(self._latest[source] for source in sources))
+            if value is not None:
+                self._latest[name] = value
+                changed.add(name)
+                updated[name] = value
+        return updated
+
+    def value(self, name: str) -> Optional[float]:
+        """
+        Returns:
+            value (Optional[float]): Latest value of a node or input, or None if it has none yet.
+        """
+        return self._latest.get(name)
+
+    def compute(self, **arrays: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Batch form of a sequence of update() calls, for historical replay.
+
+        Parameters:
+            arrays (np.ndarray): Values of each input, one row per update() call, NaN where the input was not given.
+
+        Returns:
+            values (dict[str, np.ndarray]): Value of each node after each row, as value() would report it (NaN for None).
+        """
+        held: dict[str, np.ndarray] = {}
+        changed: dict[str, np.ndarray] = {}
+        for name, array in arrays.items():
+            array = np.asarray(array, dtype=np.float64)
+            changed[name] = ~np.isnan(array)
+            held[name] = Pipeline._hold(array, changed[name])
+
+        results = {}
+        for name, (indicator, sources) in self._nodes.items():
+            if any(source not in held for source in sources):
+                continue
+            runs = np.logical_or.reduce([changed[source] for source in sources])
+            runs &= np.logical_and.reduce([~np.isnan(held[source]) for source in sources])
+
+            values = np.full(len(runs), np.nan)
+            values[runs] = indicator.compute(*(held[source][runs] for source in sources))
+            changed[name] = ~np.isnan(values)
+            held[name] = results[name] = Pipeline._hold(values, changed[name])
+        return results
+
+    @staticmethod
+    def _hold(values: np.ndarray, given: np.ndarray) -> np.ndarray:
+        """
+        Returns the latest given value at each row, NaN before the first.
+        """
+        index = np.arange(len(values))
+        last = np.maximum.accumulate(np.where(given, index, -1))
+        return np.where(last >= 0, values[np.maximum(last, 0)], np.nan)
@@ -0,0 +1,28 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.rolling_rsi import RollingRSI, rolling_rsi, RSI_WINDOW
+from .indicator import Indicator
+
+class RSI(Indicator):
+    """
+    Relative strength index over the last window prices, simple or Wilder-smoothed. See RollingRSI.
+    """
+
+    inputs = ('price',)
+
+    def __init__(self, window: int = RSI_WINDOW, wilder: bool = False):
+        """
+        Parameters:
+            window (int): Number of prices in the RSI window.
+
+            wilder (bool): Use Wilder's smoothing instead of a simple average over the window.
+        """
+        super().__init__()
+        self._rsi = RollingRSI(window, wilder)
+
+    def _update(self, price: float) -> Optional[float]:
+        self._rsi.append(price)
+        return self._rsi.value()
+
+    def compute(self, price: np.ndarray) -> np.ndarray:
+        return rolling_rsi(np.asarray(price, dtype=np.float64), self._rsi.window, self._rsi.wilder)
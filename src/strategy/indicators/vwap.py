@@ -0,0 +1,47 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.deque_avg_var import DequeAvgVar
+from .indicator import Indicator, rolling_sums
+
+class VWAP(Indicator):
+    """
+    Volume weighted average price over the last window trades, or over every trade so far.
+    """
+
+    inputs = ('price', 'quantity')
+
+    def __init__(self, window: Optional[int] = None):
+        """
+        Parameters:
+            window (Optional[int]): Number of trades in the average. Defaults to every trade so far.
+        """
+        super().__init__()
+        self.window = window
+        if window is not None:
+            self._notional = DequeAvgVar(maxlen=window)
+            self._volume = DequeAvgVar(maxlen=window)
+        self._notional_sum = 0.0
+        self._volume_sum = 0.0
+
+    def _update(self, price: float, quantity: float) -> Optional[float]:
+        if self.window is None:
+            self._notional_sum += price * quantity
+            self._volume_sum += quantity
+        else:
+            # Window sums as window averages, which share the length of the window
+            self._notional.append(price * quantity)
+            self._volume.append(quantity)
+            self._notional_sum = self._notional.average()
+            self._volume_sum = self._volume.average()
+
+        if self._volume_sum <= 0:
+            return None
+        return self._notional_sum / self._volume_sum
+
+    def compute(self, price: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+        notional = rolling_sums(np.asarray(price) * quantity, self.window)
+        volume = rolling_sums(quantity, self.window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = notional / volume
+        vwap[volume <= 0] = np.nan
+        return vwap
@@ -0,0 +1,43 @@
+from typing import Optional
+import numpy as np
+from strategy.utils.deque_avg_var import DequeAvgVar
+from strategy.utils.flush_buckets import rolling_mean_var
+from .indicator import Indicator
+
+class RollingZScore(Indicator):
+    """
+    Z-score of the short rolling mean against the long rolling mean and standard deviation,
+    as VolumeExecutor scores bucket volumes: (short mean - long mean) / long std.
+
+    Only available once the long window is full, and not while the long window has no variance.
+    """
+
+    def __init__(self, short_len: int, long_len: int):
+        """
+        Parameters:
+            short_len (int): Number of values in the short window.
+
+            long_len (int): Number of values in the long window.
+        """
+        super().__init__()
+        self.short_len = short_len
+        self.long_len = long_len
+        self._short = DequeAvgVar(maxlen=short_len)
+        self._long = DequeAvgVar(maxlen=long_len)
+
+    def _update(self, value: float) -> Optional[float]:
+        self._short.append(value)
+        self._long.append(value)
+        std = self._long.std()
+        if not self._long.is_full() or std <= 0:
+            return None
+        return (self._short.average() - self._long.average()) / std
+
+    def compute(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        short, _ = rolling_mean_var(values, self.short_len)
+        long, var = rolling_mean_var(values, self.long_len)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (short - long) / np.sqrt(var)
+        z[(np.arange(len(values)) < self.long_len - 1) | (var <= 0)] = np.nan
+        return z
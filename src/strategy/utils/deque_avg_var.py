@@ -1,35 +1,159 @@
-from collections import deque
+import numpy as np
+
+# M2 may shrink to this fraction of its largest value since the last recompute before it is recomputed,
+# since removing large deviations leaves their rounding error behind in a small remainder
+CANCEL_RATIO = 1e-3
 
 class DequeAvgVar:
-    def __init__(self, maxlen):
-        self._deque = deque(maxlen=maxlen)
-        self._sum = 0
-        self._sum_sq = 0
-
-    def append(self, val):
-        if len(self._deque) == self._deque.maxlen:
-            removed = self._deque[0]
-            self._sum -= removed
-            self._sum_sq -= removed ** 2
-        self._deque.append(val)
-        self._sum += val
-        self._sum_sq += val ** 2
+    """
+    Fixed length window of floats with its rolling mean and population variance.
+
+    Values live in a preallocated NumPy ring buffer. The mean and the sum of squared deviations (M2) are updated with
+    Welford's algorithm as values enter and leave, instead of running sums of values and squares, so the variance of large
+    and nearly equal values does not cancel to zero or below. Both are recomputed exactly from the buffer after every
+    maxlen appends, or sooner when the variance collapses, which bounds the rounding error the sliding updates can build up.
+    """
+
+    def __init__(self, maxlen: int):
+        """
+        Parameters:
+            maxlen (int): Number of values in the window. Older values are dropped as new ones are appended.
+        """
+        self.maxlen = maxlen
+        self._buffer = np.zeros(maxlen, dtype=np.float64)
+        self._start = 0  # Position of the oldest value
+        self._len = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._m2_peak = 0.0
+        self._since_recompute = 0
+
+    def append(self, val: float):
+        if self.maxlen == 0:
+            return
+        val = float(val)
+        mean = self._mean
+
+        if self._len == self.maxlen:
+            removed = float(self._buffer[self._start])
+            self._buffer[self._start] = val
+            self._start = (self._start + 1) % self.maxlen
+            self._mean = mean + (val - removed) / self._len
+            self._m2 += (val - removed) * (val - self._mean + removed - mean)
+        else:
+            self._buffer[(self._start + self._len) % self.maxlen] = val
+            self._len += 1
+            self._mean = mean + (val - mean) / self._len
+            self._m2 += (val - mean) * (val - self._mean)
+
+        self._since_recompute += 1
+        self._check_error()
+
+    def extend(self, values: np.ndarray):
+        """
+        Appends many values at once, as repeated append() calls would.
+
+        The statistics of the appended and the dropped values are computed with NumPy and merged into the window's
+        (Chan et al.), so the cost does not grow with the window length.
+
+        Parameters:
+            values (np.ndarray): Values in append order.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.maxlen == 0 or len(values) == 0:
+            return
+        if len(values) >= self.maxlen:
+            self._buffer[:] = values[-self.maxlen:]
+            self._start = 0
+            self._len = self.maxlen
+            self._recompute()
+            return
+
+        dropped = max(self._len + len(values) - self.maxlen, 0)
+        if dropped:
+            self._remove(self._oldest(dropped))
+
+        end = (self._start + self._len) % self.maxlen
+        head = min(len(values), self.maxlen - end)
+        self._buffer[end:end + head] = values[:head]
+        self._buffer[:len(values) - head] = values[head:]
+        self._start = (self._start + dropped) % self.maxlen
+        self._len -= dropped
+        self._merge(values)
+
+        self._since_recompute += len(values)
+        self._check_error()
+
+    def _oldest(self, count: int) -> np.ndarray:
+        index = (self._start + np.arange(count)) % self.maxlen
+        return self._buffer[index]
+
+    def _merge(self, values: np.ndarray):
+        n = self._len + len(values)
+        mean = values.mean()
+        delta = mean - self._mean
+        self._m2 += ((values - mean) ** 2).sum() + delta ** 2 * self._len * len(values) / n
+        self._mean += delta * len(values) / n
+        self._len = n
+
+    def _remove(self, values: np.ndarray):
+        n = self._len - len(values)
+        if n == 0:
+            self._mean = self._m2 = 0.0
+            return
+        mean = values.mean()
+        rest_mean = (self._mean * self._len - mean * len(values)) / n
+        delta = mean - rest_mean
+        self._m2 -= ((values - mean) ** 2).sum() + delta ** 2 * n * len(values) / self._len
+        self._m2 = max(self._m2, 0.0)
+        self._mean = rest_mean
+
+    def _check_error(self):
+        self._m2_peak = max(self._m2_peak, self._m2)
+        if self._since_recompute >= self.maxlen or self._m2 < self._m2_peak * CANCEL_RATIO:
+            self._recompute()
+
+    def _recompute(self):
+        values = self.values()
+        self._mean = float(values.mean()) if len(values) else 0.0
+        self._m2 = float(((values - self._mean) ** 2).sum())
+        self._m2_peak = self._m2
+        self._since_recompute = 0
+
+    def values(self) -> np.ndarray:
+        """
+        Returns:
+            values (np.ndarray): The window's values from oldest to newest. A view of the buffer when it does not wrap around.
+        """
+        end = self._start + self._len
+        if end <= self.maxlen:
+            return self._buffer[self._start:end]
+        return np.concatenate((self._buffer[self._start:], self._buffer[:end - self.maxlen]))
 
     def average(self):
-        return 0 if not self._deque else self._sum / len(self._deque)
-    
+        return 0 if self._len == 0 else self._mean
+
     def variance(self):
-        n = len(self._deque)
-        if n == 0:
+        if self._len == 0:
             return 0
-        mean = self._sum / n
-        return (self._sum_sq / n) - (mean ** 2)
+        return max(self._m2 / self._len, 0.0)
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    def min(self):
+        return float(self._buffer.min()) if self._len == self.maxlen else float(self.values().min())
+
+    def max(self):
+        return float(self._buffer.max()) if self._len == self.maxlen else float(self.values().max())
 
     def __getitem__(self, index):
-        return self._deque[index]
+        if not -self._len <= index < self._len:
+            raise IndexError('DequeAvgVar index out of range')
+        return float(self._buffer[(self._start + index % self._len) % self.maxlen])
 
     def __len__(self):
-        return len(self._deque)
-    
+        return self._len
+
     def is_full(self):
-        return len(self._deque) == self._deque.maxlen
\ No newline at end of file
+        return self._len == self.maxlen
@@ -0,0 +1,73 @@
+import numpy as np
+
+def flush_triggers(time_ns: np.ndarray, flush_ns: int) -> np.ndarray:
+    """
+    Finds the trades that trigger a flush, the same way VolumeExecutor._trade_handler does.
+
+    The first trade sets the marker, and a flush happens at the first trade more than flush_ns after the marker.
+    That trade becomes the new marker and is counted in the next bucket.
+
+    Parameters:
+        time_ns (np.ndarray): Sorted trade times in nanoseconds.
+
+        flush_ns (int): Flush interval in nanoseconds.
+
+    Returns:
+        triggers (np.ndarray): Index of each trade that triggers a flush.
+    """
+    triggers = []
+    if len(time_ns) == 0:
+        return np.array(triggers, dtype=np.int64)
+
+    marker = time_ns[0]
+    while (index := np.searchsorted(time_ns, marker + flush_ns, side='right')) < len(time_ns):
+        triggers.append(index)
+        marker = time_ns[index]
+    return np.array(triggers, dtype=np.int64)
+
+def bucket_sums(values: np.ndarray, triggers: np.ndarray) -> np.ndarray:
+    """
+    Sums the values of each flush bucket. Bucket k holds everything before triggers[k] and from triggers[k - 1] on.
+
+    Values after the last trigger are not flushed yet and are left out.
+
+    Parameters:
+        values (np.ndarray): Per-trade values, such as USD volume.
+
+        triggers (np.ndarray): Flush trigger indices from flush_triggers.
+
+    Returns:
+        sums (np.ndarray): Sum of each bucket.
+    """
+    if len(triggers) == 0:
+        return np.zeros(0)
+    starts = np.concatenate(([0], triggers[:-1]))
+    return np.add.reduceat(values[:triggers[-1]], starts)
+
+def rolling_mean_var(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and population variance over the last window values at each position, as DequeAvgVar reports them after each append.
+
+    Until the window fills, the statistics cover every value so far.
+    The values are centred before the cumulative sums to limit cancellation on large USD volumes.
+
+    Parameters:
+        values (np.ndarray): Values in append order.
+
+        window (int): Maximum number of values in the window.
+
+    Returns:
+        mean_var (tuple[np.ndarray, np.ndarray]): Rolling means and rolling variances.
+    """
+    shift = values.mean() if len(values) else 0.0
+    centred = values - shift
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+
+    sums = np.cumsum(centred)
+    sums[window:] -= sums[:-window].copy()
+    sums_sq = np.cumsum(centred ** 2)
+    sums_sq[window:] -= sums_sq[:-window].copy()
+
+    mean = sums / counts
+    var = np.maximum(sums_sq / counts - mean ** 2, 0.0)
+    return mean + shift, var
@@ -0,0 +1,186 @@
+from collections import deque
+from typing import Optional
+import numpy as np
+from strategy.utils.smoothing import exp_smooth
+
+RSI_WINDOW = 1000  # prices
+
+class RollingRSI:
+    """
+    RSI over the last window prices, updated in O(1) per appended price.
+
+    The simple variant keeps running sums of the gains and losses of the window's price changes, adding the newest
+    change and removing the one that leaves the window. The sums are recomputed from the stored changes once every window
+    appends, so rounding errors cannot build up. The Wilder variant smooths the changes instead, seeded with the simple
+    average of the first window - 1 changes, and needs no stored changes.
+    """
+
+    def __init__(self, window: int = RSI_WINDOW, wilder: bool = False):
+        """
+        Parameters:
+            window (int): Number of prices in the RSI window, so window - 1 price changes.
+
+            wilder (bool): Use Wilder's smoothing instead of a simple average over the window.
+        """
+        if window < 2:
+            raise ValueError('The RSI window needs at least 2 prices')
+        self.window = window
+        self.wilder = wilder
+        self._deltas = deque(maxlen=window - 1)
+        self._last = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+        self._losing = 0  # Price changes in the window that are losses
+        self._since_resum = 0
+
+    def append(self, price: float):
+        """
+        Parameters:
+            price (float): Next price of the series.
+        """
+        last, self._last = self._last, price
+        self._count += 1
+        if last is None:
+            return
+
+        delta = price - last
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if self.wilder:
+            self._append_wilder(gain, loss)
+            return
+
+        if len(self._deltas) == self._deltas.maxlen:
+            removed = self._deltas[0]
+            self._gain -= max(removed, 0.0)
+            self._loss -= max(-removed, 0.0)
+            self._losing -= removed < 0
+        self._deltas.append(delta)
+        self._gain += gain
+        self._loss += loss
+        self._losing += delta < 0
+
+        self._since_resum += 1
+        if self._since_resum == self.window:
+            self._since_resum = 0
+            self._gain = sum(d for d in self._deltas if d > 0)
+            self._loss = -sum(d for d in self._deltas if d < 0)
+
+    def _append_wilder(self, gain: float, loss: float):
+        period = self.window - 1
+        if self._count <= self.window:
+            # Seeding: plain sums until the first period changes are in
+            self._gain += gain
+            self._loss += loss
+            if self._count == self.window:
+                self._gain /= period
+                self._loss /= period
+        else:
+            self._gain += (gain - self._gain) / period
+            self._loss += (loss - self._loss) / period
+        self._losing = int(self._loss > 0)
+
+    def value(self) -> Optional[float]:
+        """
+        Returns:
+            rsi (Optional[float]): RSI of the window, or None until window prices were appended or if the window has no losses.
+        """
+        if not self.is_full() or self._losing == 0:
+            return None
+        return 100 - (100 / (1 + self._gain / self._loss))
+
+    def is_full(self) -> bool:
+        return self._count >= self.window
+
+    def __len__(self):
+        return min(self._count, self.window)
+
+def rolling_rsi(prices: np.ndarray, window: int = RSI_WINDOW, wilder: bool = False) -> np.ndarray:
+    """
+    Batch form of RollingRSI: the RSI after each price, as RollingRSI.value() reports it once the known prices are appended.
+
+    Parameters:
+        prices (np.ndarray): Per-trade prices, NaN until the first price is known and known from then on.
+
+        window (int): Number of prices in the RSI window.
+
+        wilder (bool): Use Wilder's smoothing instead of a simple average over the window.
+
+    Returns:
+        rsi (np.ndarray): RSI at each price, NaN where fewer than window prices are known or the window has no losses.
+    """
+    known = ~np.isnan(prices)
+    first = int(np.argmax(known)) if known.any() else len(prices)
+    period = window - 1
+
+    deltas = np.diff(prices, prepend=np.nan)
+    deltas[:first + 1] = 0.0
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+
+    rsi = np.full(len(prices), np.nan)
+    ready = first + period
+    if ready >= len(prices):
+        return rsi
+
+    if wilder:
+        avg_gain = _wilder_smooth(gains[first + 1:], period)
+        avg_loss = _wilder_smooth(losses[first + 1:], period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi[ready:] = 100 - (100 / (1 + avg_gain / avg_loss))
+        rsi[ready:][avg_loss <= 0] = np.nan
+        return rsi
+
+    gain_sums = np.cumsum(gains)
+    loss_sums = np.cumsum(losses)
+    losing = np.cumsum(deltas < 0)
+    end = np.arange(ready, len(prices))
+    start = end - period
+    gain = gain_sums[end] - gain_sums[start]
+    loss = loss_sums[end] - loss_sums[start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[ready:] = 100 - (100 / (1 + gain / loss))
+    rsi[ready:][losing[end] == losing[start]] = np.nan
+    return rsi
+
+def _wilder_smooth(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder's running average of values: the mean of the first period values, then avg += (value - avg) / period.
+
+    Returns:
+        averages (np.ndarray): Average after each value from the period-th on.
+    """
+    initial = values[:period].mean()
+    return np.concatenate(([initial], exp_smooth(values[period:], 1 / period, initial)))
+
+def rsi_at(prices: np.ndarray, indices: np.ndarray, window: int = RSI_WINDOW) -> np.ndarray:
+    """
+    RSI over the last window known prices up to and including each index, as VolumeExecutor computes it at a flush.
+
+    Parameters:
+        prices (np.ndarray): Per-trade prices, NaN until the first price is known.
+
+        indices (np.ndarray): Trade indices to compute the RSI at.
+
+        window (int): Number of prices in the RSI window.
+
+    Returns:
+        rsi (np.ndarray): RSI at each index, NaN where fewer than window prices are known or the window has no losses.
+    """
+    return rolling_rsi(prices, window)[indices]
+
+def held_rsi(rsi: np.ndarray, first_full: int) -> np.ndarray:
+    """
+    RSI held by VolumeExecutor after each flush: the latest value that could be computed at a full flush.
+
+    Parameters:
+        rsi (np.ndarray): RSI at each flush, NaN where it could not be computed.
+
+        first_full (int | np.ndarray): Index of the first flush with full buffers, or a column of them, one per parameter set.
+
+    Returns:
+        held (np.ndarray): Held RSI after each flush (one row per first_full if a column was given), NaN while none is held.
+    """
+    index = np.arange(len(rsi))
+    last_valid = np.maximum.accumulate(np.where(np.isnan(rsi), -1, index))
+    return np.where(last_valid >= first_full, rsi[np.maximum(last_valid, 0)], np.nan)
@@ -0,0 +1,35 @@
+import numpy as np
+
+def exp_smooth(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    Exponential smoothing: avg += alpha * (value - avg) for each value in turn, starting from initial.
+
+    The recursion is evaluated in blocks, as a decayed cumulative sum anchored at the average before the block.
+    Blocks are short enough that the decay factors inside one stay within about e, so nothing overflows or underflows.
+
+    Parameters:
+        values (np.ndarray): Values in update order.
+
+        alpha (float): Weight of each new value, in (0, 1].
+
+        initial (float): Average before the first value.
+
+    Returns:
+        averages (np.ndarray): Average after each value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if alpha == 1:
+        return values.copy()
+
+    averages = np.empty(len(values))
+    decay = 1 - alpha
+    block_len = max(int(1 / alpha), 1)
+    powers = decay ** np.arange(1, block_len + 1)
+
+    previous = float(initial)
+    for start in range(0, len(values), block_len):
+        block = values[start:start + block_len]
+        scale = powers[:len(block)]
+        averages[start:start + len(block)] = scale * (previous + np.cumsum(block * alpha / scale))
+        previous = averages[start + len(block) - 1]
+    return averages
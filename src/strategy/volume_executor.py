@@ -1,30 +1,51 @@
 import source
+from source.backtest import Backtest
+from database import TradeArrays
 from strategy.utils.deque_avg_var import DequeAvgVar
-import strategy.config.volume_config as config
-from collections import deque
+from strategy.utils.flush_buckets import flush_triggers, bucket_sums, rolling_mean_var
+from strategy.utils.rolling_rsi import RollingRSI, rolling_rsi, rsi_at, held_rsi
+from strategy.config.volume_params import VolumeParams
+from source.latency import LATENCY
 import numpy as np
 from datetime import datetime, timedelta
 
 class VolumeExecutor:
-    def __init__(self, source: source.Source, usd_notional: float, graph: bool = True):
-        short_buf = config.SHORT_BUF // config.FLUSH
-        self._buy_short_buf = DequeAvgVar(maxlen=short_buf)
-        self._sell_short_buf = DequeAvgVar(maxlen=short_buf)
-
-        long_buf = config.LONG_BUF // config.FLUSH
-        self._buy_long_buf = DequeAvgVar(maxlen=long_buf)
-        self._sell_long_buf = DequeAvgVar(maxlen=long_buf)
+    def __init__(
+        self,
+        source: source.Source,
+        usd_notional: float,
+        graph: bool = True,
+        vectorized: bool = False,
+        params: VolumeParams = VolumeParams()
+    ):
+        self.params = params
+        self._buy_short_buf = DequeAvgVar(maxlen=params.short_len)
+        self._sell_short_buf = DequeAvgVar(maxlen=params.short_len)
+
+        self._buy_long_buf = DequeAvgVar(maxlen=params.long_len)
+        self._sell_long_buf = DequeAvgVar(maxlen=params.long_len)
 
         self._full_flag = False
         self._buy_usd = 0.0
         self._sell_usd = 0.0
         self._source = source
-        self._source.add_trade_handler(self._trade_handler)
+        self._batched = isinstance(source, Backtest) and source.columnar
+        self._scheduled = isinstance(source, Backtest) and not vectorized  # Flushes and graph samples are scheduler events
+        self.vectorized = vectorized
+        if vectorized and not self._batched:
+            raise ValueError('Vectorized execution needs a columnar Backtest source')
+        if not self._batched:
+            self._source.add_trade_handler(self._scheduled_trade_handler if self._scheduled else self._trade_handler)
+        elif not vectorized:
+            self._source.add_batch_handler(self._batch_handler)
         self._tradetime_marker = None
+        self._marker_ns = None
         self._available = usd_notional
         self.usd_notional = usd_notional
 
-        self._rsi_prices_list = deque(maxlen=1000)
+        self._rolling_rsi = RollingRSI()
+        self._rsi_ahead = False  # The RSI already has the current trade's mid, added by _flush_timer
+        self._rsi_series: np.ndarray = None
         self._rsi = None
 
         self._zb = 0
@@ -43,10 +64,16 @@ class VolumeExecutor:
         self._balance_history : list[tuple[datetime, float]] = []
 
     def start(self):
+        if self.vectorized:
+            print('Running vectorized backtest')
+            self._run_vectorized()
+            return
+
         print('Streaming trades')
         self._source.stream_trades()
 
     def _trade_handler(self, trades):
+        LATENCY.since_receive('handler_entry')
         for slot in trades['data']:
             if abs(int(self._source.time().timestamp() * 1000 - slot['time'])) < 10000:
                 trade_time = self._source.time().timestamp()
@@ -56,15 +83,14 @@ class VolumeExecutor:
 
                 mid_price = self._source.market_price()
                 if mid_price:
-                       self._rsi_prices_list.append(mid_price)
-                       
-                
+                    self._rolling_rsi.append(mid_price)
+
                 if self._tradetime_marker is None:
                     self._tradetime_marker = trade_time
 
-                if trade_time > self._tradetime_marker + config.FLUSH:
+                if trade_time > self._tradetime_marker + self.params.flush:
                     self._tradetime_marker = trade_time
-                    self._flush()
+                    self._flush(self._rolling_rsi.value())
 
                 if self.graph and self._full_flag:
                     self._update_graph()
@@ -78,39 +104,188 @@ class VolumeExecutor:
             # self.count += 1
             # print(self.count)
 
-    def _flush(self):
+    def _scheduled_trade_handler(self, trades):
+        """
+        _trade_handler for a Backtest, whose scheduler fires the flushes and graph samples instead of the time being checked on every trade.
+        """
+        LATENCY.since_receive('handler_entry')
+        for slot in trades['data']:
+            if self._marker_ns is None:
+                self._schedule_flush(self._source.time_ns())
+
+            if self._rsi_ahead:
+                self._rsi_ahead = False
+            elif mid_price := self._source.market_price():
+                self._rolling_rsi.append(mid_price)
+
+            usd = float(slot['px']) * float(slot['sz'])
+            if slot['side'] == 'A':
+                self._sell_usd += usd
+
+            if slot['side'] == 'B':
+                self._buy_usd += usd
+
+    def _batch_handler(self, trades: TradeArrays):
+        """
+        Columnar equivalent of _trade_handler for a batch of backtest trades.
+
+        Volumes are summed with NumPy. Flushes are scheduler events, and the backtest ends its batches at them.
+        """
+        if self._marker_ns is None:
+            self._schedule_flush(int(trades.time_ns[0]))
+        self._add_volume(trades.usd(), trades.side)
+
+    def _schedule_flush(self, marker_ns: int):
+        self._marker_ns = marker_ns
+        self._source.scheduler.schedule(marker_ns + self.params.flush * 1_000_000_000, self._flush_timer)
+
+    def _flush_timer(self):
+        """
+        Flush event. The backtest fires it at the first trade more than the flush interval after the marker, before the trade's
+        volume is added, and that trade becomes the new marker, as in _trade_handler.
+        """
+        self._schedule_flush(self._source.time_ns())
+        if self._batched:
+            rsi = self._rsi_series_at(self._source.replay_index())
+        else:
+            # The RSI includes the flushing trade, whose handler runs after this
+            if mid_price := self._source.market_price():
+                self._rolling_rsi.append(mid_price)
+            self._rsi_ahead = True
+            rsi = self._rolling_rsi.value()
+        self._flush(rsi)
+
+    def _graph_timer(self):
+        """
+        Graph sample event, fired again one graph step after the latest sample.
+        """
+        self._update_graph()
+        self._source.scheduler.schedule(TradeArrays.to_ns(self.graph_marker) + self.params.graph_step * 1_000_000_000, self._graph_timer)
+
+    def _add_volume(self, usd: np.ndarray, side: np.ndarray):
+        buy_usd = usd[side].sum()
+        self._buy_usd += float(buy_usd)
+        self._sell_usd += float(usd.sum() - buy_usd)
+
+    def _rsi_series_at(self, index: int):
+        """
+        Returns the RSI after the given trade, as _trade_handler's RollingRSI would report it.
+        The RSI of every trade is computed once, on the first flush.
+        """
+        if self._rsi_series is None:
+            self._rsi_series = rolling_rsi(self._source.mid_prices())
+        rsi = self._rsi_series[index]
+        return None if np.isnan(rsi) else float(rsi)
+
+    def _run_vectorized(self):
+        """
+        Offline equivalent of streaming the backtest through _trade_handler.
+
+        Trades are binned into flush buckets and the rolling averages, variances and z-scores are computed for all buckets at once.
+        Only the buckets that can trade (or be graphed) are stepped through, with the source moved to their trigger trade.
+        """
+        trades = self._source.trades()
+        if len(trades) == 0:
+            return
+        self._source.seek(len(trades) - 1)
+
+        triggers = flush_triggers(trades.time_ns, self.params.flush * 1_000_000_000)
+        if len(triggers) == 0:
+            return
+
+        usd = trades.usd()
+        buy_usd = bucket_sums(np.where(trades.side, usd, 0.0), triggers)
+        sell_usd = bucket_sums(np.where(trades.side, 0.0, usd), triggers)
+        self._buy_usd = float(usd[triggers[-1]:][trades.side[triggers[-1]:]].sum())
+        self._sell_usd = float(usd[triggers[-1]:].sum()) - self._buy_usd
+        self.count = float(len(triggers))
+
+        short_buf = self.params.short_len
+        long_buf = self.params.long_len
+        buy_short, _ = rolling_mean_var(buy_usd, short_buf)
+        sell_short, _ = rolling_mean_var(sell_usd, short_buf)
+        buy_long, buy_var = rolling_mean_var(buy_usd, long_buf)
+        sell_long, sell_var = rolling_mean_var(sell_usd, long_buf)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zb = (buy_short - buy_long) / np.sqrt(buy_var)
+            zs = (sell_short - sell_long) / np.sqrt(sell_var)
+
+        first_full = max(long_buf - 1, 0)
+        if first_full >= len(triggers):
+            return
+        print('Buffers full: starting trading')
+        self._full_flag = True
+
+        full = np.arange(len(triggers)) >= first_full
+        sell_signal = full & (zs > self.params.threshold_s)
+        buy_signal = full & ~sell_signal & (zb > self.params.threshold)
+        sell_pressure = sell_short > buy_short
+        rsi = held_rsi(rsi_at(self._source.mid_prices(), triggers), first_full)
+        steps = np.flatnonzero(full) if self.graph else np.flatnonzero(sell_signal | buy_signal)
+
+        for k in steps:
+            self._source.seek(int(triggers[k]))
+            if sell_signal[k] or buy_signal[k]:
+                self._zb, self._zs = float(zb[k]), float(zs[k])
+                self._rsi = None if np.isnan(rsi[k]) else float(rsi[k])
+                self._decide(bool(sell_pressure[k]))
+            if self.graph:
+                self._update_graph()
+
+        self._zb, self._zs = float(zb[-1]), float(zs[-1])
+        self._rsi = None if np.isnan(rsi[-1]) else float(rsi[-1])
+        self._source.seek(len(trades) - 1)
+
+    def _flush(self, rsi):
+        """
+        Parameters:
+            rsi (Optional[float]): RSI at the flushing trade, or None if it cannot be computed yet.
+        """
         self._append_all()
 
         if self._all_full():
             if not self._full_flag:
                 print('Buffers full: starting trading')
                 self._full_flag = True
+                if self.graph and self._scheduled:
+                    self._graph_timer()
             
             self._z_scores()
-            self._calc_relative_strength_index()
-
-            if self._zs > config.THRESHOLD_S:
-                if self._sell_short_buf.average() > self._buy_short_buf.average(): # if the short-term sell volume average is higher than the short-term buy volume average, sell the whole position
-                    if self._source.position_size() > 0:
-                        if(self._rsi < config.THRESHOLD_RSI_B):
-                            print('Selling pressure: selling full position')
-                            print(f'Balance: {self._source.current_total_usd()}')
-                            self.sell_full_position()
-            elif self._zb > config.THRESHOLD: # if there is a short-term buy volume spike, buy some
-                if self._available > 0:
-                    if(self._rsi > config.THRESHOLD_RSI_S):
-                        print('Buy volume spike: buying')
-                        print('z-score: ', self._zb)
+            if rsi is not None:
+                self._rsi = rsi
+            self._decide(self._sell_short_buf.average() > self._buy_short_buf.average())
+
+    def _decide(self, sell_pressure: bool):
+        if self._rsi is None:
+            return # no trading until an RSI was computed at a full flush
+        LATENCY.since_receive('decision')
+
+        if self._zs > self.params.threshold_s:
+            if sell_pressure: # if the short-term sell volume average is higher than the short-term buy volume average, sell the whole position
+                if self._source.position_size() > 0:
+                    if(self._rsi < self.params.threshold_rsi_b):
+                        print('Selling pressure: selling full position')
                         print(f'Balance: {self._source.current_total_usd()}')
-                        self._partial_buy()
+                        self.sell_full_position()
+        elif self._zb > self.params.threshold: # if there is a short-term buy volume spike, buy some
+            if self._available > 0:
+                if(self._rsi > self.params.threshold_rsi_s):
+                    print('Buy volume spike: buying')
+                    print('z-score: ', self._zb)
+                    print(f'Balance: {self._source.current_total_usd()}')
+                    self._partial_buy()
                 
     def sell_full_position(self):
         market_sell_price = float(self._source.last_sell_price())
         sell_size = self._source.position_size()
-        self._available = self._available + sell_size * market_sell_price
 
         print(f'Sell size: {sell_size}')
-        self._source.create_sell_order(sell_size, 0.01)
+        submitted = LATENCY.now()
+        fill = self._source.create_sell_order(sell_size, 0.01)
+        LATENCY.since('order_submit', submitted)
+
+        # Sources that simulate fills return them, so only the proceeds actually received become available
+        self._available = self._available + (sell_size * market_sell_price if fill is None else fill.usd - fill.fee)
         
         # Track the trade
         if sell_size > 0:
@@ -120,11 +295,14 @@ class VolumeExecutor:
         combined_z = max(self._zb, 0)
 
         market_buy_price = float(self._source.last_buy_price())
-        buy_size = (self._available * min(combined_z / config.Z_SCORE_MAX, 1)) / market_buy_price
-        self._available = self._available - min(combined_z / config.Z_SCORE_MAX, 1) * self._available
+        buy_size = (self._available * min(combined_z / self.params.z_score_max, 1)) / market_buy_price
+        spend = min(combined_z / self.params.z_score_max, 1) * self._available
 
         print(f'Buy size: {buy_size}')
-        self._source.create_buy_order(buy_size, 0.01)
+        submitted = LATENCY.now()
+        fill = self._source.create_buy_order(buy_size, 0.01)
+        LATENCY.since('order_submit', submitted)
+        self._available = self._available - (spend if fill is None else fill.usd + fill.fee)
         
         # Track the trade
         if buy_size > 0:
@@ -141,7 +319,8 @@ class VolumeExecutor:
         if self._first_price is None:
             self._first_price = self._source.market_price()
 
-        if self._source.time().timestamp() > self.graph_marker.timestamp() + config.GRAPH_STEP:
+        if self._source.time().timestamp() > self.graph_marker.timestamp() + self.params.graph_step:
+            self.graph_marker = self._source.time()
             self.price_values.append((self._source.market_price() / self._first_price - 1) * 100)
             self.balance_values.append((self._source.current_total_usd() / self.usd_notional - 1) * 100)
             self.times.append(self._source.time())
@@ -156,31 +335,6 @@ class VolumeExecutor:
         self.count += 1
         print(self.count)
 
-    def _calc_relative_strength_index(self):
-
-        if len(self._rsi_prices_list) < 1000:
-            return 0.0
-
-        gains = []
-        losses = []
-
-        for i in range(1, len(self._rsi_prices_list)):
-            delta = self._rsi_prices_list[i] - self._rsi_prices_list[i - 1]
-            if delta > 0:
-                gains.append(delta)
-            else:
-                losses.append(-delta)
-
-        avg_gain = sum(gains) / 1000 if gains else 0
-        avg_loss = sum(losses) / 1000 if losses else 0
-
-        if avg_loss == 0:
-            return 100.0
-
-        rs = avg_gain / avg_loss
-        self._rsi = 100 - (100 / (1 + rs))
-
-
     def _all_full(self):
         return self._buy_long_buf.is_full() and self._sell_long_buf.is_full()
     
@@ -205,4 +359,7 @@ class VolumeExecutor:
     def get_max_drawdown(self):
         """Public method to get the max drawdown as a percentage (0.0-1.0)"""
         return self.calculate_max_drawdown()
-    
\ No newline at end of file
+    
+    def get_trade_count(self):
+        """Public method to get the number of orders sent, as counted in the sweep's trades column"""
+        return len(self._balance_history)
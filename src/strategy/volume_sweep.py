@@ -0,0 +1,219 @@
+from database import TradeArrays
+from strategy.config.volume_params import VolumeParams
+from strategy.utils.flush_buckets import flush_triggers, bucket_sums, rolling_mean_var
+from strategy.utils.rolling_rsi import rolling_rsi, held_rsi
+from dataclasses import asdict
+from datetime import datetime
+from typing import Optional
+import os
+import numpy as np
+import pandas as pd
+
+# Per-trade columns derived from the trades, which save() writes next to them
+DERIVED_COLUMNS = ('usd', 'last_buys', 'last_sells', 'rsi')
+
+class VolumeSweep:
+    """
+    Evaluates many VolumeParams over one read of the trades.
+
+    The per-trade RSI is computed once, flush buckets once per distinct flush interval, and rolling statistics once per buffer length.
+    Parameter sets sharing a flush interval are then stepped through the buckets together, as arrays over the parameter axis.
+    Each set trades as VolumeExecutor would on its own Backtest wallet.
+
+    Runs can be limited to a time window of the trades. Buffers and RSI are still computed over every trade before it,
+    so a window starts with warm buffers, and the intermediates are shared by every window evaluated on the same sweep.
+    """
+
+    def __init__(self, trades: TradeArrays, usd_notional: float, derived: Optional[dict[str, np.ndarray]] = None):
+        """
+        Parameters:
+            trades (TradeArrays): Trades to replay, in stream order.
+
+            usd_notional (float): Starting USD balance of every parameter set.
+
+            derived (Optional[dict[str, np.ndarray]]): DERIVED_COLUMNS of the trades, computed from them if not given.
+        """
+        self._trades = trades
+        self.usd_notional = usd_notional
+
+        if derived is None:
+            last_buys, last_sells = trades.last_prices()
+            derived = {'usd': trades.usd(), 'last_buys': last_buys, 'last_sells': last_sells, 'rsi': rolling_rsi((last_buys + last_sells) / 2)}
+        self._usd = derived['usd']
+        self._last_buys = derived['last_buys']
+        self._last_sells = derived['last_sells']
+        self._rsi = derived['rsi']
+
+        self._buckets: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._rolling: dict[tuple[int, int], tuple[np.ndarray, ...]] = {}
+
+    def run(self, params: list[VolumeParams], start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Parameters:
+            params (list[VolumeParams]): Parameter sets to evaluate.
+
+            start (Optional[datetime]): Start (inc.) of the trading window. Defaults to the first trade.
+
+            end (Optional[datetime]): End (excl.) of the trading window. Defaults to after the last trade.
+
+        Returns:
+            results (pd.DataFrame): One row per parameter set, in the given order, with the parameters,
+            final_balance, return_pct, max_drawdown (as VolumeExecutor.calculate_max_drawdown) and the number of trades.
+            Every set starts the window with usd_notional and no position, and its position is valued at the window's last sell price.
+        """
+        results = [None] * len(params)
+        groups: dict[int, list[int]] = {}
+        for i, p in enumerate(params):
+            groups.setdefault(p.flush, []).append(i)
+
+        for flush, members in groups.items():
+            for i, row in zip(members, self._run_group(flush, [params[i] for i in members], start, end)):
+                results[i] = {**asdict(params[i]), **row}
+        return pd.DataFrame(results)
+
+    # --- Shared Intermediates --- #
+
+    def _flush_buckets(self, flush: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the trigger indices, bucketed buy and sell USD volumes and the RSI at each trigger for a flush interval.
+        """
+        if flush not in self._buckets:
+            triggers = flush_triggers(self._trades.time_ns, flush * 1_000_000_000)
+            buy_usd = bucket_sums(np.where(self._trades.side, self._usd, 0.0), triggers)
+            sell_usd = bucket_sums(np.where(self._trades.side, 0.0, self._usd), triggers)
+            rsi = self._rsi[triggers]
+            self._buckets[flush] = (triggers, buy_usd, sell_usd, rsi)
+        return self._buckets[flush]
+
+    def _rolling_stats(self, flush: int, window: int) -> tuple[np.ndarray, ...]:
+        """
+        Returns the rolling buy mean, buy variance, sell mean and sell variance over window buckets.
+        """
+        if (flush, window) not in self._rolling:
+            _, buy_usd, sell_usd, _ = self._flush_buckets(flush)
+            self._rolling[(flush, window)] = (*rolling_mean_var(buy_usd, window), *rolling_mean_var(sell_usd, window))
+        return self._rolling[(flush, window)]
+
+    def save(self, path: str):
+        """
+        Writes the trades and the DERIVED_COLUMNS to .npy files in the given directory, for load().
+
+        Parameters:
+            path (str): Directory to write the columns to.
+        """
+        self._trades.save(path)
+        for column in DERIVED_COLUMNS:
+            np.save(os.path.join(path, f'{column}.npy'), getattr(self, f'_{column}'))
+
+    @staticmethod
+    def load(path: str, usd_notional: float, mmap: bool = True) -> 'VolumeSweep':
+        """
+        Reads a sweep written by save(). Memory-mapped sweeps in several processes share one copy of every per-trade column.
+
+        Parameters:
+            path (str): Directory the columns were saved to.
+
+            usd_notional (float): Starting USD balance of every parameter set.
+
+            mmap (bool): Whether to memory-map the files read-only instead of reading them into memory.
+
+        Returns:
+            sweep (VolumeSweep): The saved sweep.
+        """
+        mode = 'r' if mmap else None
+        derived = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode=mode) for column in DERIVED_COLUMNS}
+        return VolumeSweep(TradeArrays.load(path, mmap), usd_notional, derived)
+
+    def clear(self):
+        """
+        Drops the cached flush buckets and rolling statistics, keeping the per-trade columns.
+        """
+        self._buckets.clear()
+        self._rolling.clear()
+
+    # --- Simulation --- #
+
+    @staticmethod
+    def _column(params: list[VolumeParams], name: str) -> np.ndarray:
+        return np.array([getattr(p, name) for p in params], dtype=np.float64)[:, None]
+
+    def _run_group(self, flush: int, params: list[VolumeParams], start: Optional[datetime], end: Optional[datetime]) -> list[dict]:
+        triggers, _, _, rsi = self._flush_buckets(flush)
+        n = len(params)
+
+        # Flushes in the window are lo:hi, and trades before last_trade are in or before it
+        flush_ns = self._trades.time_ns[triggers]
+        lo = np.searchsorted(flush_ns, TradeArrays.to_ns(start)) if start else 0
+        hi = np.searchsorted(flush_ns, TradeArrays.to_ns(end)) if end else len(triggers)
+        last_trade = np.searchsorted(self._trades.time_ns, TradeArrays.to_ns(end)) if end else len(self._trades)
+        buckets = max(hi - lo, 0)
+
+        available = np.full(n, float(self.usd_notional))
+        withdrawable = np.full(n, float(self.usd_notional))
+        position = np.zeros(n)
+        trade_count = np.zeros(n, dtype=np.int64)
+        peak = np.full(n, np.nan)
+        max_drawdown = np.zeros(n)
+
+        if buckets:
+            first_full = np.array([max(p.long_len - 1, 0) for p in params])[:, None]
+
+            zb, zs = np.empty((n, buckets)), np.empty((n, buckets))
+            sell_pressure = np.empty((n, buckets), dtype=np.bool_)
+            for i, p in enumerate(params):
+                buy_short, _, sell_short, _ = self._rolling_stats(flush, p.short_len)
+                buy_long, buy_var, sell_long, sell_var = self._rolling_stats(flush, p.long_len)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    zb[i] = (buy_short[lo:hi] - buy_long[lo:hi]) / np.sqrt(buy_var[lo:hi])
+                    zs[i] = (sell_short[lo:hi] - sell_long[lo:hi]) / np.sqrt(sell_var[lo:hi])
+                sell_pressure[i] = sell_short[lo:hi] > buy_short[lo:hi]
+
+            # RSI held by each executor: the latest value computed at a full flush
+            held = held_rsi(rsi[:hi], first_full)[:, lo:]
+
+            full = np.arange(lo, hi) >= first_full
+            sell_signal = full & (zs > VolumeSweep._column(params, 'threshold_s'))
+            buy_signal = full & ~sell_signal & (zb > VolumeSweep._column(params, 'threshold'))
+            buy_signal &= held > VolumeSweep._column(params, 'threshold_rsi_s')
+            sell_signal &= sell_pressure & (held < VolumeSweep._column(params, 'threshold_rsi_b'))
+            z_score_max = VolumeSweep._column(params, 'z_score_max')[:, 0]
+
+            for k in np.flatnonzero((sell_signal | buy_signal).any(axis=0)):
+                trigger = triggers[lo + k]
+                last_buy, last_sell = self._last_buys[trigger], self._last_sells[trigger]
+
+                sell = sell_signal[:, k] & (position > 0)
+                buy = buy_signal[:, k] & (available > 0)
+                if not (sell.any() or buy.any()):
+                    continue
+
+                proceeds = np.where(sell, position * last_sell, 0.0)
+                available += proceeds
+                withdrawable += proceeds
+                position = np.where(sell, 0.0, position)
+
+                fraction = np.where(buy, np.minimum(np.maximum(zb[:, k], 0) / z_score_max, 1), 0.0)
+                buy_size = np.where(buy, available * fraction / last_buy, 0.0)
+                available -= fraction * available
+                withdrawable -= np.where(buy, buy_size * last_buy, 0.0)
+                position += buy_size
+
+                # Balance history entries, as recorded by sell_full_position and _partial_buy
+                traded = sell | (buy & (buy_size > 0))
+                balance = withdrawable + position * last_sell
+                peak = np.where(traded, np.fmax(peak, balance), peak)
+                drawdown = (peak - balance) / peak
+                max_drawdown = np.where(traded, np.maximum(max_drawdown, drawdown), max_drawdown)
+                trade_count += traded
+
+        final_sell = self._last_sells[last_trade - 1] if last_trade else np.nan
+        final_balance = withdrawable + position * np.nan_to_num(final_sell)
+        return [
+            {
+                'final_balance': final_balance[i],
+                'return_pct': (final_balance[i] - self.usd_notional) / self.usd_notional,
+                'max_drawdown': max_drawdown[i] if trade_count[i] >= 2 else 0.0,
+                'trades': int(trade_count[i])
+            }
+            for i in range(n)
+        ]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported from src, as when running the scripts there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
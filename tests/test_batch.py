@@ -0,0 +1,35 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import batch
+from batch import Run, run_batch
+
+START = datetime(2025, 1, 1)
+END = datetime(2025, 2, 1)
+
+
+def _crashing_shard(runs: list[Run], bars: bool) -> tuple[list[dict], int]:
+    with open(os.environ['SHARD_LOG'], 'a') as log:
+        log.write(runs[0].coin + '\n')
+    if runs[0].coin == 'CRASH':
+        os._exit(1)
+    time.sleep(0.2)  # Keep the other shards in flight when the pool breaks
+    return [{'run_id': run.run_id} for run in runs], 0
+
+
+def test_pool_break_is_charged_to_its_shard(tmp_path, monkeypatch):
+    log = tmp_path / 'shards.log'
+    monkeypatch.setenv('SHARD_LOG', str(log))
+    monkeypatch.setattr(batch, '_run_shard', _crashing_shard)
+    runs = [Run(coin, START, END) for coin in ('CRASH', 'A', 'B', 'C')]
+    results_path = tmp_path / 'results.jsonl'
+
+    failed = run_batch(runs, str(results_path), workers=4, retries=1, cache_root=str(tmp_path / 'cache'))
+
+    assert failed == [runs[0]]
+    with open(results_path) as f:
+        assert {json.loads(line)['run_id'] for line in f} == {run.run_id for run in runs[1:]}
+    # One attempt in the shared pool that broke, then one alone per attempt
+    assert log.read_text().split().count('CRASH') == 3
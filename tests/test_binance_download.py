@@ -0,0 +1,188 @@
+"""
+Runs the Binance downloader against a local HTTP stand-in that serves generated fixture zips.
+
+The download tests need no database. The ingest tests load the fixtures into the database configured in .env,
+under a coin pair of their own, and are skipped when it cannot be reached.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import zipfile
+from datetime import datetime, timedelta
+
+import aiohttp
+import psycopg
+import pytest
+from aiohttp import web
+from psycopg_pool import AsyncConnectionPool
+
+from database import DatabaseSync
+from database.database_sync import CONNECTION_STR, INGEST_MODES
+
+COIN = 'FIXTUREUSDT'
+START = datetime(2024, 12, 31)
+END = datetime(2025, 2, 1)  # One daily archive for 2024-12-31 and one monthly archive for 2025-01
+ROWS = {'2024-12-31': 500, '2025-01': 1200}
+
+def fixture_zip(period: str, rows: int) -> bytes:
+    """
+    Returns:
+        data (bytes): Zip holding a headerless Binance trades CSV with rows trades spread over the period, in milliseconds.
+    """
+    start = datetime.strptime(period, '%Y-%m-%d' if len(period) == 10 else '%Y-%m')
+    step_ms = (timedelta(days=1) if len(period) == 10 else timedelta(days=31)) / timedelta(milliseconds=1) // (rows + 1)
+    first_ms = int((start - datetime(1970, 1, 1)) / timedelta(milliseconds=1))
+    lines = []
+    for i in range(rows):
+        price, quantity = 2 + (i % 7) / 100, 10 + i % 13
+        lines.append(f'{first_ms // 10 + i},{price:.4f},{quantity:.2f},{price * quantity:.6f},{first_ms + (i + 1) * int(step_ms)},{i % 2 == 0},True\n')
+
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr(f'{COIN}-trades-{period}.csv', ''.join(lines))
+    return data.getvalue()
+
+ARCHIVES = {f'{COIN}-trades-{period}.zip': fixture_zip(period, rows) for period, rows in ROWS.items()}
+
+class ArchiveServer:
+    """
+    Serves ARCHIVES under the Binance data layout on a free local port.
+    """
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self._runner = None
+        self.base_url = None
+
+    async def __aenter__(self) -> 'ArchiveServer':
+        app = web.Application()
+        app.router.add_get('/data/{market}/{frequency}/trades/{coin}/{name}', self._archive)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}/data'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+    async def _archive(self, request: web.Request) -> web.Response:
+        name = request.match_info['name']
+        self.requests.append(name)
+        if name not in ARCHIVES:
+            return web.Response(status=404)
+        return web.Response(body=ARCHIVES[name])
+
+# --- Download --- #
+
+def test_spool_downloads_fixture():
+    async def run():
+        async with ArchiveServer() as server, aiohttp.ClientSession() as session:
+            urls = {url: period for url, _, _, period in DatabaseSync._archive_urls([(COIN, 'spot')], START, END, server.base_url)}
+            assert sorted(urls.values()) == sorted(ROWS)
+
+            for url in urls:
+                path, checksum = await DatabaseSync._spool(session, url)
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                finally:
+                    os.remove(path)
+                assert data == ARCHIVES[url.rsplit('/', 1)[1]]
+                assert checksum == hashlib.sha256(data).hexdigest()
+
+            assert await DatabaseSync._spool(session, f'{server.base_url}/spot/daily/trades/{COIN}/missing.zip') is None
+
+    asyncio.run(run())
+
+@pytest.mark.parametrize('header', [False, True])
+def test_csv_chunks_keep_first_trade(header):
+    data = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(ARCHIVES[f'{COIN}-trades-2024-12-31.zip'])) as source, zipfile.ZipFile(data, 'w') as z:
+        csv = source.read(source.namelist()[0])
+        z.writestr('trades.csv', (b'id,price,qty,quote_qty,time,is_buyer_maker,is_best_match\n' if header else b'') + csv)
+
+    with zipfile.ZipFile(data) as z, z.open('trades.csv') as csv_file:
+        chunks = list(DatabaseSync._csv_chunks(csv_file))
+    trade_ids = [trade_id for chunk in chunks for trade_id in chunk['trade_id']]
+    assert len(trade_ids) == ROWS['2024-12-31']
+    assert trade_ids[0] == int(csv.split(b',', 1)[0])
+
+# --- Ingest --- #
+
+def _database_available() -> bool:
+    if not os.getenv('DB_NAME'):
+        return False
+    try:
+        psycopg.connect(CONNECTION_STR, connect_timeout=3).close()
+        return True
+    except psycopg.Error:
+        return False
+
+requires_db = pytest.mark.skipif(not _database_available(), reason='needs the database configured in .env')
+
+def _clear_fixture_coin(coin_id: int):
+    conn = DatabaseSync._get_connection()
+    try:
+        with conn.cursor() as cur:
+            for table in ('trades', 'trade_bars', 'ingest_manifest'):
+                cur.execute(f'DELETE FROM {table} WHERE coin_id = %s;', (coin_id,))
+        conn.commit()
+    finally:
+        DatabaseSync._release_connection(conn)
+
+def _loaded(coin_id: int) -> tuple[dict[str, int], dict[str, tuple[int, str, str]]]:
+    """
+    Returns:
+        loaded (tuple[dict, dict]): Trades per period, and (row_count, checksum, status) of each manifest row per period.
+    """
+    conn = DatabaseSync._get_connection()
+    try:
+        with conn.cursor() as cur:
+            counts = {}
+            for period in ROWS:
+                cur.execute(
+                    'SELECT count(*) FROM trades WHERE coin_id = %s AND trade_time >= %s AND trade_time < %s;',
+                    (coin_id, *DatabaseSync._period_range(period))
+                )
+                counts[period] = cur.fetchone()[0]
+            cur.execute('SELECT period, row_count, checksum, status FROM ingest_manifest WHERE coin_id = %s;', (coin_id,))
+            manifest = {period: (row_count, checksum, status) for period, row_count, checksum, status in cur.fetchall()}
+        conn.commit()
+    finally:
+        DatabaseSync._release_connection(conn)
+    return counts, manifest
+
+@requires_db
+@pytest.mark.parametrize('ingest_mode', INGEST_MODES)
+def test_download_to_db(ingest_mode, monkeypatch):
+    monkeypatch.setattr(DatabaseSync, 'pool', AsyncConnectionPool(CONNECTION_STR, open=False))
+    DatabaseSync._create_schema()
+    coin_id = DatabaseSync.get_coin_id(COIN)
+    _clear_fixture_coin(coin_id)
+
+    async def run():
+        async with ArchiveServer() as server:
+            await DatabaseSync.pool.open()
+            try:
+                await DatabaseSync._download_binance_to_db([(COIN, 'spot')], START, END, 2, server.base_url, ingest_mode)
+                first = list(server.requests)
+                # Complete archives are skipped
+                await DatabaseSync._download_binance_to_db([(COIN, 'spot')], START, END, 2, server.base_url, ingest_mode)
+                assert server.requests == first
+            finally:
+                await DatabaseSync.pool.close()
+
+    try:
+        asyncio.run(run())
+        counts, manifest = _loaded(coin_id)
+        assert counts == ROWS
+        assert manifest == {
+            period: (rows, hashlib.sha256(ARCHIVES[f'{COIN}-trades-{period}.zip']).hexdigest(), 'complete')
+            for period, rows in ROWS.items()
+        }
+    finally:
+        _clear_fixture_coin(coin_id)
@@ -0,0 +1,36 @@
+import os
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from benchmark import INITIAL_CAPITAL, PARAMS, START, synthetic_trades
+from database import TradeArrays
+from source.backtest import Backtest
+from source.fill_model import Fill, FillModel
+from strategy.volume_executor import VolumeExecutor
+
+
+class _ImmediateBacktest(Backtest):
+    """
+    Backtest that credits sell proceeds when the order is sent instead of when its fill completes.
+    """
+
+    def _settle_at(self, fill: Fill):
+        self._wallet['withdrawable'] += fill.usd - fill.fee
+
+
+def test_pending_fills_keep_decisions():
+    # Pending fills must not change the decisions, so scheduled and immediate settlement end with the same balance
+    trades = synthetic_trades(100000)
+    end = TradeArrays.to_datetime(int(trades.time_ns[-1]) + 1000)
+    balances, orders = [], []
+    for cls in (Backtest, _ImmediateBacktest):
+        backtest = cls('SYNTH', START, end, INITIAL_CAPITAL, columnar=True, trades=trades, fill_model=FillModel(participation=0.01))
+        executor = VolumeExecutor(backtest, INITIAL_CAPITAL, graph=False, params=PARAMS)
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            executor.start()
+        balances.append(backtest.current_total_usd())
+        orders.append(executor.get_trade_count())
+
+    assert orders[0] == orders[1] > 0
+    assert np.isclose(balances[0], balances[1], rtol=1e-9)
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+import source.hl_async as hl_async
+from source.hl_async import AsyncHyperliquid
+
+
+class _Exchange:
+    def __init__(self, *args):
+        pass
+
+    @staticmethod
+    def _filled(oid: int, size: float) -> dict:
+        return {'status': 'ok', 'response': {'data': {'statuses': [{'filled': {'oid': oid, 'totalSz': str(size), 'avgPx': '10'}}]}}}
+
+    def market_open(self, coin, is_buy, size, px, slippage):
+        return self._filled(8, size)
+
+    def market_close(self, coin, size, px, slippage):
+        return self._filled(7, size)
+
+
+class _Response:
+    def __init__(self, state: dict):
+        self.state = state
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return self.state
+
+
+class _Session:
+    def __init__(self, state: dict):
+        self.state = state
+
+    def post(self, *args, **kwargs):
+        return _Response(self.state)
+
+
+def _state(time_ms: int, position: float, withdrawable: float) -> dict:
+    return {
+        'time': time_ms,
+        'withdrawable': str(withdrawable),
+        'assetPositions': [{'position': {'coin': 'FIX', 'szi': str(position)}}]
+    }
+
+
+def _fill(oid: int, side: str, size: float, time_ms: int) -> dict:
+    return {'channel': 'userFills', 'data': {'fills': [
+        {'coin': 'FIX', 'oid': oid, 'side': side, 'px': '10', 'sz': str(size), 'fee': '0', 'time': time_ms}
+    ]}}
+
+
+@pytest.fixture
+def source(monkeypatch):
+    monkeypatch.setattr(hl_async, 'Exchange', _Exchange)
+    source = AsyncHyperliquid('FIX', address='0x0')
+    source._last_buy = source._last_sell = 10.0
+    return source
+
+
+def test_orders_hold_back_until_filled(source):
+    async def run():
+        source._loop = asyncio.get_running_loop()
+        source._session = _Session(_state(1000, 5, 100))
+        await source.reconcile()
+
+        source.create_sell_order(2, 0.01)
+        source.create_buy_order(1, 0.01)
+        # Sent but neither answered nor filled, so neither can be used again
+        assert source.position_size() == 3
+        assert source.withdrawable() == 90
+
+        source._on_message(_fill(7, 'A', 2, 2000))  # The fill beats the answer
+        await asyncio.gather(*(order.done for order in source.orders))
+        assert source.position_size() == 3
+        assert source.withdrawable() == 110
+
+        source._on_message(_fill(8, 'B', 1, 2100))
+        assert source.position_size() == 4
+        assert source.withdrawable() == 110
+
+    asyncio.run(run())
+
+
+def test_reconcile_keeps_fills_after_state(source):
+    async def run():
+        source._loop = asyncio.get_running_loop()
+        source._session = _Session(_state(1000, 5, 100))
+        await source.reconcile()
+
+        source._on_message(_fill(1, 'A', 2, 2000))
+        assert source.position_size() == 3
+
+        # A state from before the fill must not undo it
+        source._session.state = _state(1500, 5, 100)
+        await source.reconcile()
+        assert source.position_size() == 3
+        assert source.withdrawable() == 120
+
+        # A state that has the fill must not count it twice, nor a late copy of it
+        source._session.state = _state(2500, 3, 120)
+        await source.reconcile()
+        source._on_message(_fill(1, 'A', 2, 2000))
+        assert source.position_size() == 3
+        assert source.withdrawable() == 120
+
+        # An older state arriving last is ignored
+        source._session.state = _state(1200, 5, 100)
+        await source.reconcile()
+        assert source.position_size() == 3
+
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from strategy.indicators import ATR, EMA, RSI, VWAP, Pipeline, RollingZScore, VolumeImbalance
+
+ROWS = 5000
+
+
+def _trades(seed: int = 0) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    usd = rng.exponential(1000, ROWS)
+    buy = rng.random(ROWS) < 0.5
+    return {
+        'time_ns': 1735689600 * 10 ** 9 + np.cumsum(rng.exponential(3e8, ROWS)).astype(np.int64),
+        'price': 1e5 + np.cumsum(rng.normal(0, 5, ROWS)),  # Large and close together, as on BTC
+        'quantity': rng.exponential(0.01, ROWS),
+        'buy_usd': np.where(buy, usd, 0.0),
+        'sell_usd': np.where(buy, 0.0, usd)
+    }
+
+
+def _stream(indicator, *arrays: np.ndarray) -> np.ndarray:
+    values = [indicator.update(*row) for row in zip(*arrays)]
+    return np.array([np.nan if value is None else value for value in values])
+
+
+@pytest.mark.parametrize('indicator, inputs', [
+    (EMA(50), ('price',)),
+    (RollingZScore(20, 200), ('buy_usd',)),
+    (RollingZScore(20, 200), ('price',)),
+    (VWAP(), ('price', 'quantity')),
+    (VWAP(100), ('price', 'quantity')),
+    (RSI(100), ('price',)),
+    (RSI(100, wilder=True), ('price',)),
+    (ATR(14, 10 ** 9), ('time_ns', 'price')),
+    (VolumeImbalance(50), ('buy_usd', 'sell_usd'))
+], ids=['ema', 'zscore-usd', 'zscore-price', 'vwap', 'vwap-window', 'rsi', 'rsi-wilder', 'atr', 'imbalance'])
+def test_update_matches_compute(indicator, inputs):
+    trades = _trades()
+    arrays = [trades[name] for name in inputs]
+
+    batch = indicator.compute(*arrays)
+    streamed = _stream(indicator, *arrays)
+
+    assert np.array_equal(np.isnan(streamed), np.isnan(batch))
+    assert not np.isnan(batch).all()
+    np.testing.assert_allclose(streamed, batch, rtol=1e-9, atol=1e-9)
+
+
+def test_pipeline_update_matches_compute():
+    trades = _trades(1)
+    pipeline = Pipeline() \
+        .add('ema', EMA(20), ('price',)) \
+        .add('z', RollingZScore(10, 100), ('ema',)) \
+        .add('imbalance', VolumeImbalance(50))
+    # The price is only given on some rows, like a mid feed next to a trade feed
+    price = np.where(np.random.default_rng(2).random(ROWS) < 0.3, trades['price'], np.nan)
+    inputs = {'price': price, 'buy_usd': trades['buy_usd'], 'sell_usd': trades['sell_usd']}
+
+    batch = pipeline.compute(**inputs)
+    streamed = {name: np.full(ROWS, np.nan) for name in batch}
+    for row in range(ROWS):
+        pipeline.update(**{name: array[row] for name, array in inputs.items() if not np.isnan(array[row])})
+        for name in batch:
+            value = pipeline.value(name)
+            streamed[name][row] = np.nan if value is None else value
+
+    for name in ('ema', 'z', 'imbalance'):
+        np.testing.assert_allclose(streamed[name], batch[name], rtol=1e-9, atol=1e-9, err_msg=name)
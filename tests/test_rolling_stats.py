@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from strategy.utils.deque_avg_var import DequeAvgVar
+from strategy.utils.rolling_rsi import RollingRSI, rolling_rsi
+
+
+def _prices(rows: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 1e5 + np.cumsum(rng.normal(0, 5, rows))
+
+
+@pytest.mark.parametrize('wilder', [False, True])
+@pytest.mark.parametrize('window', [2, 14, 1000])
+def test_rolling_rsi_matches_streaming(window, wilder):
+    prices = _prices(5 * window + 100)
+    prices[window:window + 20] = prices[window]  # A flat stretch without losses
+
+    rsi = RollingRSI(window, wilder)
+    streamed = []
+    for price in prices:
+        rsi.append(price)
+        streamed.append(np.nan if rsi.value() is None else rsi.value())
+
+    batch = rolling_rsi(prices, window, wilder)
+    assert np.array_equal(np.isnan(streamed), np.isnan(batch))
+    np.testing.assert_allclose(streamed, batch, rtol=0, atol=1e-9)
+
+
+def _reference(values: np.ndarray, maxlen: int) -> tuple[float, float]:
+    window = values[-maxlen:].astype(np.longdouble)
+    return float(window.mean()), float(((window - window.mean()) ** 2).mean())
+
+
+@pytest.mark.parametrize('offset', [0.0, 1e9])
+def test_deque_avg_var_append_and_extend(offset):
+    rng = np.random.default_rng(0)
+    maxlen = 500
+    values = offset + rng.normal(0, 1, 20000)
+    values[5000:6000] = offset + 1e6 * rng.normal(0, 1, 1000)  # Large deviations that leave rounding error behind
+
+    appended, extended = DequeAvgVar(maxlen), DequeAvgVar(maxlen)
+    sizes = rng.integers(1, 2 * maxlen, len(values))
+    end = 0
+    for size in sizes:
+        if end >= len(values):
+            break
+        chunk = values[end:end + size]
+        for value in chunk:
+            appended.append(value)
+        extended.extend(chunk)
+        end += len(chunk)
+
+        mean, variance = _reference(values[:end], maxlen)
+        for window in (appended, extended):
+            assert len(window) == min(end, maxlen)
+            assert np.array_equal(window.values(), values[max(end - maxlen, 0):end])
+            assert window.average() == pytest.approx(mean, rel=1e-12, abs=1e-9)
+            assert window.variance() == pytest.approx(variance, rel=1e-6, abs=1e-9)
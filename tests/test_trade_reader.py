@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from database.trade_reader import COPY_ROW, COPY_SIGNATURE, PG_EPOCH_NS, BinaryCopyTradeReader
+
+
+def _copy_stream(rows: int) -> bytes:
+    body = np.zeros(rows, dtype=COPY_ROW)
+    body['fields'] = 5
+    body['price_len'] = body['quantity_len'] = body['time_len'] = body['trade_id_len'] = 8
+    body['side_len'] = 1
+    body['price'] = 100 + np.arange(rows)
+    body['quantity'] = 0.5
+    body['side'] = np.arange(rows) % 2 == 0
+    body['time_us'] = np.arange(rows) * 1000
+    body['trade_id'] = np.arange(rows)
+    header = COPY_SIGNATURE + bytes(8)
+    return header + body.tobytes() + b'\xff\xff'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_parse_small_chunks(chunk_size):
+    stream = _copy_stream(5)
+    blocks = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+
+    chunks = list(BinaryCopyTradeReader.parse(iter(blocks), chunk_size))
+
+    side = np.concatenate([chunk.side for chunk in chunks])
+    time_ns = np.concatenate([chunk.time_ns for chunk in chunks])
+    assert np.array_equal(np.concatenate([chunk.trade_id for chunk in chunks]), np.arange(5))
+    assert np.array_equal(side, np.arange(5) % 2 == 0)
+    assert np.array_equal(time_ns, np.arange(5) * 1000000 + PG_EPOCH_NS)